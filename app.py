@@ -1,18 +1,20 @@
-import threading
-import math
 import time
-import subprocess
-import shlex
+# Taken before any other import so --startup-check covers module loading too
+_IMPORT_START = time.perf_counter()
+
+import threading
 import os
-import re
 import sys
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from pathlib import Path
-import shutil
-import tempfile
+from typing import Optional
 
-from moviepy.editor import VideoFileClip
+import engine
+import jobqueue
+import renditions
+import selection
+import sizecuts
 
 
 APP_NAME = "ClipForge"
@@ -26,12 +28,27 @@ FONT_SIZE_NORMAL = 10
 FONT_SIZE_SMALL = 9
 FONT_SIZE_TINY = 8
 
+# Startup budget: seconds from importing app.py to the main window going idle.
+# `python app.py --startup-check` measures it and exits non-zero when exceeded
+# or when a heavy module was imported eagerly.
+STARTUP_BUDGET_SECONDS = 1.5
+HEAVY_MODULES = ("moviepy", "numpy", "imageio", "proglog")
+
+
+# Progress/status refresh period; jobs keep only their newest event in between,
+# so nothing is queued on the event loop per ffmpeg line
+UI_REFRESH_MS = 100
+
+# Queue concurrency: stream-copy splits are disk-bound, re-encodes take every core
+QUEUE_IO_JOBS = 2
+QUEUE_CPU_JOBS = 1
+
 
 class VideoTrimmerApp:
 	def __init__(self, root: tk.Tk) -> None:
 		self.root = root
 		self.root.title(f"{APP_NAME} by {COMPANY}")
-		self.root.geometry("850x520")
+		self.root.geometry("850x840")
 		self.root.resizable(False, False)
 		# Set modern background color
 		self.root.configure(bg="#f8f9fa")
@@ -44,6 +61,16 @@ class VideoTrimmerApp:
 		default_output = self._get_app_directory()
 		self.output_dir_var = tk.StringVar(value=default_output)
 		self.duration_var = tk.IntVar(value=30)
+		# Used when duration_var is 0 ("Max size")
+		self.max_size_var = tk.StringVar(value="")
+		self.smart_cut_var = tk.BooleanVar(value=False)
+		self.previews_var = tk.BooleanVar(value=False)
+		self.playlists_var = tk.BooleanVar(value=False)
+		self.cut_point_var = tk.StringVar(value="keyframe")
+		self.renditions_var = tk.StringVar(value="")
+		self.range_start_var = tk.StringVar(value="")
+		self.range_end_var = tk.StringVar(value="")
+		self.only_parts_var = tk.StringVar(value="")
 		self.status_var = tk.StringVar(value="Select a video and output folder.")
 		self.analysis_var = tk.StringVar(value="")
 		self.filename_base_var = tk.StringVar(value="")
@@ -51,8 +78,13 @@ class VideoTrimmerApp:
 		self.time_var = tk.StringVar(value="")
 		# no destructive options; we keep the original file intact
 
+		self.queue = jobqueue.JobQueue(io_jobs=QUEUE_IO_JOBS, cpu_jobs=QUEUE_CPU_JOBS)
+		self._job_status = ""
+
 		self._build_ui()
+		self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 		self.root.after(50, self._show_splash)
+		self.root.after(UI_REFRESH_MS, self._poll_updates)
 
 	def _set_window_icon(self) -> None:
 		"""Set the window icon from icon.ico file."""
@@ -169,22 +201,99 @@ class VideoTrimmerApp:
 		                    activebackground=bg_color, selectcolor="#e9ecef", cursor="hand2",
 		                    activeforeground="#2c3e50")
 		rb2.pack(side="left", padx=12)
+		rb3 = tk.Radiobutton(frm_dur, text="Max size", value=0, variable=self.duration_var,
+		                    font=(FONT_FAMILY, FONT_SIZE_NORMAL), bg=bg_color, fg="#2c3e50", 
+		                    activebackground=bg_color, selectcolor="#e9ecef", cursor="hand2",
+		                    activeforeground="#2c3e50")
+		rb3.pack(side="left", padx=(12, 4))
+		tk.Entry(frm_dur, textvariable=self.max_size_var, width=6, 
+		         font=(FONT_FAMILY, FONT_SIZE_NORMAL), 
+		         relief="solid", bd=1, highlightthickness=1,
+		         highlightbackground="#dee2e6", highlightcolor="#3498db").pack(side="left")
+		tk.Label(frm_dur, text="MB", font=(FONT_FAMILY, FONT_SIZE_NORMAL), bg=bg_color,
+		         fg="#2c3e50").pack(side="left", padx=(4, 0))
+		chk_smart = tk.Checkbutton(frm_dur, text="Exact lengths (smart cut)", variable=self.smart_cut_var,
+		                           font=(FONT_FAMILY, FONT_SIZE_NORMAL), bg=bg_color, fg="#2c3e50",
+		                           activebackground=bg_color, selectcolor="#e9ecef", cursor="hand2",
+		                           activeforeground="#2c3e50")
+		chk_smart.pack(side="left", padx=12)
+
+		# Where stream-copy cuts go; smart cut overrides this with exact lengths
+		frm_cuts = tk.Frame(self.root, bg=bg_color)
+		frm_cuts.pack(fill="x", padx=padx, pady=pady)
+		tk.Label(frm_cuts, text="Cut at:", 
+		        font=(FONT_FAMILY, FONT_SIZE_NORMAL, "normal"), 
+		        bg=bg_color, fg="#2c3e50", width=14, anchor="w").pack(side="left")
+		for i, (value, text) in enumerate((("keyframe", "Nearest keyframe"), ("silence", "Quiet moments"),
+		                                   ("scene", "Scene changes"))):
+			rb = tk.Radiobutton(frm_cuts, text=text, value=value, variable=self.cut_point_var,
+			                    font=(FONT_FAMILY, FONT_SIZE_NORMAL), bg=bg_color, fg="#2c3e50",
+			                    activebackground=bg_color, selectcolor="#e9ecef", cursor="hand2",
+			                    activeforeground="#2c3e50")
+			rb.pack(side="left", padx=(10, 12) if i == 0 else 12)
+		chk_previews = tk.Checkbutton(frm_cuts, text="Previews", variable=self.previews_var,
+		                              font=(FONT_FAMILY, FONT_SIZE_NORMAL), bg=bg_color, fg="#2c3e50",
+		                              activebackground=bg_color, selectcolor="#e9ecef", cursor="hand2",
+		                              activeforeground="#2c3e50")
+		chk_previews.pack(side="left", padx=12)
+		chk_playlists = tk.Checkbutton(frm_cuts, text="Playlists (HLS/DASH)", variable=self.playlists_var,
+		                               font=(FONT_FAMILY, FONT_SIZE_NORMAL), bg=bg_color, fg="#2c3e50",
+		                               activebackground=bg_color, selectcolor="#e9ecef", cursor="hand2",
+		                               activeforeground="#2c3e50")
+		chk_playlists.pack(side="left", padx=12)
+
+		# Several lengths/shapes from one pass; replaces the trim length when filled in
+		frm_rend = tk.Frame(self.root, bg=bg_color)
+		frm_rend.pack(fill="x", padx=padx, pady=pady)
+		tk.Label(frm_rend, text="Renditions:", 
+		        font=(FONT_FAMILY, FONT_SIZE_NORMAL, "normal"), 
+		        bg=bg_color, fg="#2c3e50", width=14, anchor="w").pack(side="left")
+		ent_rend = tk.Entry(frm_rend, textvariable=self.renditions_var, width=30, 
+		                   font=(FONT_FAMILY, FONT_SIZE_NORMAL), 
+		                   relief="solid", bd=1, highlightthickness=1,
+		                   highlightbackground="#dee2e6", highlightcolor="#3498db")
+		ent_rend.pack(side="left", padx=(10, 10))
+		tk.Label(frm_rend, text="(optional, one pass: e.g. 30, 60, 30:9x16, 60:9x16pad, 45:720p)", 
+		        font=(FONT_FAMILY, FONT_SIZE_TINY), bg=bg_color, fg="#6c757d", anchor="w").pack(side="left")
+
+		# Only some parts of the full split, numbered as in the full split
+		frm_sel = tk.Frame(self.root, bg=bg_color)
+		frm_sel.pack(fill="x", padx=padx, pady=pady)
+		tk.Label(frm_sel, text="Only:", 
+		        font=(FONT_FAMILY, FONT_SIZE_NORMAL, "normal"), 
+		        bg=bg_color, fg="#2c3e50", width=14, anchor="w").pack(side="left")
+		for i, (text, var, width) in enumerate((("from", self.range_start_var, 9), ("to", self.range_end_var, 9),
+		                                        ("parts", self.only_parts_var, 12))):
+			tk.Label(frm_sel, text=text, font=(FONT_FAMILY, FONT_SIZE_NORMAL), bg=bg_color,
+			         fg="#2c3e50").pack(side="left", padx=(10 if i == 0 else 4, 4))
+			tk.Entry(frm_sel, textvariable=var, width=width, 
+			         font=(FONT_FAMILY, FONT_SIZE_NORMAL), 
+			         relief="solid", bd=1, highlightthickness=1,
+			         highlightbackground="#dee2e6", highlightcolor="#3498db").pack(side="left")
+		tk.Label(frm_sel, text="(optional, e.g. 40:00 to 55:00 or parts 12,13)", 
+		        font=(FONT_FAMILY, FONT_SIZE_TINY), bg=bg_color, fg="#6c757d", anchor="w").pack(side="left", padx=(10, 0))
 
 		# Action buttons with modern styling
 		frm_actions = tk.Frame(self.root, bg=bg_color)
 		frm_actions.pack(fill="x", padx=padx, pady=(pady+6, pady))
-		btn_analyze = tk.Button(frm_actions, text="Analyze Video", command=self._on_analyze_clicked,
+		self.btn_analyze = tk.Button(frm_actions, text="Analyze Video", command=self._on_analyze_clicked,
 		                       font=(FONT_FAMILY, FONT_SIZE_HEADING, "bold"), 
 		                       bg="#6c757d", fg="white", activebackground="#5a6268", 
 		                       relief="flat", padx=24, pady=8, cursor="hand2",
 		                       borderwidth=0, highlightthickness=0)
-		btn_analyze.pack(side="left", padx=(0, 12))
+		self.btn_analyze.pack(side="left", padx=(0, 12))
 		btn_split = tk.Button(frm_actions, text="Split Video", command=self._on_split_all_clicked,
 		                     font=(FONT_FAMILY, FONT_SIZE_HEADING, "bold"), 
 		                     bg="#28a745", fg="white", activebackground="#218838", 
 		                     relief="flat", padx=24, pady=8, cursor="hand2",
 		                     borderwidth=0, highlightthickness=0)
 		btn_split.pack(side="left")
+		btn_add = tk.Button(frm_actions, text="Add Files to Queue", command=self._on_add_files_clicked,
+		                   font=(FONT_FAMILY, FONT_SIZE_HEADING, "bold"), 
+		                   bg="#3498db", fg="white", activebackground="#2980b9", 
+		                   relief="flat", padx=24, pady=8, cursor="hand2",
+		                   borderwidth=0, highlightthickness=0)
+		btn_add.pack(side="left", padx=(12, 0))
 
 		# Status label with better styling
 		frm_status = tk.Frame(self.root, bg=bg_color)
@@ -233,6 +342,29 @@ class VideoTrimmerApp:
 		                          fg="#6c757d", bg=bg_color, 
 		                          font=(FONT_FAMILY, FONT_SIZE_TINY))
 		self.time_label.pack(fill="x", pady=(6, 0))
+
+		# Job queue: one row per queued/running/finished split
+		frm_queue = tk.Frame(self.root, bg=bg_color)
+		frm_queue.pack(fill="both", expand=True, padx=padx, pady=(0, pady))
+		frm_queue_head = tk.Frame(frm_queue, bg=bg_color)
+		frm_queue_head.pack(fill="x")
+		tk.Label(frm_queue_head, text="Queue:", 
+		       font=(FONT_FAMILY, FONT_SIZE_NORMAL, "bold"), 
+		       bg=bg_color, fg="#495057").pack(side="left")
+		for text, command in (("Clear finished", self._on_clear_finished_clicked),
+		                      ("Cancel", self._on_cancel_job_clicked),
+		                      ("Run sooner", self._on_prioritize_clicked)):
+			tk.Button(frm_queue_head, text=text, command=command,
+			          font=(FONT_FAMILY, FONT_SIZE_SMALL), bg="#e9ecef", fg="#2c3e50",
+			          activebackground="#dee2e6", relief="flat", padx=10, cursor="hand2",
+			          borderwidth=0, highlightthickness=0).pack(side="right", padx=(6, 0))
+		columns = ("file", "kind", "state", "progress", "status")
+		self.queue_tree = ttk.Treeview(frm_queue, columns=columns, show="headings", height=6, selectmode="browse")
+		for col, heading, width in (("file", "File", 200), ("kind", "Type", 50), ("state", "State", 80),
+		                            ("progress", "Progress", 70), ("status", "Status", 400)):
+			self.queue_tree.heading(col, text=heading)
+			self.queue_tree.column(col, width=width, anchor="w", stretch=(col == "status"))
+		self.queue_tree.pack(fill="both", expand=True, pady=(6, 0))
 	def _show_splash(self) -> None:
 		# Simple splash that slides the logo text opacity by updating title dots
 		splash = tk.Toplevel(self.root)
@@ -283,7 +415,12 @@ class VideoTrimmerApp:
 
 	def _on_analyze_clicked(self) -> None:
 		video_path = self.video_path_var.get().strip()
-		duration = int(self.duration_var.get())
+		duration = self._segment_seconds()
+		try:
+			max_part_bytes = self._max_part_bytes()
+		except ValueError as exc:
+			messagebox.showerror("Max size", str(exc))
+			return
 
 		if not video_path:
 			messagebox.showwarning("Missing input", "Please choose an input video file.")
@@ -294,12 +431,11 @@ class VideoTrimmerApp:
 
 		self._set_busy(True)
 		self.status_var.set("Analyzing video length...")
-		threading.Thread(target=self._analyze_worker, args=(Path(video_path), duration), daemon=True).start()
+		threading.Thread(target=self._analyze_worker,
+		                 args=(Path(video_path), duration, max_part_bytes, self._cut_mode()), daemon=True).start()
 
 	def _on_split_all_clicked(self) -> None:
 		video_path = self.video_path_var.get().strip()
-		output_dir = self.output_dir_var.get().strip()
-		duration = int(self.duration_var.get())
 
 		if not video_path:
 			messagebox.showwarning("Missing input", "Please choose an input video file.")
@@ -307,211 +443,169 @@ class VideoTrimmerApp:
 		if not Path(video_path).exists():
 			messagebox.showerror("File not found", "The selected video file does not exist.")
 			return
-		
+		job = self._submit(Path(video_path), self.filename_base_var.get())
+		if job is not None:
+			self.progress_var.set(0)
+			self.time_var.set("")
+			self.status_var.set(f"Queued {job.input_path.name} -> {job.output_dir}")
+
+	def _on_add_files_clicked(self) -> None:
+		filetypes = (
+			("Video files", "*.mp4 *.mov *.mkv *.avi *.webm"),
+			("All files", "*.*"),
+		)
+		paths = filedialog.askopenfilenames(title="Add videos to queue", filetypes=filetypes)
+		# Filename base names one file; a batch keeps each file's own name
+		queued = [job for job in (self._submit(Path(p), "") for p in paths) if job is not None]
+		if queued:
+			self.status_var.set(f"Queued {len(queued)} file(s).")
+
+	def _submit(self, input_path: Path, filename_base: str):
+		"""Queue one split with the current settings; None if its output folder can't be created."""
+		output_dir = self.output_dir_var.get().strip()
 		# Determine dynamic output path: Create Outputs folder and subfolder based on filename base
-		base_dir = Path(output_dir).expanduser() if output_dir else Path.cwd()
-		outputs_dir = base_dir / "Outputs"
-		base_name = self._sanitize_basename(self.filename_base_var.get().strip() or Path(video_path).stem)
-		# Base name is already truncated to 30 chars in _sanitize_basename
-		out_path = outputs_dir / base_name
-		
+		# Base name is truncated to 30 chars by engine.sanitize_basename
+		out_path = engine.resolve_output_dir(Path(output_dir) if output_dir else None, input_path, filename_base)
 		if not out_path.exists():
 			try:
 				out_path.mkdir(parents=True, exist_ok=True)
 			except Exception as exc:  # pragma: no cover
 				messagebox.showerror("Output error", f"Cannot create output folder.\n{exc}")
+				return None
+		try:
+			profiles = renditions.parse_profiles(self.renditions_var.get())
+		except ValueError as exc:
+			messagebox.showerror("Renditions", str(exc))
+			return None
+		try:
+			max_part_bytes = self._max_part_bytes()
+		except ValueError as exc:
+			messagebox.showerror("Max size", str(exc))
+			return None
+		try:
+			start = self.range_start_var.get().strip()
+			end = self.range_end_var.get().strip()
+			options = engine.SplitOptions(cut_mode=self._cut_mode(), renditions=profiles,
+			                              range_start=selection.parse_time(start) if start else None,
+			                              range_end=selection.parse_time(end) if end else None,
+			                              only_parts=selection.parse_part_numbers(self.only_parts_var.get()),
+			                              max_part_bytes=max_part_bytes, previews=bool(self.previews_var.get()),
+			                              playlists=bool(self.playlists_var.get()))
+		except ValueError as exc:
+			messagebox.showerror("Invalid selection", str(exc))
+			return None
+		if profiles and options.selective:
+			messagebox.showerror("Invalid selection", "A part selection can't be combined with renditions.")
+			return None
+		if profiles and max_part_bytes:
+			messagebox.showerror("Max size", "A size cap can't be combined with renditions.")
+			return None
+		if profiles and (options.previews or options.playlists):
+			messagebox.showerror("Renditions", "Previews and playlists can't be combined with renditions.")
+			return None
+		return self.queue.submit(input_path, out_path, self._segment_seconds(),
+		                         filename_base=filename_base, options=options)
+
+	def _selected_job(self):
+		selected = self.queue_tree.selection()
+		return self.queue.get(int(selected[0])) if selected else None
+
+	def _on_cancel_job_clicked(self) -> None:
+		job = self._selected_job()
+		if job is not None:
+			self.queue.cancel(job.id)
+
+	def _on_prioritize_clicked(self) -> None:
+		job = self._selected_job()
+		if job is not None:
+			top = max((j.priority for j in self.queue.jobs() if j.state == "queued"), default=0)
+			self.queue.set_priority(job.id, top + 1)
+
+	def _on_clear_finished_clicked(self) -> None:
+		self.queue.clear_finished()
+
+	def _on_close(self) -> None:
+		if self.queue.pending():
+			if not messagebox.askyesno("Quit", "Splits are still queued or running. Cancel them and quit?"):
 				return
+			self.queue.shutdown(cancel=True)
+			# Cancelled jobs kill their ffmpeg processes and remove their temp files within a fraction of a second
+			self.queue.wait(timeout=2.0)
+		self.root.destroy()
 
-		# reflect resolved path back to UI for clarity
-		self.output_dir_var.set(str(out_path))
-
-		self._set_busy(True)
-		self.progress_var.set(0)
-		self.time_var.set("")
-		self.status_var.set("Preparing... copying to temp and analyzing video")
-		threading.Thread(target=self._split_worker, args=(Path(video_path), out_path, duration), daemon=True).start()
-
-	def _analyze_worker(self, input_path: Path, segment_seconds: int) -> None:
+	def _analyze_worker(self, input_path: Path, segment_seconds: int, max_part_bytes: Optional[int],
+	                    cut_mode: str) -> None:
 		try:
-			with VideoFileClip(str(input_path)) as clip:
-				total_seconds = float(clip.duration or 0)
-				if total_seconds <= 0:
-					raise ValueError("Video has unknown duration")
-				max_seconds = 2 * 60 * 60
-				warning = ""
-				if total_seconds > max_seconds:
-					warning = " (over 2 hours)"
-				parts = int(math.ceil(total_seconds / segment_seconds))
-				last_len = total_seconds - (segment_seconds * (parts - 1)) if parts > 0 else 0
-				msg = f"Length: {int(total_seconds)}s{warning}. Will produce {parts} part(s). Last part: {int(last_len)}s."
-				self._set_status_main_thread("Analysis complete.")
-				self.root.after(0, lambda: self.analysis_var.set(msg))
+			msg = engine.analyze_video(input_path, segment_seconds, cut_mode=cut_mode,
+			                           max_part_bytes=max_part_bytes).summary()
+			self._set_status_main_thread("Analysis complete.")
+			self.root.after(0, lambda: self.analysis_var.set(msg))
 		except Exception as exc:
 			self._show_error_main_thread("Analyze failed", str(exc))
 		finally:
 			self._set_busy(False)
 
-	def _split_worker(self, input_path: Path, output_dir: Path, segment_seconds: int) -> None:
-		tmp_input = None
-		mp4_source = None
-		mp4_source_is_temp = False
+	def _segment_seconds(self) -> int:
+		# "Max size" cuts don't follow a part length; 60 only keeps the grid-based fallbacks sane
+		return int(self.duration_var.get()) or 60
+
+	def _max_part_bytes(self) -> Optional[int]:
+		"""The size cap in bytes when "Max size" is chosen; raises ValueError on a bad entry."""
+		if int(self.duration_var.get()):
+			return None
 		try:
-			stem = input_path.stem
-			ext = ".mp4"
-			# Work on a temp copy to avoid touching original and to ensure readable path
-			# Use shorter temp filename to avoid path length issues
-			tmp_dir = Path(tempfile.gettempdir())
-			# Use timestamp and short hash instead of full filename
-			safe_temp_name = f"cf_{int(time.time())}_{hash(input_path.name) % 10000:04d}{input_path.suffix}"
-			tmp_input = tmp_dir / safe_temp_name
-			shutil.copy2(str(input_path), str(tmp_input))
-
-			# Ensure MP4 source (fast remux first, then re-encode if needed) and get duration
-			self._set_status_main_thread("Converting to MP4 (if needed)...")
-			mp4_source = self._ensure_mp4_with_progress(tmp_input)
-			# Check if mp4_source is a temp file (different from tmp_input)
-			if mp4_source != tmp_input:
-				mp4_source_is_temp = True
-			# Probe duration quickly via ffprobe to avoid opening via MoviePy
-			total_seconds = self._ffprobe_duration_seconds(mp4_source)
-			if total_seconds is None:
-				with VideoFileClip(str(mp4_source)) as clip:
-					total_seconds = float(clip.duration or 0)
-			if not total_seconds or total_seconds <= 0:
-				raise ValueError("Video has unknown duration")
-			parts = int(math.ceil(total_seconds / segment_seconds))
-			base_raw = self.filename_base_var.get().strip() or stem
-			# Sanitize and truncate base name aggressively to avoid path length issues
-			base = self._sanitize_basename(base_raw)
-			self._set_status_main_thread(f"Splitting into {parts} parts (fast mode)...")
-
-			# Fast single-pass segmentation with live progress
-			fast_ok = self._segment_with_progress(mp4_source, output_dir, base, ext, segment_seconds, total_seconds)
-			if fast_ok:
-				self.progress_var.set(100.0)
-				self._set_status_main_thread("All parts saved.")
+			megabytes = float(self.max_size_var.get().strip())
+		except ValueError:
+			megabytes = 0.0
+		if megabytes <= 0:
+			raise ValueError("Enter the largest part size in MB, e.g. 25.")
+		return int(megabytes * sizecuts.MEGABYTE)
+
+	def _cut_mode(self) -> str:
+		if self.smart_cut_var.get():
+			return "smart"
+		return self.cut_point_var.get()
+
+	def _poll_updates(self) -> None:
+		jobs = self.queue.jobs()
+		self._refresh_queue(jobs)
+		# The progress bar follows the selected job, else the oldest running one, else the last finished
+		job = self._selected_job() or next((j for j in jobs if j.state in ("running", "cancelling")), None)
+		if job is None:
+			job = max((j for j in jobs if j.finished and j.started), key=lambda j: j.finished, default=None)
+		if job is not None and job.state != "queued":
+			# Only on change, so Analyze and queue messages aren't overwritten every tick
+			status = f"{job.input_path.name}: {job.status}"
+			if status != self._job_status:
+				self._job_status = status
+				self.status_var.set(status)
+			event = job.event
+			if event is not None:
+				self._update_time_progress(event.elapsed, event.remaining, job.pct)
+				if event.parts_total:
+					self.time_var.set(self.time_var.get() + f"   Parts: {event.parts_done}/{event.parts_total}")
+		self.root.after(UI_REFRESH_MS, self._poll_updates)
+
+	def _refresh_queue(self, jobs) -> None:
+		rows = set(self.queue_tree.get_children())
+		for job in jobs:
+			iid = str(job.id)
+			kind = {"io": "copy", "cpu": "encode"}.get(job.job_class, "")
+			status = (job.error or job.status) if job.state == "failed" else job.status
+			values = (job.input_path.name, kind, job.state, f"{job.pct:.0f}%", status)
+			if iid in rows:
+				rows.discard(iid)
+				if tuple(self.queue_tree.item(iid, "values")) != values:
+					self.queue_tree.item(iid, values=values)
 			else:
-				# Fallback to older per-part approach if needed
-				# Ensure output directory exists
-				output_dir.mkdir(parents=True, exist_ok=True)
-				with VideoFileClip(str(mp4_source)) as clip:
-					start_time = time.time()
-					for idx in range(parts):
-						start_t = idx * segment_seconds
-						end_t = min((idx + 1) * segment_seconds, total_seconds)
-						part_num = idx + 1
-						# Use shorter filename to avoid path length issues
-						output_filename = f"{base}_part_{part_num:03d}{ext}"
-						output_path = output_dir / output_filename
-						seg_len = max(0.01, end_t - start_t)
-						ffmpeg_cmd = [
-							"ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
-						"-ss", f"{start_t}", "-i", str(mp4_source), "-t", f"{seg_len}",
-							"-c", "copy", "-avoid_negative_ts", "make_zero",
-							str(output_path),
-						]
-						use_fallback = False
-						try:
-							proc = subprocess.run(ffmpeg_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=300)
-							if proc.returncode != 0:
-								use_fallback = True
-						except (subprocess.TimeoutExpired, Exception):
-							use_fallback = True
-						if use_fallback:
-							try:
-								# Create short temp directory for MoviePy to avoid long path issues
-								moviepy_temp_dir = Path(tempfile.gettempdir()) / f"cf_mpy_{int(time.time())}"
-								moviepy_temp_dir.mkdir(exist_ok=True)
-								try:
-									# Set environment variable for MoviePy temp directory
-									original_temp = os.environ.get("TMPDIR") or os.environ.get("TEMP")
-									os.environ["TMPDIR"] = str(moviepy_temp_dir)
-									os.environ["TEMP"] = str(moviepy_temp_dir)
-									
-									segment = clip.subclip(start_t, end_t)
-									# Use short temp file names to avoid path length issues
-									short_output_path = str(output_path)
-									# Ensure output path is short enough
-									if len(short_output_path) > 200:
-										# If path is too long, move output to temp and copy
-										short_temp_output = moviepy_temp_dir / f"p{part_num:03d}.mp4"
-										segment.write_videofile(
-											str(short_temp_output), codec="libx264", audio_codec="aac", 
-											threads=2, verbose=False, logger=None, 
-											temp_audiofile=str(moviepy_temp_dir / f"a{part_num:03d}.m4a")
-										)
-										# Copy final file to desired location
-										shutil.copy2(str(short_temp_output), str(output_path))
-										try:
-											short_temp_output.unlink(missing_ok=True)
-										except Exception:
-											pass
-									else:
-										segment.write_videofile(
-											str(short_output_path), codec="libx264", audio_codec="aac", 
-											threads=2, verbose=False, logger=None, 
-											temp_audiofile=str(moviepy_temp_dir / f"a{part_num:03d}.m4a")
-										)
-								finally:
-									# Restore original temp directory
-									if original_temp:
-										os.environ["TMPDIR"] = original_temp
-										os.environ["TEMP"] = original_temp
-									# Clean up MoviePy temp directory
-									try:
-										for f in moviepy_temp_dir.glob("*"):
-											try:
-												f.unlink(missing_ok=True)
-											except Exception:
-												pass
-										moviepy_temp_dir.rmdir()
-									except Exception:
-										pass
-							except Exception as fallback_exc:
-								self._show_error_main_thread("Segment write failed", f"Part {part_num}: {str(fallback_exc)}")
-								continue
-						self._set_status_main_thread(f"Saved part {part_num}/{parts}: {output_path.name}")
-						elapsed = time.time() - start_time
-						avg_part_time = (elapsed / (idx + 1))
-						remaining = max(0.0, avg_part_time * (parts - (idx + 1)))
-						pct = ((idx + 1) / parts) * 100.0
-						self.root.after(0, lambda e=elapsed, r=remaining, p=pct: self._update_time_progress(e, r, p))
-		except Exception as exc:  # pragma: no cover
-			self._show_error_main_thread("Failed to split video", str(exc))
-		finally:
-			# Clean up temp files and release UI
-			try:
-				if mp4_source_is_temp and mp4_source is not None and mp4_source.exists():
-					mp4_source.unlink(missing_ok=True)
-			except Exception:
-				pass
-			try:
-				if tmp_input is not None and tmp_input.exists():
-					tmp_input.unlink(missing_ok=True)
-			except Exception:
-				pass
-			self._set_busy(False)
+				self.queue_tree.insert("", "end", iid=iid, values=values)
+		for iid in rows:
+			self.queue_tree.delete(iid)
 
 	def _update_time_progress(self, elapsed: float, remaining: float, pct: float) -> None:
 		self.progress_var.set(pct)
 		self.time_var.set(f"Elapsed: {int(elapsed)}s   ETA: {int(remaining)}s")
 
-	def _split_with_ffmpeg_segment(self, input_path: Path, output_dir: Path, base: str, ext: str, segment_seconds: int) -> bool:
-		pattern = output_dir / f"{base}_part_%03d{ext}"
-		cmd = [
-			"ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
-			"-i", str(input_path),
-			"-c", "copy", "-map", "0",
-			"-f", "segment", "-segment_time", str(int(segment_seconds)),
-			"-reset_timestamps", "1",
-			str(pattern),
-		]
-		try:
-			proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-			return proc.returncode == 0
-		except Exception:
-			return False
-
 	def _get_app_directory(self) -> str:
 		"""Get the application directory (where script/exe is located)."""
 		try:
@@ -542,125 +636,7 @@ class VideoTrimmerApp:
 		return home / "ClipForge" / "Outputs"
 
 	def _sanitize_basename(self, name: str) -> str:
-		# Remove characters invalid for filenames on Windows and compress spaces
-		# Also truncate aggressively to avoid path length issues (Windows 260 char limit)
-		if not name:
-			return "output"
-		safe = re.sub(r"[\\/\:*?\"<>|]", "_", name)
-		safe = re.sub(r"\s+", "_", safe).strip()  # Replace spaces with underscores
-		# Truncate to 30 chars to leave room for path, part numbers, and temp files
-		if len(safe) > 30:
-			safe = safe[:30]
-		return safe or "output"
-
-	def _ffprobe_duration_seconds(self, path: Path):
-		cmd = [
-			"ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", str(path)
-		]
-		try:
-			out = subprocess.check_output(cmd, stderr=subprocess.DEVNULL)
-			return float(out.decode().strip())
-		except Exception:
-			return None
-
-	def _segment_with_progress(self, input_path: Path, output_dir: Path, base: str, ext: str, segment_seconds: int, total_seconds: float) -> bool:
-		# Ensure output directory exists
-		output_dir.mkdir(parents=True, exist_ok=True)
-		pattern = output_dir / f"{base}_part_%03d{ext}"
-		cmd = [
-			"ffmpeg", "-hide_banner", "-nostdin", "-y",
-			"-i", str(input_path),
-			"-c", "copy", "-map", "0",
-			"-f", "segment", "-segment_time", str(int(segment_seconds)),
-			"-reset_timestamps", "1",
-			"-progress", "pipe:1",
-			str(pattern),
-		]
-		try:
-			proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
-			start_time = time.time()
-			last_out_ms = 0.0
-			while True:
-				line = proc.stdout.readline()
-				if not line:
-					break
-				line = line.strip()
-				if line.startswith("out_time_ms="):
-					ms = float(line.split("=", 1)[1])
-					last_out_ms = ms
-					pct = min(100.0, (ms / (total_seconds * 1000000.0)) * 100.0)
-					elapsed = time.time() - start_time
-					remaining = max(0.0, (elapsed / max(pct, 1e-6)) * (100.0 - pct))
-					self.root.after(0, lambda e=elapsed, r=remaining, p=pct: self._update_time_progress(e, r, p))
-				elif line.startswith("progress=") and line.endswith("end"):
-					break
-			proc.wait()
-			return proc.returncode == 0
-		except Exception:
-			return False
-
-	def _ensure_mp4_with_progress(self, input_path: Path) -> Path:
-		"""Return a path to an MP4 version of input_path.
-		Tries fast remux first; on failure, re-encodes to H.264/AAC with progress.
-		"""
-		# If already mp4, return as-is
-		if input_path.suffix.lower() == ".mp4":
-			return input_path
-		# Use temp directory for converted files to avoid path length issues
-		tmp_dir = Path(tempfile.gettempdir())
-		remux_out = tmp_dir / f"cf_remux_{int(time.time())}.mp4"
-		# Try remux (no re-encode)
-		remux_cmd = [
-			"ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
-			"-i", str(input_path),
-			"-c", "copy", "-map", "0",
-			"-bsf:a", "aac_adtstoasc",
-			"-movflags", "+faststart",
-			str(remux_out),
-		]
-		try:
-			proc = subprocess.run(remux_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-			if proc.returncode == 0 and remux_out.exists():
-				return remux_out
-		except Exception:
-			pass
-		# Re-encode with progress
-		# Use temp directory for converted files to avoid path length issues
-		tmp_dir = Path(tempfile.gettempdir())
-		encode_out = tmp_dir / f"cf_encode_{int(time.time())}.mp4"
-		total_seconds = self._ffprobe_duration_seconds(input_path) or 0.0
-		cmd = [
-			"ffmpeg", "-hide_banner", "-nostdin", "-y",
-			"-i", str(input_path),
-			"-c:v", "libx264", "-preset", "veryfast", "-crf", "23",
-			"-c:a", "aac", "-b:a", "192k",
-			"-movflags", "+faststart",
-			"-progress", "pipe:1",
-			str(encode_out),
-		]
-		try:
-			proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
-			start_time = time.time()
-			while True:
-				line = proc.stdout.readline()
-				if not line:
-					break
-				line = line.strip()
-				if line.startswith("out_time_ms=") and total_seconds:
-					ms = float(line.split("=", 1)[1])
-					pct = min(100.0, (ms / (total_seconds * 1000000.0)) * 100.0)
-					elapsed = time.time() - start_time
-					remaining = max(0.0, (elapsed / max(pct, 1e-6)) * (100.0 - pct))
-					self.root.after(0, lambda e=elapsed, r=remaining, p=pct: self._update_time_progress(e, r, p))
-				elif line.startswith("progress=") and line.endswith("end"):
-					break
-			proc.wait()
-			if proc.returncode == 0 and encode_out.exists():
-				return encode_out
-		except Exception:
-			pass
-		# Fallback: return original
-		return input_path
+		return engine.sanitize_basename(name)
 
 	def _resolve_asset(self, relative: str) -> Path:
 		# Works in both dev and PyInstaller-frozen builds
@@ -686,12 +662,8 @@ class VideoTrimmerApp:
 		return (base / relative).resolve()
 
 	def _set_busy(self, busy: bool) -> None:
-		def apply_state() -> None:
-			for child in self.root.winfo_children():
-				for sub in child.winfo_children():
-					if isinstance(sub, (tk.Button, tk.Entry, tk.Radiobutton)):
-						sub.configure(state=("disabled" if busy else "normal"))
-		self.root.after(0, apply_state)
+		# Only Analyze waits for itself; splits go through the queue and never lock the window
+		self.root.after(0, lambda: self.btn_analyze.configure(state=("disabled" if busy else "normal")))
 
 	def _set_status_main_thread(self, text: str) -> None:
 		self.root.after(0, lambda: self.status_var.set(text))
@@ -700,13 +672,28 @@ class VideoTrimmerApp:
 		self.root.after(0, lambda: messagebox.showerror(title, message))
 
 
+def _startup_check(root: tk.Tk, result: dict) -> None:
+	elapsed = time.perf_counter() - _IMPORT_START
+	heavy = [name for name in HEAVY_MODULES if name in sys.modules]
+	result["ok"] = elapsed <= STARTUP_BUDGET_SECONDS and not heavy
+	print(f"startup: {elapsed:.3f}s (budget {STARTUP_BUDGET_SECONDS:.2f}s)")
+	if heavy:
+		print(f"eagerly imported: {', '.join(heavy)}")
+	root.destroy()
+
+
 def main() -> None:
 	root = tk.Tk()
 	# Use ttk widgets for consistent styling on Windows
 	global ttk
 	import tkinter.ttk as ttk  # lazy import after Tk init
 	VideoTrimmerApp(root)
+	check = {}
+	if "--startup-check" in sys.argv[1:]:
+		root.after_idle(lambda: _startup_check(root, check))
 	root.mainloop()
+	if check:
+		sys.exit(0 if check["ok"] else 1)
 
 
 if __name__ == "__main__":
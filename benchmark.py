@@ -0,0 +1,354 @@
+"""ClipForge benchmarks: time the split paths on synthetic media.
+
+Usage:
+	python benchmark.py [--suite quick|full] [--paths segment,remux,...] [--repeat N]
+	                    [--save FILE] [--compare FILE] [--threshold 0.10]
+
+Inputs are generated locally with ffmpeg's lavfi `testsrc2` and `sine`
+sources across containers, durations, GOP sizes and audio layouts, and kept
+in a media folder so later runs reuse the exact same files. Each measurement
+runs in a fresh interpreter so peak RSS (Python and ffmpeg children) belongs
+to that measurement alone.
+
+Results are parts/sec, MB/s of input read and peak RSS. --save writes them as
+a JSON baseline; --compare reports each measurement against a baseline and
+exits non-zero if any got slower than --threshold allows.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+	import resource
+except ImportError:  # Windows: no getrusage, RSS is reported as null
+	resource = None
+
+import engine
+import probe
+
+BENCH_VERSION = 1
+
+# Every path the suite knows how to time
+PATHS = ("segment", "segment-plain", "remux", "encode", "per-part", "smart")
+
+FRAME_RATE = 30
+FRAME_SIZE = "1280x720"
+
+AUDIO_CHANNELS = {"none": 0, "mono": 1, "stereo": 2, "5.1": 6}
+
+# Codecs per container; webm only takes VP8/VP9/AV1 with Vorbis/Opus
+CONTAINER_CODECS = {
+	"mp4": (["-c:v", "libx264", "-preset", "veryfast"], ["-c:a", "aac", "-b:a", "128k"]),
+	"mov": (["-c:v", "libx264", "-preset", "veryfast"], ["-c:a", "aac", "-b:a", "128k"]),
+	"mkv": (["-c:v", "libx264", "-preset", "veryfast"], ["-c:a", "aac", "-b:a", "128k"]),
+	"webm": (["-c:v", "libvpx-vp9", "-deadline", "realtime", "-cpu-used", "8", "-b:v", "2M"],
+	         ["-c:a", "libopus", "-b:a", "128k"]),
+}
+
+
+@dataclass(frozen=True)
+class MediaCase:
+	container: str
+	duration: int
+	gop: int
+	audio: str
+
+	@property
+	def name(self) -> str:
+		return f"{self.container}_{self.duration}s_g{self.gop}_{self.audio.replace('.', '')}"
+
+	def applies_to(self, path: str) -> bool:
+		"""Whether timing `path` on this input measures something the app really does."""
+		if path in ("segment-plain", "per-part", "smart"):
+			# These only ever see MP4 (the original or the converted source)
+			return self.container == "mp4"
+		if path in ("remux", "encode"):
+			return self.container != "mp4"
+		return True
+
+
+@dataclass
+class Measurement:
+	case: str
+	path: str
+	wall: float
+	parts: int
+	input_bytes: int
+	output_bytes: int
+	# Peak resident set of this process and of the largest ffmpeg child, in KiB; None where unavailable
+	rss_self_kb: Optional[int] = None
+	rss_children_kb: Optional[int] = None
+	ok: bool = True
+
+	@property
+	def key(self) -> str:
+		return f"{self.case}/{self.path}"
+
+	@property
+	def parts_per_sec(self) -> float:
+		return self.parts / self.wall if self.wall > 0 else 0.0
+
+	@property
+	def mb_per_sec(self) -> float:
+		return self.input_bytes / (1024 * 1024) / self.wall if self.wall > 0 else 0.0
+
+
+def suite_cases(suite: str) -> List[MediaCase]:
+	if suite == "quick":
+		return [
+			MediaCase("mp4", 60, 60, "stereo"),
+			MediaCase("mkv", 60, 60, "stereo"),
+			MediaCase("mov", 60, 60, "mono"),
+			MediaCase("webm", 60, 60, "stereo"),
+		]
+	cases = []
+	for container in CONTAINER_CODECS:
+		for duration in (60, 300):
+			for gop in (30, 250):
+				for audio in AUDIO_CHANNELS:
+					if container == "webm" and audio == "5.1":
+						continue
+					cases.append(MediaCase(container, duration, gop, audio))
+	return cases
+
+
+def default_media_dir() -> Path:
+	return probe.default_cache_dir() / "bench"
+
+
+def generate_media(case: MediaCase, media_dir: Path) -> Path:
+	"""Create (once) the synthetic input for case and return its path."""
+	path = media_dir / f"{case.name}.{case.container}"
+	if path.exists():
+		return path
+	media_dir.mkdir(parents=True, exist_ok=True)
+	video_codec, audio_codec = CONTAINER_CODECS[case.container]
+	cmd = [
+		"ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+		"-f", "lavfi", "-i", f"testsrc2=size={FRAME_SIZE}:rate={FRAME_RATE}:duration={case.duration}",
+	]
+	channels = AUDIO_CHANNELS[case.audio]
+	if channels:
+		cmd += ["-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={case.duration}"]
+	# Fixed GOP: no scene-cut keyframes, so keyframe positions are the same on every run
+	cmd += [*video_codec, "-g", str(case.gop), "-keyint_min", str(case.gop), "-pix_fmt", "yuv420p"]
+	if case.container != "webm":
+		cmd += ["-sc_threshold", "0"]
+	if channels:
+		cmd += [*audio_codec, "-ac", str(channels)]
+	tmp = path.with_name(f".tmp_{path.name}")
+	subprocess.run(cmd + [str(tmp)], check=True)
+	os.replace(tmp, path)
+	return path
+
+
+def _peak_rss() -> Dict[str, Optional[int]]:
+	if resource is None:
+		return {"rss_self_kb": None, "rss_children_kb": None}
+	scale = 1024 if sys.platform == "darwin" else 1  # macOS reports bytes, Linux KiB
+	return {
+		"rss_self_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+		"rss_children_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale,
+	}
+
+
+def _run_path(path: str, source: Path, out_dir: Path, segment_seconds: int) -> bool:
+	"""Run one engine path on source, writing into out_dir. True on success."""
+	reporter = engine.Reporter()
+	base = "bench"
+	if path == "segment":
+		info = probe.probe(source, use_cache=False)
+		if info is None:
+			return False
+		plan = engine.plan_mp4_streams(info, segment_seconds, source_is_mp4=source.suffix.lower() == ".mp4")
+		return engine.segment_with_progress(source, out_dir, base, ".mp4", segment_seconds, info.duration, reporter,
+		                                    plan=plan)
+	if path == "segment-plain":
+		return engine.split_with_ffmpeg_segment(source, out_dir, base, ".mp4", segment_seconds)
+	if path in ("remux", "encode"):
+		if path == "remux":
+			converted = engine.remux_to_mp4(source)
+		else:
+			converted = engine.encode_to_mp4(source, reporter)
+		if converted is None:
+			return False
+		shutil.move(str(converted), str(out_dir / f"{base}.mp4"))
+		return True
+	if path == "per-part":
+		total = engine.ffprobe_duration_seconds(source, use_cache=False) or 0.0
+		return bool(engine._split_per_part(source, out_dir, base, ".mp4", segment_seconds, total, reporter))
+	if path == "smart":
+		info = probe.probe(source, use_cache=False)
+		keyframes = probe.keyframe_index(source, use_cache=False)
+		if info is None or not keyframes:
+			return False
+		return bool(engine._split_smart(source, out_dir, base, ".mp4", segment_seconds, info, keyframes, reporter))
+	raise ValueError(f"Unknown benchmark path: {path}")
+
+
+def _worker(args: argparse.Namespace) -> int:
+	"""Child side: time one path on one input and print a Measurement as JSON."""
+	source = Path(args.worker_source)
+	out_dir = Path(tempfile.mkdtemp(prefix="cf_bench_"))
+	try:
+		start = time.perf_counter()
+		ok = _run_path(args.worker_path, source, out_dir, args.segment)
+		wall = time.perf_counter() - start
+		outputs = [p for p in out_dir.iterdir() if p.is_file()]
+		parts = len(outputs) if args.worker_path not in ("remux", "encode") else 0
+		m = Measurement(args.worker_case, args.worker_path, round(wall, 4), parts, source.stat().st_size,
+		                sum(p.stat().st_size for p in outputs), ok=ok, **_peak_rss())
+	finally:
+		shutil.rmtree(out_dir, ignore_errors=True)
+	print(json.dumps(asdict(m)))
+	return 0
+
+
+def measure(case: MediaCase, path: str, source: Path, segment_seconds: int) -> Measurement:
+	"""Time path on source in a fresh interpreter."""
+	cmd = [sys.executable, str(Path(__file__).resolve()), "--segment", str(segment_seconds),
+	       "--worker-case", case.name, "--worker-path", path, "--worker-source", str(source)]
+	# Cached probe/keyframe results would hide the cost of probing
+	env = dict(os.environ, CLIPFORGE_NO_CACHE="1")
+	proc = subprocess.run(cmd, stdout=subprocess.PIPE, env=env, text=True, check=True)
+	return Measurement(**json.loads(proc.stdout.strip().splitlines()[-1]))
+
+
+def summarize(runs: List[Measurement]) -> Measurement:
+	"""Median wall time over repeats; peak RSS is the worst seen."""
+	first = runs[0]
+	rss_self = [m.rss_self_kb for m in runs if m.rss_self_kb is not None]
+	rss_children = [m.rss_children_kb for m in runs if m.rss_children_kb is not None]
+	return Measurement(
+		first.case, first.path, round(statistics.median(m.wall for m in runs), 4), first.parts,
+		first.input_bytes, first.output_bytes,
+		rss_self_kb=max(rss_self) if rss_self else None,
+		rss_children_kb=max(rss_children) if rss_children else None,
+		ok=all(m.ok for m in runs),
+	)
+
+
+def environment() -> dict:
+	try:
+		out = subprocess.check_output(["ffmpeg", "-version"], stderr=subprocess.DEVNULL, text=True)
+		ffmpeg_version = out.splitlines()[0]
+	except (OSError, subprocess.CalledProcessError):
+		ffmpeg_version = ""
+	return {
+		"platform": platform.platform(),
+		"python": platform.python_version(),
+		"cpus": os.cpu_count(),
+		"ffmpeg": ffmpeg_version,
+	}
+
+
+def _row(m: Measurement) -> str:
+	rss = f"{(m.rss_children_kb or 0) / 1024:7.1f}" if m.rss_children_kb is not None else "      -"
+	status = "" if m.ok else "  FAILED"
+	return f"{m.key:<40} {m.wall:8.2f}s {m.parts_per_sec:8.2f} {m.mb_per_sec:8.1f} {rss}{status}"
+
+
+def compare(results: List[Measurement], baseline: dict, threshold: float) -> int:
+	"""Print results against baseline; return how many regressed beyond threshold."""
+	previous = {f"{r['case']}/{r['path']}": r for r in baseline.get("results", [])}
+	regressions = 0
+	print(f"\n{'measurement':<40} {'wall':>9} {'base':>9} {'change':>8}")
+	for m in results:
+		old = previous.get(m.key)
+		if old is None or not old.get("wall"):
+			print(f"{m.key:<40} {m.wall:8.2f}s {'-':>9} {'new':>8}")
+			continue
+		change = (m.wall - old["wall"]) / old["wall"]
+		flag = ""
+		if change > threshold or (old.get("ok", True) and not m.ok):
+			regressions += 1
+			flag = "  REGRESSION"
+		print(f"{m.key:<40} {m.wall:8.2f}s {old['wall']:8.2f}s {change * 100:+7.1f}%{flag}")
+	return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+	parser = argparse.ArgumentParser(prog="benchmark", description="Time ClipForge split paths on synthetic media.")
+	parser.add_argument("--suite", choices=("quick", "full"), default="quick",
+	                    help="quick: 4 one-minute inputs; full: containers x durations x GOPs x audio layouts")
+	parser.add_argument("--paths", default=",".join(PATHS),
+	                    help=f"comma-separated paths to time (default: all of {', '.join(PATHS)})")
+	parser.add_argument("--segment", type=int, default=10, help="segment length in seconds (default: 10)")
+	parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the median is kept (default: 3)")
+	parser.add_argument("--media-dir", type=Path, default=None,
+	                    help="where generated inputs are kept (default: <cache dir>/bench)")
+	parser.add_argument("--save", type=Path, default=None, help="write results as a JSON baseline")
+	parser.add_argument("--compare", type=Path, default=None, help="compare against a saved baseline")
+	parser.add_argument("--threshold", type=float, default=0.10,
+	                    help="allowed slowdown vs. the baseline before a measurement counts as a regression "
+	                         "(default: 0.10 = 10%%)")
+	parser.add_argument("--worker-case", help=argparse.SUPPRESS)
+	parser.add_argument("--worker-path", help=argparse.SUPPRESS)
+	parser.add_argument("--worker-source", help=argparse.SUPPRESS)
+	return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+	parser = build_parser()
+	args = parser.parse_args(argv)
+	if args.worker_path:
+		return _worker(args)
+	paths = [p.strip() for p in args.paths.split(",") if p.strip()]
+	unknown = [p for p in paths if p not in PATHS]
+	if unknown:
+		parser.error(f"unknown path(s): {', '.join(unknown)}")
+	if args.segment <= 0 or args.repeat <= 0:
+		parser.error("--segment and --repeat must be positive")
+	if shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None:
+		print("ffmpeg and ffprobe must be on PATH", file=sys.stderr)
+		return 2
+	baseline = None
+	if args.compare is not None:
+		with open(args.compare, "r", encoding="utf-8") as fh:
+			baseline = json.load(fh)
+
+	media_dir = args.media_dir or default_media_dir()
+	results: List[Measurement] = []
+	print(f"{'measurement':<40} {'wall':>9} {'parts/s':>8} {'MB/s':>8} {'RSS MB':>7}")
+	for case in suite_cases(args.suite):
+		source = generate_media(case, media_dir)
+		for path in paths:
+			if not case.applies_to(path):
+				continue
+			m = summarize([measure(case, path, source, args.segment) for _ in range(args.repeat)])
+			results.append(m)
+			print(_row(m), flush=True)
+
+	if args.save is not None:
+		data = {
+			"version": BENCH_VERSION,
+			"created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+			"suite": args.suite,
+			"segment_seconds": args.segment,
+			"environment": environment(),
+			"results": [dict(asdict(m), parts_per_sec=round(m.parts_per_sec, 3), mb_per_sec=round(m.mb_per_sec, 3))
+			            for m in results],
+		}
+		with open(args.save, "w", encoding="utf-8") as fh:
+			json.dump(data, fh, indent=2)
+		print(f"\nSaved {len(results)} measurement(s) to {args.save}")
+	if baseline is not None:
+		if baseline.get("environment", {}).get("cpus") != os.cpu_count():
+			print("\nNote: baseline was recorded on a machine with a different CPU count.")
+		if compare(results, baseline, args.threshold):
+			return 1
+	return 1 if any(not m.ok for m in results) else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
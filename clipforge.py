@@ -0,0 +1,302 @@
+"""ClipForge command line: split many videos without a display.
+
+Usage:
+	python clipforge.py INPUT [INPUT ...] [-o OUTPUT_ROOT] [-d SECONDS] [-j WORKERS]
+	python clipforge.py --watch DIR [-o OUTPUT_ROOT] [-d SECONDS] [--settle SECONDS]
+
+Each input is split into `<OUTPUT_ROOT>/Outputs/<base>/<base>_part_NNN.mp4`,
+the same layout the GUI produces. Inputs go through a JobQueue: stream-copy
+jobs (disk-bound) and re-encoding jobs (CPU-bound) have separate concurrency
+limits, so one long transcode doesn't hold up the quick splits behind it.
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import engine
+import events
+import jobqueue
+import renditions
+import selection
+import sizecuts
+import watcher
+
+
+class ConsoleReporter(engine.Reporter):
+	"""Prints engine status lines prefixed with the input name.
+
+	Progress events are rate limited per job; part completions always print.
+	If a JSONL event log is given, every job's events are appended to it too.
+	"""
+
+	# Minimum seconds between two progress lines for the same job
+	PROGRESS_INTERVAL = 5.0
+
+	_lock = threading.Lock()
+
+	def __init__(self, name: str, quiet: bool = False, log: Optional[events.JsonlEventLog] = None) -> None:
+		self.name = name
+		self.quiet = quiet
+		self.log = log
+		self._limiter = events.RateLimiter(self.PROGRESS_INTERVAL)
+
+	def _print(self, text: str, stream=None) -> None:
+		with self._lock:
+			print(f"[{self.name}] {text}", file=stream or sys.stdout, flush=True)
+
+	def status(self, text: str) -> None:
+		if not self.quiet:
+			self._print(text)
+
+	def event(self, event: events.ProgressEvent) -> None:
+		if self.log is not None:
+			self.log.write(self.name, event)
+		if self.quiet or not self._limiter.ready(event):
+			return
+		line = f"{event.stage:<8} {event.pct:5.1f}%  Elapsed: {int(event.elapsed)}s   ETA: {int(event.remaining)}s"
+		if event.parts_total:
+			line += f"   Parts: {event.parts_done}/{event.parts_total}"
+		if event.speed:
+			line += f"   Speed: {event.speed:.1f}x"
+		self._print(line)
+
+	def error(self, title: str, message: str) -> None:
+		self._print(f"{title}: {message}", sys.stderr)
+
+
+def build_parser() -> argparse.ArgumentParser:
+	parser = argparse.ArgumentParser(prog="clipforge", description="Split videos into fixed-length MP4 parts.")
+	parser.add_argument("inputs", nargs="*", type=Path, help="input video files")
+	parser.add_argument("-o", "--output", type=Path, default=None,
+	                    help="output root; parts go to <output>/Outputs/<base> (default: current directory)")
+	parser.add_argument("-d", "--duration", type=int, default=30, help="segment length in seconds (default: 30)")
+	parser.add_argument("-j", "--jobs", type=int, default=max(1, min(4, os.cpu_count() or 1)),
+	                    help="number of stream-copy (disk-bound) files processed concurrently "
+	                         "(default: min(4, CPU count))")
+	parser.add_argument("--cpu-jobs", type=int, default=jobqueue.DEFAULT_CPU_JOBS,
+	                    help="number of re-encoding (CPU-bound) files processed concurrently; their part "
+	                         f"workers share the CPUs (default: {jobqueue.DEFAULT_CPU_JOBS})")
+	parser.add_argument("-b", "--base", default="", help="filename base (only valid with a single input)")
+	parser.add_argument("--source-mode", choices=engine.SOURCE_MODES, default="auto",
+	                    help="how inputs are staged: read in place (auto/inplace), hardlink/reflink into temp "
+	                         "(link) or always copy (copy); default: auto")
+	parser.add_argument("--cut-mode", choices=engine.CUT_MODES, default="keyframe",
+	                    help="keyframe: fast stream copy, parts end on keyframes; smart: exact lengths, "
+	                         "re-encoding only the partial GOP at each cut; silence: stream copy, each cut "
+	                         "moved to the quietest keyframe within 3s; scene: stream copy, each cut moved to a "
+	                         "scene change within 5s (silence and scene need NumPy) (default: keyframe)")
+	parser.add_argument("--renditions", default="", metavar="SPECS",
+	                    help="write several outputs in one pass instead of one -d split, e.g. "
+	                         "\"30,60,30:9x16\"; each is SECONDS[:copy|9x16|9x16pad|<N>p] and goes to "
+	                         "<base>/<SECONDS>s[_<shape>]")
+	parser.add_argument("--max-size", type=float, default=None, metavar="MB",
+	                    help="cap each part's file size (MB of 1,000,000 bytes) instead of cutting every -d seconds; "
+	                         "cuts go on keyframes planned from packet sizes, still one stream-copy pass")
+	parser.add_argument("--start", default=None, metavar="TIME",
+	                    help="only write the parts that overlap TIME..--end (seconds, MM:SS or HH:MM:SS); "
+	                         "parts keep the numbers a full split gives them")
+	parser.add_argument("--end", default=None, metavar="TIME",
+	                    help="end of the range started by --start (default: end of the video)")
+	parser.add_argument("--parts", default="", metavar="LIST",
+	                    help="only write these parts of the full split, e.g. \"12,13\" or \"5-8\"")
+	parser.add_argument("--previews", action="store_true",
+	                    help="also write a poster and a contact strip of every part to <base>_previews/, "
+	                         "from keyframes decoded in the same pass")
+	parser.add_argument("--playlists", action="store_true",
+	                    help="write the parts as fragmented MP4 and add <base>.m3u8 (HLS) and <base>.mpd (DASH) "
+	                         "playlists that serve them as a stream")
+	parser.add_argument("--part-workers", type=int, default=None,
+	                    help="cap on parts encoded concurrently within one file when the per-part or "
+	                         "smart-cut path runs (default: CPU count)")
+	parser.add_argument("--analyze", action="store_true",
+	                    help="print the planned parts (keyframe-accurate) instead of splitting")
+	parser.add_argument("--progress-log", type=Path, default=None,
+	                    help="append structured progress events (JSON lines, ~1/s per job) to this file")
+	parser.add_argument("--no-report", action="store_true",
+	                    help="don't write <base>_run.json (stage timings, bytes, path taken) next to the parts")
+	parser.add_argument("--no-resume", action="store_true",
+	                    help="split from scratch even if <base>_manifest.json shows an earlier, interrupted run "
+	                         "of the same split")
+	parser.add_argument("--no-cache", action="store_true",
+	                    help="don't reuse or store parts in the result cache (content-addressed, shared by all "
+	                         "output folders)")
+	parser.add_argument("--profile", action="store_true",
+	                    help="also dump cProfile stats of each job to <base>_profile.pstats")
+	parser.add_argument("--watch", type=Path, default=None, metavar="DIR",
+	                    help="keep running and split every video that appears in DIR once it stops growing")
+	parser.add_argument("--settle", type=float, default=watcher.SETTLE_SECONDS,
+	                    help="with --watch: seconds a file must stay unchanged before it is split "
+	                         f"(default: {watcher.SETTLE_SECONDS:g})")
+	parser.add_argument("--poll", action="store_true",
+	                    help="with --watch: poll the folder instead of using inotify (use for network shares)")
+	parser.add_argument("--state", type=Path, default=None,
+	                    help=f"with --watch: processed-files state file (default: <output>/{watcher.STATE_FILENAME})")
+	parser.add_argument("-q", "--quiet", action="store_true", help="only print errors and the final summary")
+	return parser
+
+
+def _options(args: argparse.Namespace) -> engine.SplitOptions:
+	return engine.SplitOptions(source_mode=args.source_mode, cut_mode=args.cut_mode,
+	                           max_workers=args.part_workers, write_report=not args.no_report,
+	                           profile=args.profile, resume=not args.no_resume, use_cache=not args.no_cache,
+	                           renditions=renditions.parse_profiles(args.renditions), range_start=args.start,
+	                           range_end=args.end, only_parts=args.parts, max_part_bytes=_max_part_bytes(args),
+	                           previews=args.previews, playlists=args.playlists)
+
+
+def _max_part_bytes(args: argparse.Namespace) -> Optional[int]:
+	return int(args.max_size * sizecuts.MEGABYTE) if args.max_size else None
+
+
+def _analyze_all(inputs: List[Path], args: argparse.Namespace) -> int:
+	failed = 0
+	for path in inputs:
+		try:
+			analysis = engine.analyze_video(path, args.duration, cut_mode=args.cut_mode,
+			                                max_part_bytes=_max_part_bytes(args))
+		except Exception as exc:
+			failed += 1
+			print(f"{path}: failed: {exc}", file=sys.stderr)
+			continue
+		print(f"{path}: {analysis.summary()}")
+		if not args.quiet:
+			# With a selection, list the parts it would write
+			chosen = set(selection.select_parts(analysis.boundaries, args.start, args.end, args.parts))
+			for num, (start, length) in enumerate(zip(analysis.boundaries, analysis.part_durations), 1):
+				if num - 1 in chosen:
+					size = ""
+					if analysis.part_bytes:
+						size = f"  ~{analysis.part_bytes[num - 1] / sizecuts.MEGABYTE:.1f} MB"
+					print(f"  part {num:03d}: {start:10.3f}s  +{length:.3f}s{size}")
+	return 1 if failed else 0
+
+
+def _split_all(inputs: List[Path], args: argparse.Namespace, log: Optional[events.JsonlEventLog]) -> int:
+	failed = 0
+	failed_lock = threading.Lock()
+
+	def on_finish(job: jobqueue.Job) -> None:
+		nonlocal failed
+		if job.state == "done":
+			result = job.result
+			print(f"{job.input_path}: {len(result.parts)} part(s) in {result.elapsed:.1f}s ({result.mode}) "
+			      f"-> {result.output_dir}", flush=True)
+		elif job.state == "failed":
+			with failed_lock:
+				failed += 1
+			print(f"{job.input_path}: failed: {job.error}", file=sys.stderr, flush=True)
+
+	queue = jobqueue.JobQueue(io_jobs=args.jobs, cpu_jobs=args.cpu_jobs,
+	                          reporter_factory=lambda job: ConsoleReporter(job.input_path.name, quiet=args.quiet,
+	                                                                       log=log),
+	                          on_finish=on_finish)
+	try:
+		for path in inputs:
+			out_dir = engine.resolve_output_dir(args.output, path, args.base)
+			try:
+				out_dir.mkdir(parents=True, exist_ok=True)
+			except OSError as exc:
+				failed += 1
+				print(f"{path}: failed: {exc}", file=sys.stderr)
+				continue
+			queue.submit(path, out_dir, args.duration, filename_base=args.base, options=_options(args))
+		# Short waits keep the main thread responsive to Ctrl+C
+		while not queue.wait(timeout=0.5):
+			pass
+	except KeyboardInterrupt:
+		# Drop queued jobs and kill the ffmpeg processes of running ones
+		queue.shutdown(cancel=True)
+		print("Interrupted; stopping running jobs...", file=sys.stderr)
+		queue.wait(timeout=5.0)
+		return 130
+	queue.shutdown()
+	return 1 if failed else 0
+
+
+def _watch(args: argparse.Namespace, log: Optional[events.JsonlEventLog]) -> int:
+	def say(text: str) -> None:
+		print(text, flush=True)
+
+	folder = watcher.FolderWatcher(
+		args.watch, args.output, args.duration, options=_options(args), io_jobs=args.jobs, cpu_jobs=args.cpu_jobs,
+		settle_seconds=args.settle, state_path=args.state, use_inotify=not args.poll,
+		reporter_factory=lambda job: ConsoleReporter(job.input_path.name, quiet=args.quiet, log=log), log=say)
+	stop_event = threading.Event()
+	# Service managers stop us with SIGTERM; treat it like Ctrl+C
+	signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+	try:
+		folder.run(stop_event)
+	except KeyboardInterrupt:
+		print("Stopping; unfinished files will be picked up again on the next start.", file=sys.stderr)
+		return 130
+	return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+	parser = build_parser()
+	args = parser.parse_args(argv)
+	if args.duration <= 0:
+		parser.error("--duration must be positive")
+	if args.jobs <= 0 or args.cpu_jobs <= 0:
+		parser.error("--jobs and --cpu-jobs must be positive")
+	if args.part_workers is not None and args.part_workers <= 0:
+		parser.error("--part-workers must be positive")
+	try:
+		renditions.parse_profiles(args.renditions)
+		# Parsed in place: the selection is used as numbers from here on
+		args.start = selection.parse_time(args.start) if args.start is not None else None
+		args.end = selection.parse_time(args.end) if args.end is not None else None
+		args.parts = selection.parse_part_numbers(args.parts)
+	except ValueError as exc:
+		parser.error(str(exc))
+	if args.max_size is not None and args.max_size <= 0:
+		parser.error("--max-size must be positive")
+	if args.renditions and args.max_size:
+		parser.error("--max-size can't be combined with --renditions")
+	if args.start is not None and args.end is not None and args.end <= args.start:
+		parser.error("--end must be after --start")
+	if args.renditions and (args.start is not None or args.end is not None or args.parts):
+		parser.error("--start, --end and --parts can't be combined with --renditions")
+	if args.renditions and (args.previews or args.playlists):
+		parser.error("--previews and --playlists can't be combined with --renditions")
+	if args.base and (len(args.inputs) > 1 or args.watch):
+		parser.error("--base can only be used with a single input")
+	if args.watch is not None:
+		if args.inputs or args.analyze:
+			parser.error("--watch takes no input files and can't be combined with --analyze")
+		if not args.watch.is_dir():
+			parser.error(f"--watch: not a directory: {args.watch}")
+		if args.settle < 0:
+			parser.error("--settle must not be negative")
+	elif not args.inputs:
+		parser.error("at least one input file (or --watch DIR) is required")
+
+	missing = [p for p in args.inputs if not p.is_file()]
+	for p in missing:
+		print(f"File not found: {p}", file=sys.stderr)
+	inputs = [p for p in args.inputs if p.is_file()]
+
+	failed = len(missing)
+	if args.watch is not None:
+		log = events.JsonlEventLog(args.progress_log) if args.progress_log else None
+		try:
+			return _watch(args, log)
+		finally:
+			if log is not None:
+				log.close()
+	if args.analyze:
+		return _analyze_all(inputs, args) or (1 if failed else 0)
+	log = events.JsonlEventLog(args.progress_log) if args.progress_log else None
+	try:
+		return _split_all(inputs, args, log) or (1 if failed else 0)
+	finally:
+		if log is not None:
+			log.close()
+
+
+if __name__ == "__main__":
+	sys.exit(main())
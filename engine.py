@@ -0,0 +1,2025 @@
+"""Headless splitting engine used by both the GUI and the command line.
+
+Nothing in here touches Tk. Callers receive status and progress through a
+Reporter, which the GUI forwards onto its event loop and the CLI prints.
+"""
+import atexit
+import bisect
+import cProfile
+import csv
+import glob
+import math
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import events
+import fileops
+import manifest
+import playlists
+import previews
+import probe
+import procrunner
+import renditions
+import resultcache
+import runreport
+import scenes
+import selection
+import silence
+import sizecuts
+import smartcut
+from events import FfmpegProgress, ProgressEvent
+from renditions import OutputProfile
+
+
+# Longest source we analyze without a warning (2 hours)
+LONG_VIDEO_SECONDS = 2 * 60 * 60
+
+# How the input is staged before ffmpeg reads it (see SplitOptions.source_mode)
+SOURCE_MODES = ("auto", "inplace", "link", "copy")
+
+# "keyframe": single-pass stream copy, parts end on keyframes (fast, inexact)
+# "smart": exact part lengths, re-encoding only up to the first keyframe of each part
+# "silence": stream copy, each cut moved to the quietest keyframe near it (see silence.py)
+# "scene": stream copy, each cut moved to a scene change near it (see scenes.py)
+CUT_MODES = ("keyframe", "smart", "silence", "scene")
+
+# Input paths longer than this are staged in the temp dir under a short name
+SAFE_PATH_MAX = 200
+
+
+# Sources shorter than this are re-encoded by a single ffmpeg process
+CHUNKED_MIN_SECONDS = 120
+# Shortest chunk the parallel transcode cuts a source into
+CHUNK_MIN_SECONDS = 30
+
+# Resumed parts are read from just past their recorded start, so that a start
+# printed with rounded-down decimals doesn't seek back to the previous keyframe
+RESUME_SEEK_NUDGE = 0.001
+# How far a recorded part's start or end may be from a plan's boundary and still count as that part
+PART_MATCH_SECONDS = 0.05
+# Planned cut points are keyframe times rounded to the millisecond, which can
+# land just after the keyframe; the segment muxer gets them this much earlier
+SEGMENT_TIME_SLACK = 0.0005
+
+SIZE_CUT_UNAVAILABLE = ("Can't split by size: a stream has to be re-encoded for MP4, "
+                        "or the packets can't be read")
+
+# Codecs the MP4 muxer accepts as stream copy; anything else is re-encoded
+MP4_VIDEO_CODECS = {"h264", "hevc", "av1", "mpeg4", "mpeg2video", "mpeg1video", "vp9"}
+MP4_AUDIO_CODECS = {"aac", "mp3", "ac3", "eac3", "opus", "flac", "alac"}
+# Text subtitles; MP4 carries them as mov_text. Bitmap subtitles (PGS, DVD, DVB) can't be kept
+MP4_TEXT_SUBTITLE_CODECS = {"mov_text", "subrip", "srt", "ass", "ssa", "webvtt", "text"}
+
+
+class SplitCancelled(Exception):
+	"""Raised when a job is stopped through its cancel event."""
+
+
+def _check_cancel(cancel_event: Optional[threading.Event]) -> None:
+	if cancel_event is not None and cancel_event.is_set():
+		raise SplitCancelled("Split cancelled")
+
+
+class Reporter:
+	"""Receives status text and progress from a running job.
+
+	The default implementation ignores everything; subclasses override the
+	hooks they care about. Methods are called from worker threads, as often
+	as ffmpeg reports, so consumers should coalesce (see events.py).
+	"""
+
+	def status(self, text: str) -> None:
+		pass
+
+	def event(self, event: ProgressEvent) -> None:
+		"""Structured progress; the default forwards to progress()."""
+		self.progress(event.elapsed, event.remaining, event.pct)
+
+	def progress(self, elapsed: float, remaining: float, pct: float) -> None:
+		pass
+
+	def error(self, title: str, message: str) -> None:
+		pass
+
+
+class _RecordingReporter(Reporter):
+	"""Feeds progress samples into a RunRecorder and passes everything on."""
+
+	def __init__(self, inner: Reporter, recorder: runreport.RunRecorder) -> None:
+		self.inner = inner
+		self.recorder = recorder
+
+	def status(self, text: str) -> None:
+		self.inner.status(text)
+
+	def event(self, event: ProgressEvent) -> None:
+		self.recorder.observe(event.bytes, event.speed)
+		self.inner.event(event)
+
+	def error(self, title: str, message: str) -> None:
+		self.inner.error(title, message)
+
+
+@dataclass
+class Analysis:
+	total_seconds: float
+	segment_seconds: int
+	# Part start times followed by the end of the video
+	boundaries: List[float]
+	# True when boundaries come from the keyframe index (what -c copy really does)
+	keyframe_accurate: bool = False
+	info: Optional[probe.ProbeInfo] = None
+	# Cut mode "silence": audio level (dBFS) at each inner cut
+	cut_levels: Optional[List[float]] = None
+	# Cut mode "scene": scene-change score (0..1) of each inner cut
+	cut_scores: Optional[List[float]] = None
+	# Cut modes "silence" and "scene": how far each inner cut moved from the grid
+	cut_shifts: Optional[List[float]] = None
+	# Size-capped splits: the cap, each part's estimated size and parts over it anyway
+	max_part_bytes: Optional[int] = None
+	part_bytes: Optional[List[int]] = None
+	oversized: Optional[List[int]] = None
+
+	@property
+	def parts(self) -> int:
+		return max(0, len(self.boundaries) - 1)
+
+	@property
+	def part_durations(self) -> List[float]:
+		return [b - a for a, b in zip(self.boundaries, self.boundaries[1:])]
+
+	@property
+	def last_part_seconds(self) -> float:
+		durations = self.part_durations
+		return durations[-1] if durations else 0.0
+
+	@property
+	def is_long(self) -> bool:
+		return self.total_seconds > LONG_VIDEO_SECONDS
+
+	def codecs(self) -> str:
+		"""Short stream description, e.g. "h264 video, aac audio"."""
+		if self.info is None:
+			return ""
+		return ", ".join(f"{s.codec_name} {s.codec_type}" for s in self.info.streams
+		                 if s.codec_type in ("video", "audio") and not s.attached_pic)
+
+	def summary(self) -> str:
+		warning = " (over 2 hours)" if self.is_long else ""
+		codecs = self.codecs()
+		streams = f" [{codecs}]" if codecs else ""
+		msg = (f"Length: {int(self.total_seconds)}s{warning}{streams}. Will produce {self.parts} part(s). "
+		       f"Last part: {int(self.last_part_seconds)}s.")
+		durations = self.part_durations[:-1]
+		if self.keyframe_accurate and durations:
+			msg += f" Parts cut on keyframes: {min(durations):.1f}s-{max(durations):.1f}s."
+		if self.cut_levels:
+			moved = sum(1 for shift in self.cut_shifts or [] if abs(shift) >= 0.5)
+			msg += (f" {moved} of {len(self.cut_levels)} cut(s) moved to quieter keyframes, "
+			        f"loudest cut {max(self.cut_levels):.0f} dBFS.")
+		if self.cut_scores:
+			on_scenes = sum(1 for score in self.cut_scores if score >= scenes.SCENE_THRESHOLD)
+			msg += f" {on_scenes} of {len(self.cut_scores)} cut(s) on scene changes."
+		if self.part_bytes:
+			msg += (f" Estimated part sizes: {min(self.part_bytes) / sizecuts.MEGABYTE:.1f}-"
+			        f"{max(self.part_bytes) / sizecuts.MEGABYTE:.1f} MB "
+			        f"(cap {self.max_part_bytes / sizecuts.MEGABYTE:g} MB).")
+			if self.oversized:
+				msg += f" Over the cap anyway (one GOP is bigger): part(s) {', '.join(map(str, self.oversized))}."
+		return msg
+
+
+@dataclass
+class SplitOptions:
+	# "auto" reads the original in place unless its path is unsafe for ffmpeg,
+	# "inplace" always reads it in place, "link" hardlinks/reflinks it into the
+	# temp dir (copying only if that fails), "copy" always copies it first
+	source_mode: str = "auto"
+	# One of CUT_MODES
+	cut_mode: str = "keyframe"
+	# Cap on parts processed concurrently by the per-part and smart-cut paths;
+	# None means one per CPU
+	max_workers: Optional[int] = None
+	# Write `<base>_run.json` (stage timings, bytes, speed, path taken) next to the parts
+	write_report: bool = True
+	# Profile the coordinating thread with cProfile into `<base>_profile.pstats`
+	profile: bool = False
+	# Pick up where an earlier run of the same split stopped, using `<base>_manifest.json`
+	resume: bool = True
+	# Reuse (and add to) the content-addressed cache of finished splits (see resultcache)
+	use_cache: bool = True
+	# Output profiles written in one pass instead of the single segment_seconds split
+	renditions: List[OutputProfile] = field(default_factory=list)
+	# Write only the parts of the full split that overlap [range_start, range_end)
+	# and/or have these numbers (see selection.py); they keep the full split's numbers
+	range_start: Optional[float] = None
+	range_end: Optional[float] = None
+	only_parts: List[int] = field(default_factory=list)
+	# Cap on each part's file size; cuts then go on the keyframes that keep parts under
+	# it (see sizecuts.py) instead of following segment_seconds and cut_mode
+	max_part_bytes: Optional[int] = None
+	# Also write a poster and a contact strip of every part into `<base>_previews/`
+	# (see previews.py); doesn't apply to renditions
+	previews: bool = False
+	# Write the parts as fragmented MP4 and add `<base>.m3u8` (HLS) and `<base>.mpd`
+	# (DASH) playlists over them (see playlists.py); doesn't apply to renditions
+	playlists: bool = False
+
+	@property
+	def selective(self) -> bool:
+		return self.range_start is not None or self.range_end is not None or bool(self.only_parts)
+
+	@property
+	def cut_key(self) -> str:
+		"""What decides the cut points (and part layout), for telling manifests and cached splits apart."""
+		key = f"size:{self.max_part_bytes}" if self.max_part_bytes else self.cut_mode
+		return f"{key}+fmp4" if self.playlists and not self.renditions else key
+
+
+@dataclass
+class StreamPlan:
+	"""ffmpeg output arguments for writing a source's streams into MP4."""
+	args: List[str] = field(default_factory=list)
+	# Input stream indexes that have to be re-encoded
+	transcoded: List[int] = field(default_factory=list)
+	# Input stream indexes converted cheaply on the way (text subtitles to mov_text)
+	converted: List[int] = field(default_factory=list)
+	# Input streams left out because MP4 can't hold them, e.g. "#3 data (tmcd)"
+	dropped: List[str] = field(default_factory=list)
+	# The streams as the parts carry them, in output order
+	output: List[probe.StreamInfo] = field(default_factory=list)
+	# Input stream indexes of re-encoded video
+	transcoded_video: List[int] = field(default_factory=list)
+
+	@property
+	def is_copy(self) -> bool:
+		return not self.transcoded
+
+	@property
+	def transcodes_video(self) -> bool:
+		return bool(self.transcoded_video)
+
+
+@dataclass
+class SplitResult:
+	input_path: Path
+	output_dir: Path
+	parts: List[Path] = field(default_factory=list)
+	# "segment" for the single-pass split, "remux+segment" when an intermediate
+	# MP4 had to be written first, "per-part" for the fallback loop, "smart"
+	# for smart-cut parts, "silence" or "scene" for cuts moved to quiet
+	# keyframes or scene changes, "size" for size-capped parts, "resume" when an earlier run's parts were
+	# reused, "cache" when they were linked from the result cache,
+	# "renditions" for a multi-profile split, "selection" when only some parts
+	# were written
+	mode: str = "segment"
+	# How the input was staged: "inplace", "hardlink", "reflink" or "copy"
+	source: str = "inplace"
+	# Input streams the preflight left out of the parts (see plan_mp4_streams)
+	dropped_streams: List[str] = field(default_factory=list)
+	# `<base>.m3u8` and `<base>.mpd` when options.playlists made them
+	playlists: List[Path] = field(default_factory=list)
+	report_path: Optional[Path] = None
+	elapsed: float = 0.0
+
+
+def open_video_clip(path: Path):
+	"""Open path with MoviePy for the legacy re-encode fallback.
+
+	moviepy (and numpy, imageio, proglog behind it) is imported here rather than
+	at module level so startup and Analyze never pay for it.
+	"""
+	from moviepy.editor import VideoFileClip
+	return VideoFileClip(str(path))
+
+
+class _LazyClip:
+	"""Opens the MoviePy clip the first time a part actually needs it."""
+
+	def __init__(self, path: Path) -> None:
+		self.path = path
+		self._clip = None
+
+	def get(self):
+		if self._clip is None:
+			self._clip = open_video_clip(self.path)
+		return self._clip
+
+	def close(self) -> None:
+		if self._clip is not None:
+			self._clip.close()
+			self._clip = None
+
+
+def sanitize_basename(name: str) -> str:
+	# Remove characters invalid for filenames on Windows and compress spaces
+	# Also truncate aggressively to avoid path length issues (Windows 260 char limit)
+	if not name:
+		return "output"
+	safe = re.sub(r"[\\/\:*?\"<>|]", "_", name)
+	safe = re.sub(r"\s+", "_", safe).strip()  # Replace spaces with underscores
+	# Truncate to 30 chars to leave room for path, part numbers, and temp files
+	if len(safe) > 30:
+		safe = safe[:30]
+	return safe or "output"
+
+
+def resolve_output_dir(output_root: Optional[Path], input_path: Path, filename_base: str = "") -> Path:
+	"""Return the `<root>/Outputs/<base>` folder used for a split of input_path."""
+	base_dir = Path(output_root).expanduser() if output_root else Path.cwd()
+	base_name = sanitize_basename(filename_base.strip() or input_path.stem)
+	return base_dir / "Outputs" / base_name
+
+
+def part_filename(base: str, part_num: int, ext: str = ".mp4") -> str:
+	return f"{base}_part_{part_num:03d}{ext}"
+
+
+def _temp_path(prefix: str, suffix: str) -> Path:
+	"""Reserve a unique short file name in the temp directory.
+
+	Short names avoid path length issues; uniqueness matters because several
+	jobs may run at once in the same process.
+	"""
+	fd, name = tempfile.mkstemp(prefix=prefix, suffix=suffix, dir=tempfile.gettempdir())
+	os.close(fd)
+	path = Path(name)
+	with _TEMP_LOCK:
+		_TEMP_PATHS.add(path)
+	return path
+
+
+def _temp_dir(prefix: str) -> Path:
+	"""mkdtemp counterpart of _temp_path, registered for cleanup_temp_files the same way."""
+	path = Path(tempfile.mkdtemp(prefix=prefix))
+	with _TEMP_LOCK:
+		_TEMP_PATHS.add(path)
+	return path
+
+
+# Every cf_* temp file/dir this process created; whatever still exists at exit is a leftover
+_TEMP_PATHS: set = set()
+_TEMP_LOCK = threading.Lock()
+
+
+def cleanup_temp_files() -> None:
+	"""Remove temp files and dirs left behind by killed or interrupted jobs.
+
+	Only call this when no job is running (window closing, interpreter exit).
+	"""
+	with _TEMP_LOCK:
+		paths = list(_TEMP_PATHS)
+		_TEMP_PATHS.clear()
+	for path in paths:
+		try:
+			if path.is_dir():
+				shutil.rmtree(path, ignore_errors=True)
+			else:
+				path.unlink(missing_ok=True)
+		except OSError:
+			pass
+
+
+atexit.register(cleanup_temp_files)
+
+
+def _file_size(path: Path) -> int:
+	try:
+		return path.stat().st_size
+	except OSError:
+		return 0
+
+
+def needs_safe_path(path: Path) -> bool:
+	"""True if path is risky to hand to ffmpeg directly (long, or non-ASCII on Windows)."""
+	text = str(path)
+	if len(text) > SAFE_PATH_MAX:
+		return True
+	return sys.platform == "win32" and not text.isascii()
+
+
+def prepare_source(input_path: Path, mode: str, reporter: Reporter,
+                   cancel_event: Optional[threading.Event] = None) -> Tuple[Path, str]:
+	"""Return (path ffmpeg should read, how it was staged).
+
+	ffmpeg only ever reads the input, so the original is used in place unless
+	its path is unsafe or a copy is explicitly requested. A staged file is a
+	hardlink or reflink when the filesystem allows it; a real copy is the last
+	resort and goes through fileops.copy_file with progress and cancellation.
+	"""
+	if mode not in SOURCE_MODES:
+		raise ValueError(f"Unknown source mode: {mode}")
+	if mode == "inplace" or (mode == "auto" and not needs_safe_path(input_path)):
+		return input_path, "inplace"
+	# Use a short unique temp filename to avoid path length issues
+	staged = _temp_path("cf_", input_path.suffix)
+	if mode != "copy":
+		staged.unlink(missing_ok=True)
+		how = fileops.link_or_clone(input_path, staged)
+		if how:
+			return staged, how
+	reporter.status("Copying input to temp...")
+	start_time = time.time()
+
+	def on_copy(copied: int, total: int) -> None:
+		elapsed, remaining, pct = fileops.rate_progress(start_time, copied, total)
+		reporter.event(ProgressEvent("copy", pct, elapsed, remaining, bytes=copied, milestone=copied >= total))
+
+	try:
+		fileops.copy_file(input_path, staged, progress=on_copy, cancel_event=cancel_event)
+	except fileops.CopyCancelled:
+		staged.unlink(missing_ok=True)
+		raise SplitCancelled("Split cancelled")
+	return staged, "copy"
+
+
+def ffprobe_duration_seconds(path: Path, use_cache: bool = True) -> Optional[float]:
+	info = probe.probe(path, use_cache=use_cache)
+	if info is None or info.duration <= 0:
+		return None
+	return info.duration
+
+
+def plan_parts(total_seconds: float, segment_seconds: int) -> int:
+	return int(math.ceil(total_seconds / segment_seconds))
+
+
+def grid_boundaries(total_seconds: float, segment_seconds: float) -> List[float]:
+	"""Exact cut points every segment_seconds, ending at total_seconds."""
+	parts = plan_parts(total_seconds, segment_seconds)
+	return [i * segment_seconds for i in range(parts)] + [total_seconds]
+
+
+def keyframe_boundaries(keyframes: List[float], total_seconds: float, segment_seconds: float) -> List[float]:
+	"""Cut points the segment muxer will choose with stream copy.
+
+	It cuts at the first keyframe at or after each multiple of segment_seconds,
+	at most one cut per keyframe, and the grid never shifts after a late cut.
+	"""
+	bounds = [0.0]
+	n = 1
+	for t in keyframes:
+		if t >= total_seconds:
+			break
+		if t > 0 and t >= n * segment_seconds - 1e-3:
+			bounds.append(t)
+			n += 1
+	bounds.append(total_seconds)
+	return bounds
+
+
+def _is_mp4(path: Path) -> bool:
+	return path.suffix.lower() == ".mp4"
+
+
+def _video_copied(path: Path, info: probe.ProbeInfo, segment_seconds: int) -> bool:
+	"""True if the split stream-copies the video, so cuts can only fall on its keyframes."""
+	if not info.streams_of("video"):
+		return False
+	transcoded = plan_mp4_streams(info, segment_seconds, source_is_mp4=_is_mp4(path)).transcoded
+	return not any(s.index in transcoded for s in info.streams_of("video"))
+
+
+def quiet_cut_plan(path: Path, info: probe.ProbeInfo, segment_seconds: int,
+                   use_cache: bool = True) -> Optional[silence.QuietCutPlan]:
+	"""Cut points of cut mode "silence"; None without copied video, audio or NumPy.
+
+	The audio scan is cached per file, so Analyze and the split after it
+	decode the audio only once.
+	"""
+	audio = info.streams_of("audio")
+	if not audio or info.duration <= 0 or not _video_copied(path, info, segment_seconds):
+		return None
+	keyframes = probe.keyframe_index(path, use_cache=use_cache)
+	if not keyframes:
+		return None
+	return silence.plan_quiet_cuts(path, keyframes, info.duration, segment_seconds, audio[0].index,
+	                               use_cache=use_cache)
+
+
+def scene_cut_plan(path: Path, info: probe.ProbeInfo, segment_seconds: int,
+                   use_cache: bool = True) -> Optional[scenes.SceneCutPlan]:
+	"""Cut points of cut mode "scene"; None without copied video or NumPy."""
+	if info.duration <= 0 or not _video_copied(path, info, segment_seconds):
+		return None
+	keyframes = probe.keyframe_index(path, use_cache=use_cache)
+	if not keyframes:
+		return None
+	return scenes.plan_scene_cuts(path, keyframes, info.duration, segment_seconds, use_cache=use_cache)
+
+
+def size_cut_plan(path: Path, info: probe.ProbeInfo, max_part_bytes: int,
+                  use_cache: bool = True) -> Optional[sizecuts.SizeCutPlan]:
+	"""Cut points keeping parts under max_part_bytes; None unless every stream is copied and the packets can be read."""
+	video = info.main_video()
+	# Part sizes are summed from the source's packets, which only stream copy keeps (a re-encoded
+	# stream of any kind could push a part over the cap); the grid doesn't matter here
+	if video is None or info.duration <= 0 or not plan_mp4_streams(info, 1, source_is_mp4=_is_mp4(path)).is_copy:
+		return None
+	index = probe.packet_index(path, video.index, use_cache=use_cache)
+	if index is None:
+		return None
+	return sizecuts.plan_size_cuts(index, info.duration, max_part_bytes)
+
+
+def analyze_video(input_path: Path, segment_seconds: int, cut_mode: str = "keyframe",
+                  max_part_bytes: Optional[int] = None) -> Analysis:
+	"""Plan a split from ffprobe metadata and the keyframe index; no video is decoded.
+
+	Boundaries are the ones the stream-copy split will actually produce. When
+	video has to be re-encoded (keyframes are forced on the grid), the cut mode
+	is "smart", or no index is available they are the exact grid. Cut modes
+	"silence" and "scene" scan the audio track or the keyframes once to place
+	the cuts. With max_part_bytes the cuts come from the packet index instead
+	and the estimated part sizes are included.
+	"""
+	info = probe.probe(input_path)
+	if info is None:
+		raise ValueError("Could not read video (is ffprobe installed?)")
+	total_seconds = info.duration
+	if total_seconds <= 0:
+		raise ValueError("Video has unknown duration")
+	if max_part_bytes:
+		plan = size_cut_plan(input_path, info, max_part_bytes)
+		if plan is None:
+			raise ValueError(SIZE_CUT_UNAVAILABLE)
+		return Analysis(total_seconds, segment_seconds, plan.boundaries, keyframe_accurate=True, info=info,
+		                max_part_bytes=max_part_bytes, part_bytes=plan.part_bytes, oversized=plan.oversized)
+	if cut_mode == "silence":
+		plan = quiet_cut_plan(input_path, info, segment_seconds)
+		if plan is not None:
+			return Analysis(total_seconds, segment_seconds, plan.boundaries, keyframe_accurate=True, info=info,
+			                cut_levels=plan.levels, cut_shifts=plan.shifts)
+	if cut_mode == "scene":
+		plan = scene_cut_plan(input_path, info, segment_seconds)
+		if plan is not None:
+			return Analysis(total_seconds, segment_seconds, plan.boundaries, keyframe_accurate=True, info=info,
+			                cut_scores=plan.scores, cut_shifts=plan.shifts)
+	keyframes = None
+	if cut_mode != "smart" and _video_copied(input_path, info, segment_seconds):
+		keyframes = probe.keyframe_index(input_path)
+	if keyframes:
+		bounds = keyframe_boundaries(keyframes, total_seconds, segment_seconds)
+	else:
+		bounds = grid_boundaries(total_seconds, segment_seconds)
+	return Analysis(total_seconds, segment_seconds, bounds, keyframe_accurate=bool(keyframes), info=info)
+
+
+def _run_ffmpeg_progress(cmd: List[str], on_progress: Callable[[FfmpegProgress], None]) -> int:
+	"""Run an ffmpeg command that writes `-progress pipe:1`.
+
+	on_progress receives every complete progress block (output time, bytes
+	written, speed). Returns the process exit code.
+	"""
+	block = FfmpegProgress()
+
+	def on_line(line: str) -> None:
+		nonlocal block
+		if events.parse_progress_line(line.strip(), block):
+			on_progress(block)
+			block = FfmpegProgress(out_time=block.out_time, total_size=block.total_size)
+
+	return procrunner.run(cmd, on_line=on_line).returncode
+
+
+def _stage_event(stage: str, start_time: float, pct: float, **fields) -> ProgressEvent:
+	elapsed = time.time() - start_time
+	remaining = max(0.0, (elapsed / max(pct, 1e-6)) * (100.0 - pct))
+	return ProgressEvent(stage, pct, elapsed, remaining, **fields)
+
+
+def _run_with_progress(cmd: List[str], total_seconds: float, reporter: Reporter, stage: str = "encode",
+                       on_block: Optional[Callable[[FfmpegProgress], None]] = None) -> int:
+	"""Run an ffmpeg command that writes `-progress pipe:1` and forward progress events.
+
+	on_block, if given, sees every progress block before the event is sent.
+	Returns the process exit code.
+	"""
+	start_time = time.time()
+
+	def on_progress(block: FfmpegProgress) -> None:
+		if on_block is not None:
+			on_block(block)
+		if not total_seconds:
+			return
+		pct = min(100.0, (block.out_time / total_seconds) * 100.0)
+		reporter.event(_stage_event(stage, start_time, pct, bytes=block.total_size,
+		                            out_time=block.out_time, speed=block.speed))
+
+	return _run_ffmpeg_progress(cmd, on_progress)
+
+
+def _describe_stream(stream: probe.StreamInfo) -> str:
+	kind = "cover art" if stream.attached_pic else stream.codec_type or "unknown"
+	return f"#{stream.index} {kind} ({stream.codec_name or stream.codec_tag or 'unknown codec'})"
+
+
+def plan_mp4_streams(info: probe.ProbeInfo, segment_seconds: int, source_is_mp4: bool = False) -> StreamPlan:
+	"""Preflight: an explicit map of the source's streams into MP4, copying whatever MP4 can hold.
+
+	A bare `-map 0 -c copy` makes the muxer fail on the first data, timecode,
+	attachment or bitmap-subtitle stream, which used to knock the job off the
+	stream-copy path. Those streams are dropped and listed in plan.dropped;
+	text subtitles are converted to mov_text. Copied AAC gets aac_adtstoasc
+	(ADTS from MKV/TS is not valid in MP4). Re-encoded video gets forced
+	keyframes on the segment grid so parts stay exact.
+
+	An MP4 source already holds only streams MP4 can carry, so with
+	source_is_mp4 every stream is copied as it is and the codec lists above
+	only apply to other containers.
+	"""
+	plan = StreamPlan()
+	if source_is_mp4:
+		for out_idx, stream in enumerate(info.streams):
+			plan.args += ["-map", f"0:{stream.index}", f"-c:{out_idx}", "copy"]
+			plan.output.append(stream)
+		return plan
+	out_idx = 0
+	for stream in info.streams:
+		if stream.codec_type == "subtitle" and stream.codec_name in MP4_TEXT_SUBTITLE_CODECS:
+			plan.args += ["-map", f"0:{stream.index}", f"-c:{out_idx}",
+			              "copy" if stream.codec_name == "mov_text" else "mov_text"]
+			if stream.codec_name != "mov_text":
+				plan.converted.append(stream.index)
+			plan.output.append(replace(stream, codec_name="mov_text", profile="", level=0))
+			out_idx += 1
+			continue
+		if stream.attached_pic or stream.codec_type not in ("video", "audio"):
+			plan.dropped.append(_describe_stream(stream))
+			continue
+		plan.args += ["-map", f"0:{stream.index}"]
+		if stream.codec_type == "video":
+			if stream.codec_name in MP4_VIDEO_CODECS:
+				plan.args += [f"-c:{out_idx}", "copy"]
+				plan.output.append(stream)
+			else:
+				plan.transcoded.append(stream.index)
+				plan.transcoded_video.append(stream.index)
+				# libx264 picks the level from the frame size and rate, so it isn't known here
+				plan.output.append(replace(stream, codec_name="h264", profile="High", level=0, codec_tag=""))
+				plan.args += [
+					f"-c:{out_idx}", "libx264", f"-preset:{out_idx}", "veryfast", f"-crf:{out_idx}", "23",
+					f"-force_key_frames:{out_idx}", f"expr:gte(t,n_forced*{int(segment_seconds)})",
+				]
+		else:
+			if stream.codec_name in MP4_AUDIO_CODECS:
+				plan.args += [f"-c:{out_idx}", "copy"]
+				if stream.codec_name == "aac":
+					plan.args += [f"-bsf:{out_idx}", "aac_adtstoasc"]
+				plan.output.append(stream)
+			else:
+				plan.transcoded.append(stream.index)
+				plan.args += [f"-c:{out_idx}", "aac", f"-b:{out_idx}", "192k"]
+				plan.output.append(replace(stream, codec_name="aac", profile="LC", level=0, codec_tag=""))
+		out_idx += 1
+	return plan
+
+
+def split_with_ffmpeg_segment(input_path: Path, output_dir: Path, base: str, ext: str, segment_seconds: int) -> bool:
+	pattern = output_dir / f"{base}_part_%03d{ext}"
+	cmd = [
+		"ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+		"-i", str(input_path),
+		"-c", "copy", "-map", "0",
+		"-f", "segment", "-segment_time", str(int(segment_seconds)), "-segment_start_number", "1",
+		"-reset_timestamps", "1",
+		str(pattern),
+	]
+	try:
+		return procrunner.run(cmd).returncode == 0
+	except Exception:
+		return False
+
+
+@dataclass
+class SegmentEntry:
+	"""One line of the segment muxer's CSV segment list."""
+	filename: str
+	start: float
+	end: float
+
+
+class _SegmentListWatcher:
+	"""Reads entries the segment muxer appends to its list as each part closes."""
+
+	def __init__(self, path: Path) -> None:
+		self.path = path
+		self._offset = 0
+		self._pending = ""
+
+	def poll(self) -> List[SegmentEntry]:
+		try:
+			with open(self.path, "r", encoding="utf-8", newline="") as fh:
+				fh.seek(self._offset)
+				chunk = fh.read()
+				self._offset = fh.tell()
+		except OSError:
+			return []
+		data = self._pending + chunk
+		lines = data.split("\n")
+		# Keep a partially written last line for the next poll
+		self._pending = lines.pop()
+		entries = []
+		for row in csv.reader(line for line in lines if line.strip()):
+			try:
+				entries.append(SegmentEntry(row[0], float(row[1]), float(row[2])))
+			except (IndexError, ValueError):
+				continue
+		return entries
+
+
+def segment_with_progress(input_path: Path, output_dir: Path, base: str, ext: str, segment_seconds: int,
+                          total_seconds: float, reporter: Reporter, plan: Optional[StreamPlan] = None,
+                          on_segment: Optional[Callable[[SegmentEntry], None]] = None, seek: float = 0.0,
+                          start_number: int = 1, segment_times: Optional[List[float]] = None,
+                          frames_dir: Optional[Path] = None, video_index: int = 0, fragmented: bool = False) -> bool:
+	"""Cut input_path into parts with the segment muxer in a single pass.
+
+	Without a plan every stream is stream-copied as-is (MP4 sources). With a
+	plan from plan_mp4_streams the parts are written as MP4 straight from any
+	container, each one finalised with faststart.
+
+	Finished parts are taken from the muxer's own segment list, not guessed
+	from the output time; each one is reported as a milestone event and
+	passed to on_segment. on_segment runs on a worker thread, in part order,
+	and every call has finished when this returns.
+
+	seek starts reading at that input time (input seeking, so nothing before
+	it is demuxed) and start_number numbers the first part, which is how a
+	resumed split writes only its tail. total_seconds is then the length
+	still to cut; on_segment gets times on the input's timeline.
+
+	segment_times, if given, are the cut points to use instead of the
+	segment_seconds grid (planned cuts such as quiet keyframes); an empty
+	list writes a single part.
+
+	frames_dir, if given, gets a picture of every keyframe of the video
+	stream at video_index from the same pass (previews.frame_args). Only pass it when the video is
+	stream-copied: the keyframe-only decoding would break a re-encode.
+
+	fragmented writes the parts as fragmented MP4 (a fragment per keyframe,
+	moov up front) for the HLS/DASH playlists instead of using faststart.
+	"""
+	# Ensure output directory exists
+	output_dir.mkdir(parents=True, exist_ok=True)
+	pattern = output_dir / f"{base}_part_%03d{ext}"
+	movflags = "+frag_keyframe+empty_moov+default_base_moof" if fragmented else "+faststart"
+	if plan is None:
+		stream_args = ["-c", "copy", "-map", "0"]
+		if fragmented:
+			stream_args += ["-segment_format", "mp4", "-segment_format_options", f"movflags={movflags}"]
+	else:
+		stream_args = plan.args + ["-segment_format", "mp4", "-segment_format_options", f"movflags={movflags}"]
+	segment_list = _temp_path("cf_seglist_", ".csv")
+	seek_args = ["-ss", f"{seek:.6f}"] if seek > 0 else []
+	if segment_times:
+		cut_args = ["-segment_times", ",".join(f"{max(t - SEGMENT_TIME_SLACK, 0.0):.6f}" for t in segment_times)]
+	elif segment_times is not None:
+		# No cuts left: one part to the end
+		cut_args = ["-segment_time", str(int(math.ceil(total_seconds)) + 1)]
+	else:
+		cut_args = ["-segment_time", str(int(segment_seconds))]
+	decode_args = previews.DECODE_ARGS if frames_dir is not None else []
+	cmd = [
+		"ffmpeg", "-hide_banner", "-nostdin", "-y",
+		*seek_args, *decode_args, "-i", str(input_path),
+		*stream_args,
+		"-f", "segment", *cut_args, "-segment_start_number", str(start_number),
+		"-segment_list", str(segment_list), "-segment_list_type", "csv",
+		"-reset_timestamps", "1",
+		"-progress", "pipe:1",
+		str(pattern),
+	]
+	if frames_dir is not None:
+		cmd += previews.frame_args(frames_dir, video_index)
+	watcher = _SegmentListWatcher(segment_list)
+	if segment_times is not None:
+		parts_total = len(segment_times) + 1
+	else:
+		parts_total = plan_parts(total_seconds, segment_seconds) if total_seconds else 0
+	start_time = time.time()
+	done = 0
+	# on_segment checksums parts and saves the manifest; that stays off procrunner's loop thread,
+	# which reads the output of every running child. One worker keeps the calls in order
+	recording = ThreadPoolExecutor(max_workers=1, thread_name_prefix="segments") if on_segment is not None else None
+	recorded: List = []
+
+	def report_segments(block: Optional[FfmpegProgress]) -> None:
+		nonlocal done
+		for entry in watcher.poll():
+			done += 1
+			if recording is not None:
+				recorded.append(recording.submit(on_segment, SegmentEntry(entry.filename, entry.start + seek,
+				                                                          entry.end + seek)))
+			pct = min(100.0, (entry.end / total_seconds) * 100.0) if total_seconds else 0.0
+			reporter.event(_stage_event("segment", start_time, pct, part=done, parts_done=done,
+			                            parts_total=parts_total, out_time=entry.end,
+			                            speed=block.speed if block else 0.0, milestone=True))
+
+	try:
+		ok = _run_with_progress(cmd, total_seconds, reporter, stage="segment", on_block=report_segments) == 0
+		# The last part closes after the final progress block
+		report_segments(None)
+		for future in recorded:
+			future.result()
+		return ok
+	except Exception:
+		return False
+	finally:
+		if recording is not None:
+			recording.shutdown(wait=True)
+		segment_list.unlink(missing_ok=True)
+
+
+def chunk_boundaries(keyframes: List[float], total_seconds: float, chunks: int) -> List[float]:
+	"""Split [0, total_seconds] into about `chunks` pieces that each start on a keyframe."""
+	bounds = [0.0]
+	for i in range(1, chunks):
+		kf = smartcut.next_keyframe(keyframes, total_seconds * i / chunks)
+		if kf is not None and bounds[-1] + 1e-3 < kf < total_seconds:
+			bounds.append(kf)
+	bounds.append(total_seconds)
+	return bounds
+
+
+def chunked_transcode(input_path: Path, output_path: Path, total_seconds: float, reporter: Reporter,
+                      max_workers: Optional[int] = None, keyframe_seconds: int = 0) -> bool:
+	"""Re-encode input_path to H.264/AAC MP4 using several ffmpeg processes at once.
+
+	Video is cut at keyframes into chunks that are encoded concurrently and
+	joined with the concat demuxer without another encode. Audio is encoded
+	in a single pass alongside them, so chunk joins never carry AAC priming
+	gaps. keyframe_seconds, if given, forces keyframes on that grid of the
+	whole video, so a later stream-copy split into parts that long is exact.
+	Returns False when the source can't be chunked or a step fails; the
+	caller then runs the single-process encode.
+	"""
+	if total_seconds < CHUNKED_MIN_SECONDS:
+		return False
+	workers = part_workers(int(total_seconds // CHUNK_MIN_SECONDS), max_workers)
+	if workers < 2:
+		return False
+	keyframes = probe.keyframe_index(input_path)
+	if not keyframes:
+		return False
+	# A few more chunks than workers keeps every worker busy until the end
+	bounds = chunk_boundaries(keyframes, total_seconds, min(workers * 2, int(total_seconds // CHUNK_MIN_SECONDS)))
+	if len(bounds) < 3:
+		return False
+	info = probe.probe(input_path)
+	has_audio = bool(info and info.streams_of("audio"))
+	encode_threads = max(1, (os.cpu_count() or 1) // workers)
+	work_dir = _temp_dir("cf_chunks_")
+	tracker = _PartProgress(total_seconds, reporter, stage="encode", parts_total=len(bounds) - 1)
+
+	def encode_chunk(idx: int) -> bool:
+		start_t, end_t = bounds[idx], bounds[idx + 1]
+		keyframe_args = []
+		if keyframe_seconds:
+			# Chunk time starts at zero; count grid points from the first one at or after the chunk start
+			first = math.ceil(start_t / keyframe_seconds - 1e-6)
+			keyframe_args = ["-force_key_frames",
+			                 f"expr:gte(t+{start_t:.6f},(n_forced+{first})*{int(keyframe_seconds)})"]
+		cmd = [
+			"ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+			"-ss", f"{start_t:.6f}", "-i", str(input_path), "-t", f"{end_t - start_t:.6f}",
+			"-map", "0:v:0", "-an", "-sn", "-dn",
+			"-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-threads", str(encode_threads),
+			*keyframe_args,
+			"-progress", "pipe:1",
+			"-f", "mpegts", str(work_dir / f"c{idx:04d}.ts"),
+		]
+		return _run_ffmpeg_progress(cmd, lambda b: tracker.update(idx, min(b.out_time, end_t - start_t))) == 0
+
+	def encode_audio() -> bool:
+		cmd = [
+			"ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+			"-i", str(input_path), "-map", "0:a:0", "-vn", "-sn", "-dn",
+			"-c:a", "aac", "-b:a", "192k", str(work_dir / "audio.m4a"),
+		]
+		return procrunner.run(cmd).returncode == 0
+
+	try:
+		reporter.status(f"Re-encoding to MP4 in {len(bounds) - 1} chunks on {workers} workers...")
+		with ThreadPoolExecutor(max_workers=workers + (1 if has_audio else 0)) as pool:
+			futures = [procrunner.submit(pool, encode_chunk, i) for i in range(len(bounds) - 1)]
+			if has_audio:
+				futures.append(procrunner.submit(pool, encode_audio))
+			if not all(f.result() for f in futures):
+				return False
+		list_file = work_dir / "list.txt"
+		list_file.write_text("".join(f"file 'c{i:04d}.ts'\n" for i in range(len(bounds) - 1)), encoding="utf-8")
+		cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+		       "-f", "concat", "-safe", "0", "-i", str(list_file)]
+		if has_audio:
+			cmd += ["-i", str(work_dir / "audio.m4a"), "-map", "0:v:0", "-map", "1:a:0"]
+		cmd += ["-c", "copy", "-movflags", "+faststart", str(output_path)]
+		return procrunner.run(cmd).returncode == 0
+	except Exception:
+		return False
+	finally:
+		shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def chunked_encode_pays(info: probe.ProbeInfo, plan: StreamPlan, max_workers: Optional[int] = None) -> bool:
+	"""True if a split should re-encode the video in parallel chunks before cutting it.
+
+	The single segment pass runs one libx264 process over the whole file;
+	a source long enough for chunked_transcode to use several CPUs is
+	converted that way first and then cut by stream copy.
+	"""
+	if not plan.transcodes_video or info.duration < CHUNKED_MIN_SECONDS:
+		return False
+	return part_workers(int(info.duration // CHUNK_MIN_SECONDS), max_workers) >= 2
+
+
+def remux_to_mp4(input_path: Path, recorder: Optional[runreport.RunRecorder] = None,
+                 plan: Optional[StreamPlan] = None) -> Optional[Path]:
+	"""Stream-copy input_path into a temp MP4. None if the streams don't fit MP4.
+
+	With a stream-copy plan from plan_mp4_streams the streams are mapped
+	explicitly, so extra streams MP4 can't hold are dropped instead of
+	failing the remux.
+	"""
+	recorder = recorder or runreport.RunRecorder()
+	# Use temp directory for converted files to avoid path length issues
+	remux_out = _temp_path("cf_remux_", ".mp4")
+	if plan is not None and plan.is_copy:
+		stream_args = list(plan.args)
+	else:
+		stream_args = ["-c", "copy", "-map", "0", "-bsf:a", "aac_adtstoasc"]
+	remux_cmd = [
+		"ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+		"-i", str(input_path),
+		*stream_args,
+		"-movflags", "+faststart",
+		str(remux_out),
+	]
+	ok = False
+	try:
+		with recorder.stage("remux", bytes_read=_file_size(input_path)) as timing:
+			try:
+				ok = procrunner.run(remux_cmd).returncode == 0 and remux_out.exists()
+			except Exception:
+				pass
+			if ok:
+				timing.bytes_written = _file_size(remux_out)
+				return remux_out
+			timing.ok = False
+	finally:
+		# Also on cancel, which passes through the except above
+		if not ok:
+			remux_out.unlink(missing_ok=True)
+	return None
+
+
+def encode_to_mp4(input_path: Path, reporter: Reporter, max_workers: Optional[int] = None,
+                  recorder: Optional[runreport.RunRecorder] = None, keyframe_seconds: int = 0) -> Optional[Path]:
+	"""Re-encode input_path to a temp H.264/AAC MP4 with progress. None on failure.
+
+	Long sources are encoded in parallel chunks when CPUs are free; otherwise
+	(or if chunking fails) a single ffmpeg process does the whole file.
+	keyframe_seconds, if given, forces keyframes on that grid.
+	"""
+	recorder = recorder or runreport.RunRecorder()
+	input_bytes = _file_size(input_path)
+	encode_out = _temp_path("cf_encode_", ".mp4")
+	ok = False
+	try:
+		total_seconds = ffprobe_duration_seconds(input_path) or 0.0
+		if total_seconds >= CHUNKED_MIN_SECONDS:
+			with recorder.stage("chunked-encode", bytes_read=input_bytes) as timing:
+				ok = chunked_transcode(input_path, encode_out, total_seconds, reporter, max_workers,
+				                       keyframe_seconds=keyframe_seconds)
+				if ok:
+					timing.bytes_written = _file_size(encode_out)
+					return encode_out
+				timing.ok = False
+		cmd = [
+			"ffmpeg", "-hide_banner", "-nostdin", "-y",
+			"-i", str(input_path),
+			"-c:v", "libx264", "-preset", "veryfast", "-crf", "23",
+			"-c:a", "aac", "-b:a", "192k",
+			"-movflags", "+faststart",
+			"-progress", "pipe:1",
+			str(encode_out),
+		]
+		if keyframe_seconds:
+			cmd[-3:-3] = ["-force_key_frames", f"expr:gte(t,n_forced*{int(keyframe_seconds)})"]
+		with recorder.stage("encode", bytes_read=input_bytes) as timing:
+			try:
+				ok = _run_with_progress(cmd, total_seconds, reporter, stage="encode") == 0 and encode_out.exists()
+			except Exception:
+				pass
+			if ok:
+				timing.bytes_written = _file_size(encode_out)
+				return encode_out
+			timing.ok = False
+	finally:
+		if not ok:
+			encode_out.unlink(missing_ok=True)
+	return None
+
+
+def ensure_mp4_with_progress(input_path: Path, reporter: Reporter, max_workers: Optional[int] = None,
+                             recorder: Optional[runreport.RunRecorder] = None,
+                             plan: Optional[StreamPlan] = None, keyframe_seconds: int = 0) -> Path:
+	"""Return a path to an MP4 version of input_path.
+	Tries fast remux first (mapped by plan, if given); on failure, re-encodes to
+	H.264/AAC with progress, in parallel chunks when the source is long enough
+	and CPUs are free. A plan that re-encodes the video skips the remux.
+	keyframe_seconds is passed to encode_to_mp4.
+	With a recorder, the remux attempt and the encode are timed as separate stages.
+	"""
+	# If already mp4, return as-is
+	if input_path.suffix.lower() == ".mp4":
+		return input_path
+	converted = None
+	if plan is None or not plan.transcodes_video:
+		converted = remux_to_mp4(input_path, recorder, plan)
+	converted = converted or encode_to_mp4(input_path, reporter, max_workers, recorder, keyframe_seconds=keyframe_seconds)
+	# Fallback: return original
+	return converted or input_path
+
+
+def _write_part_moviepy(clip, start_t: float, end_t: float, part_num: int, output_path: Path) -> None:
+	"""Re-encode one part through MoviePy (last resort when stream copy fails)."""
+	# Create short temp directory for MoviePy to avoid long path issues
+	moviepy_temp_dir = _temp_dir("cf_mpy_")
+	original_temp = None
+	try:
+		# Set environment variable for MoviePy temp directory
+		original_temp = os.environ.get("TMPDIR") or os.environ.get("TEMP")
+		os.environ["TMPDIR"] = str(moviepy_temp_dir)
+		os.environ["TEMP"] = str(moviepy_temp_dir)
+
+		segment = clip.subclip(start_t, end_t)
+		temp_audiofile = str(moviepy_temp_dir / f"a{part_num:03d}.m4a")
+		# Ensure output path is short enough
+		if len(str(output_path)) > 200:
+			# If path is too long, move output to temp and copy
+			short_temp_output = moviepy_temp_dir / f"p{part_num:03d}.mp4"
+			segment.write_videofile(
+				str(short_temp_output), codec="libx264", audio_codec="aac",
+				threads=2, verbose=False, logger=None,
+				temp_audiofile=temp_audiofile
+			)
+			# Copy final file to desired location
+			shutil.copy2(str(short_temp_output), str(output_path))
+			try:
+				short_temp_output.unlink(missing_ok=True)
+			except Exception:
+				pass
+		else:
+			segment.write_videofile(
+				str(output_path), codec="libx264", audio_codec="aac",
+				threads=2, verbose=False, logger=None,
+				temp_audiofile=temp_audiofile
+			)
+	finally:
+		# Restore original temp directory
+		if original_temp:
+			os.environ["TMPDIR"] = original_temp
+			os.environ["TEMP"] = original_temp
+		# Clean up MoviePy temp directory
+		try:
+			for f in moviepy_temp_dir.glob("*"):
+				try:
+					f.unlink(missing_ok=True)
+				except Exception:
+					pass
+			moviepy_temp_dir.rmdir()
+		except Exception:
+			pass
+
+
+# MoviePy re-encodes mutate TMPDIR/TEMP and share one decoder, so they run one at a time
+_MOVIEPY_LOCK = threading.Lock()
+
+
+def part_workers(parts: int, max_workers: Optional[int] = None) -> int:
+	"""Size of the per-part pool: one per CPU, capped by max_workers and the part count."""
+	workers = os.cpu_count() or 1
+	if max_workers:
+		workers = min(workers, max_workers)
+	return max(1, min(workers, parts))
+
+
+class _PartProgress:
+	"""Folds the progress of concurrently running parts into one percent/ETA."""
+
+	def __init__(self, total_seconds: float, reporter: Reporter, stage: str = "parts", parts_total: int = 0) -> None:
+		self.total_seconds = total_seconds
+		self.reporter = reporter
+		self.stage = stage
+		self.parts_total = parts_total
+		self.start_time = time.time()
+		self._done: Dict[int, float] = {}
+		self._finished = 0
+		self._lock = threading.Lock()
+
+	def update(self, idx: int, seconds: float, finished: bool = False) -> None:
+		"""Record that part idx has produced `seconds` of output so far."""
+		with self._lock:
+			self._done[idx] = seconds
+			covered = sum(self._done.values())
+			if finished:
+				self._finished += 1
+			parts_done = self._finished
+		pct = min(100.0, (covered / self.total_seconds) * 100.0) if self.total_seconds else 0.0
+		self.reporter.event(_stage_event(self.stage, self.start_time, pct, part=idx + 1 if finished else None,
+		                                 parts_done=parts_done, parts_total=self.parts_total,
+		                                 out_time=covered, milestone=finished))
+
+
+def _run_parts(bounds: List[float], output_dir: Path, base: str, ext: str, reporter: Reporter,
+               max_workers: Optional[int], write_part: Callable[[int, float, float, Path, _PartProgress], bool],
+               cancel_event: Optional[threading.Event] = None, only: Optional[List[int]] = None,
+               on_part: Optional[Callable[[int, Path, float, float], None]] = None) -> List[Path]:
+	"""Write every [bounds[i], bounds[i+1]) part through write_part on a bounded pool.
+
+	Part numbers follow the position in bounds regardless of completion order.
+	Failed parts are reported and skipped. Returns the written parts in order.
+	only restricts the run to those part indexes (a resumed split); on_part
+	gets (part number, path, start, end) for each part as it is saved.
+	Once cancel_event is set, parts that haven't started are skipped and
+	SplitCancelled is raised after the running ones finish.
+	"""
+	output_dir.mkdir(parents=True, exist_ok=True)
+	parts = len(bounds) - 1
+	todo = sorted(set(only)) if only is not None else list(range(parts))
+	tracker = _PartProgress(sum(bounds[i + 1] - bounds[i] for i in todo), reporter, parts_total=len(todo))
+	written: Dict[int, Path] = {}
+	if not todo:
+		return []
+
+	def guarded(idx: int, start_t: float, end_t: float, output_path: Path) -> Optional[bool]:
+		if cancel_event is not None and cancel_event.is_set():
+			return None
+		return write_part(idx, start_t, end_t, output_path, tracker)
+
+	with ThreadPoolExecutor(max_workers=part_workers(len(todo), max_workers)) as pool:
+		futures = {}
+		for idx in todo:
+			output_path = output_dir / part_filename(base, idx + 1, ext)
+			futures[procrunner.submit(pool, guarded, idx, bounds[idx], bounds[idx + 1], output_path)] = (idx, output_path)
+		for fut in as_completed(futures):
+			idx, output_path = futures[fut]
+			part_num = idx + 1
+			try:
+				ok = fut.result()
+				if ok is None:
+					continue
+				error = "all methods failed"
+			except Exception as exc:
+				ok = False
+				error = str(exc)
+			if not ok:
+				reporter.error("Segment write failed", f"Part {part_num}: {error}")
+				continue
+			written[idx] = output_path
+			if on_part is not None:
+				on_part(part_num, output_path, bounds[idx], bounds[idx + 1])
+			tracker.update(idx, bounds[idx + 1] - bounds[idx], finished=True)
+			reporter.status(f"Saved part {part_num}/{parts}: {output_path.name} ({len(written)} done)")
+	_check_cancel(cancel_event)
+	return [written[i] for i in sorted(written)]
+
+
+def _split_per_part(mp4_source: Path, output_dir: Path, base: str, ext: str, segment_seconds: int,
+                    total_seconds: float, reporter: Reporter, max_workers: Optional[int] = None,
+                    recorder: Optional[runreport.RunRecorder] = None,
+                    cancel_event: Optional[threading.Event] = None, bounds: Optional[List[float]] = None,
+                    only: Optional[List[int]] = None,
+                    on_part: Optional[Callable[[int, Path, float, float], None]] = None,
+                    plan: Optional[StreamPlan] = None) -> List[Path]:
+	"""Cut parts concurrently; stream copy first, then an ffmpeg re-encode, MoviePy last.
+
+	bounds defaults to the segment_seconds grid; only and on_part are passed
+	to _run_parts. With a plan from plan_mp4_streams the stream copy maps and
+	writes the streams as the plan says instead of a bare copy; a plan that
+	re-encodes skips the copy, since one uncapped encoder per worker would
+	oversubscribe the CPUs, and goes straight to the thread-capped encode.
+	"""
+	recorder = recorder or runreport.RunRecorder()
+	if bounds is None:
+		bounds = grid_boundaries(total_seconds, segment_seconds)
+	workers = part_workers(len(only) if only is not None else len(bounds) - 1, max_workers)
+	# Split the CPUs between concurrent encodes instead of letting each grab them all
+	encode_threads = max(1, (os.cpu_count() or 1) // workers)
+	clip = _LazyClip(mp4_source)
+	stream_args = plan.args if plan is not None else ["-c", "copy"]
+	copy = plan is None or plan.is_copy
+
+	def write_part(idx: int, start_t: float, end_t: float, output_path: Path, tracker: _PartProgress) -> bool:
+		seg_len = max(0.01, end_t - start_t)
+		ffmpeg_cmd = [
+			"ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+			"-ss", f"{start_t}", "-i", str(mp4_source), "-t", f"{seg_len}",
+			*stream_args, "-avoid_negative_ts", "make_zero",
+			str(output_path),
+		]
+		try:
+			if copy and procrunner.run(ffmpeg_cmd, timeout=300).returncode == 0:
+				recorder.count("copy")
+				return True
+		except Exception:
+			pass
+		cmd = smartcut.encode_part_cmd(mp4_source, start_t, end_t, output_path, threads=encode_threads, progress=True)
+		try:
+			if _run_ffmpeg_progress(cmd, lambda b: tracker.update(idx, min(b.out_time, seg_len))) == 0:
+				recorder.count("ffmpeg-encode")
+				return True
+		except Exception:
+			pass
+		# MoviePy runs in-process and can't be killed; don't start it once cancelled
+		procrunner.check_cancelled()
+		with _MOVIEPY_LOCK:
+			_write_part_moviepy(clip.get(), start_t, end_t, idx + 1, output_path)
+		recorder.count("moviepy")
+		return True
+
+	try:
+		return _run_parts(bounds, output_dir, base, ext, reporter, max_workers, write_part, cancel_event,
+		                  only=only, on_part=on_part)
+	finally:
+		clip.close()
+
+
+def _split_smart(source: Path, output_dir: Path, base: str, ext: str, segment_seconds: int,
+                 info: probe.ProbeInfo, keyframes: List[float], reporter: Reporter,
+                 max_workers: Optional[int] = None, recorder: Optional[runreport.RunRecorder] = None,
+                 cancel_event: Optional[threading.Event] = None, bounds: Optional[List[float]] = None,
+                 only: Optional[List[int]] = None,
+                 on_part: Optional[Callable[[int, Path, float, float], None]] = None) -> List[Path]:
+	"""Write exact-length parts, re-encoding only each part's leading partial GOP."""
+	recorder = recorder or runreport.RunRecorder()
+	if bounds is None:
+		bounds = grid_boundaries(info.duration, segment_seconds)
+
+	def write_part(idx: int, start_t: float, end_t: float, output_path: Path, tracker: _PartProgress) -> bool:
+		work_dir = _temp_dir("cf_smart_")
+		try:
+			if smartcut.smart_cut_part(source, start_t, end_t, keyframes, info, output_path, work_dir):
+				recorder.count("smart")
+				return True
+			# Unsupported codec or a failed piece: re-encode just this part
+			if smartcut.encode_part(source, start_t, end_t, output_path):
+				recorder.count("encode")
+				return True
+			return False
+		finally:
+			shutil.rmtree(work_dir, ignore_errors=True)
+
+	return _run_parts(bounds, output_dir, base, ext, reporter, max_workers, write_part, cancel_event, only=only,
+	                  on_part=on_part)
+
+
+def _collect_parts(output_dir: Path, base: str, ext: str) -> List[Path]:
+	return sorted(output_dir.glob(f"{glob.escape(base)}_part_[0-9][0-9][0-9]{ext}"))
+
+
+def _parts_bytes(parts: List[Path]) -> int:
+	return sum(_file_size(p) for p in parts)
+
+
+def split_video(input_path: Path, output_dir: Path, segment_seconds: int, filename_base: str = "",
+                reporter: Optional[Reporter] = None, options: Optional[SplitOptions] = None,
+                cancel_event: Optional[threading.Event] = None) -> SplitResult:
+	"""Split input_path into `segment_seconds` long MP4 parts inside output_dir.
+
+	Raises on fatal errors (unknown duration, ffmpeg missing, ...) and
+	SplitCancelled once cancel_event is set: running ffmpeg processes are
+	killed within procrunner.CANCEL_POLL_SECONDS and temp files removed.
+	Individual
+	parts that cannot be written by the fallback path are reported through
+	reporter.error and skipped.
+
+	Unless options.write_report is off, `<base>_run.json` with per-stage wall
+	time, bytes and ffmpeg speed is written next to the parts, including for
+	failed runs. options.profile (or CLIPFORGE_PROFILE=1) additionally dumps
+	cProfile stats of the calling thread to `<base>_profile.pstats`; ffmpeg
+	itself and the part pool threads are not covered.
+
+	Every finished part is recorded in `<base>_manifest.json`. When a
+	manifest for the same input version and settings is already there (and
+	options.resume is on), intact parts are kept and only missing or damaged
+	ones are written again.
+	"""
+	options = options or SplitOptions()
+	input_path = Path(input_path)
+	output_dir = Path(output_dir)
+	# Sanitize and truncate base name aggressively to avoid path length issues
+	base = sanitize_basename(filename_base.strip() or input_path.stem)
+	recorder = runreport.RunRecorder()
+	reporter = _RecordingReporter(reporter or Reporter(), recorder)
+	result = SplitResult(input_path, output_dir)
+	report = runreport.RunReport(str(input_path), str(output_dir), segment_seconds, asdict(options),
+	                             input_bytes=_file_size(input_path))
+	profiler = None
+	if options.profile or os.environ.get("CLIPFORGE_PROFILE") == "1":
+		profiler = cProfile.Profile()
+		profiler.enable()
+	try:
+		# Every ffmpeg/ffprobe child of this job is killed once cancel_event is set
+		with procrunner.cancel_scope(cancel_event):
+			try:
+				_split_video(input_path, output_dir, segment_seconds, base, reporter, options, cancel_event, result,
+				             recorder)
+			except procrunner.Cancelled:
+				raise SplitCancelled("Split cancelled") from None
+		report.ok = True
+	except BaseException as exc:
+		report.error = f"{type(exc).__name__}: {exc}"
+		raise
+	finally:
+		if profiler is not None:
+			profiler.disable()
+			profile_path = output_dir / f"{base}_profile.pstats"
+			try:
+				output_dir.mkdir(parents=True, exist_ok=True)
+				profiler.dump_stats(str(profile_path))
+				report.profile = profile_path.name
+			except OSError:
+				pass
+		if options.write_report:
+			report.wall = round(result.elapsed, 4)
+			report.mode = result.mode
+			report.source = result.source
+			report.dropped_streams = list(result.dropped_streams)
+			report.parts = len(result.parts)
+			report.parts_bytes = _parts_bytes(result.parts)
+			report.methods = dict(recorder.methods)
+			report.stages = list(recorder.stages)
+			report_path = output_dir / f"{base}_run.json"
+			try:
+				output_dir.mkdir(parents=True, exist_ok=True)
+				report.write(report_path)
+				result.report_path = report_path
+			except OSError:
+				pass
+	return result
+
+
+def _segment_recorder(parts_manifest: manifest.SplitManifest, output_dir: Path,
+                      start_number: int = 1) -> Callable[[SegmentEntry], None]:
+	"""on_segment callback that adds each part the segment muxer closes to the manifest."""
+	nums = iter(range(start_number, 1 << 30))
+
+	def on_segment(entry: SegmentEntry) -> None:
+		parts_manifest.record(next(nums), output_dir / Path(entry.filename).name, entry.start, entry.end)
+
+	return on_segment
+
+
+def _resume_finished(parts_manifest: manifest.SplitManifest, good: List[manifest.PartEntry],
+                     bad: List[manifest.PartEntry]) -> bool:
+	if bad or not parts_manifest.complete:
+		return False
+	return parts_manifest.bounds is None or len(good) == len(parts_manifest.bounds) - 1
+
+
+def _write_planned_parts(source: Path, use_cache: bool, output_dir: Path, base: str, ext: str,
+                         segment_seconds: int, reporter: Reporter, options: SplitOptions,
+                         cancel_event: Optional[threading.Event], recorder: runreport.RunRecorder,
+                         parts_manifest: manifest.SplitManifest, bounds: List[float], todo: List[int],
+                         detail: str) -> Dict[int, Path]:
+	"""Write the parts at indexes todo of bounds, recording each in the manifest; returns them by number.
+
+	Each part is read with input seeking, so only its own bytes are read.
+	Smart-cut plans re-encode each part's leading partial GOP; keyframe plans
+	("segment" manifests) are stream-copied from their keyframes.
+	"""
+	written: Dict[int, Path] = {}
+	seek_bounds = bounds
+	if parts_manifest.mode == "segment":
+		# Segment-muxer starts are keyframes: seek just past them, record them as they were
+		seek_bounds = [b + RESUME_SEEK_NUDGE for b in bounds]
+
+	def on_part(num: int, path: Path, start: float, end: float) -> None:
+		parts_manifest.record(num, path, bounds[num - 1], bounds[num])
+		written[num] = path
+
+	done = None
+	with recorder.stage("probe"):
+		info = probe.probe(source, use_cache=use_cache)
+	if parts_manifest.mode == "smart":
+		with recorder.stage("keyframes"):
+			keyframes = probe.keyframe_index(source, use_cache=use_cache) if info else None
+		if info is not None and keyframes:
+			with recorder.stage("smart", detail=detail) as timing:
+				done = _split_smart(source, output_dir, base, ext, segment_seconds, info, keyframes, reporter,
+				                    max_workers=options.max_workers, recorder=recorder, cancel_event=cancel_event,
+				                    bounds=bounds, only=todo, on_part=on_part)
+				timing.bytes_written = _parts_bytes(done)
+	if done is None:
+		plan = plan_mp4_streams(info, segment_seconds, source_is_mp4=_is_mp4(source)) if info is not None else None
+		if plan is not None and not plan.is_copy:
+			detail += ", re-encode"
+		with recorder.stage("per-part", detail=detail) as timing:
+			done = _split_per_part(source, output_dir, base, ext, segment_seconds, bounds[-1], reporter,
+			                       max_workers=options.max_workers, recorder=recorder, cancel_event=cancel_event,
+			                       bounds=seek_bounds, only=todo, on_part=on_part, plan=plan)
+			timing.bytes_written = _parts_bytes(done)
+	return written
+
+
+def _resume_split(source: Path, use_cache: bool, output_dir: Path, base: str, ext: str, segment_seconds: int,
+                  reporter: Reporter, options: SplitOptions, cancel_event: Optional[threading.Event],
+                  recorder: runreport.RunRecorder, parts_manifest: manifest.SplitManifest,
+                  good: List[manifest.PartEntry], bad: List[manifest.PartEntry]) -> Optional[List[Path]]:
+	"""Write only the parts an earlier run left missing or damaged; None if it can't be resumed.
+
+	Parts from a planned run (per-part, smart, quiet or scene cuts) are
+	redone at their planned boundaries. Segment-muxer parts are redone at their recorded boundaries,
+	and if that run stopped early the rest is cut in one segment pass that
+	seeks straight to where the last recorded part ended.
+	"""
+	saved = {e.num: output_dir / e.filename for e in good}
+	entries = parts_manifest.entries()
+	bounds = parts_manifest.bounds
+	complete = True
+	if bounds is None:
+		# Segment-muxer parts are contiguous and numbered from 1
+		if [e.num for e in entries] != list(range(1, len(entries) + 1)):
+			return None
+		bounds = [e.start for e in entries] + [entries[-1].end]
+		todo = [e.num - 1 for e in bad]
+		tail_start = bounds[-1]
+		total_seconds = None
+		if not parts_manifest.complete:
+			with recorder.stage("probe"):
+				total_seconds = ffprobe_duration_seconds(source, use_cache=use_cache)
+			if not total_seconds:
+				return None
+		if total_seconds and total_seconds - tail_start > 0.05:
+			info = probe.probe(source, use_cache=use_cache)
+			plan = plan_mp4_streams(info, segment_seconds, source_is_mp4=_is_mp4(source)) if info is not None else None
+			reporter.status(f"Resuming: {len(good)} part(s) intact, cutting the rest from {int(tail_start)}s...")
+			complete = False
+			# The earlier run's grid: part n ends at the first keyframe at or after n * segment_seconds
+			before = len(entries)
+			grid = [n * segment_seconds for n in range(before + 1, plan_parts(total_seconds, segment_seconds))]
+			if plan is not None:
+				# The rest of that grid on the timeline of the seek; points it has already passed
+				# (a GOP longer than a part) cut at the next keyframe, as the earlier run would have
+				tail_times: List[float] = []
+				for t in grid:
+					tail_times.append(max(t - tail_start - RESUME_SEEK_NUDGE, (tail_times[-1] if tail_times else 0.0) + 0.001))
+				with recorder.stage("segment", detail="resume") as timing:
+					complete = segment_with_progress(
+						source, output_dir, base, ext, segment_seconds, total_seconds - tail_start, reporter, plan=plan,
+						on_segment=_segment_recorder(parts_manifest, output_dir, before + 1),
+						seek=tail_start + RESUME_SEEK_NUDGE, start_number=before + 1, segment_times=tail_times,
+						fragmented=options.playlists)
+					timing.ok = complete
+				for e in parts_manifest.entries()[before:]:
+					saved[e.num] = output_dir / e.filename
+			if not complete:
+				_check_cancel(cancel_event)
+				# Per-part from the last recorded end, cut where the segment muxer would have cut: the first
+				# keyframe at or after each grid point. Any tail parts the segment pass wrote are redone
+				with recorder.stage("keyframes"):
+					keyframes = probe.keyframe_index(source, use_cache=use_cache)
+				if not keyframes:
+					return None
+				first = len(bounds) - 1
+				for t in grid:
+					i = bisect.bisect_left(keyframes, t - 1e-3, bisect.bisect_right(keyframes, bounds[-1] + 1e-3))
+					if i == len(keyframes) or keyframes[i] >= total_seconds - 1e-3:
+						break
+					bounds.append(keyframes[i])
+				bounds.append(total_seconds)
+				parts_manifest.set_bounds(bounds)
+				todo += list(range(first, len(bounds) - 1))
+				for num in [n for n in saved if n > first]:
+					del saved[num]
+	else:
+		todo = [i for i in range(len(bounds) - 1) if i + 1 not in saved]
+	_check_cancel(cancel_event)
+
+	if todo:
+		reporter.status(f"Resuming: {len(saved)} part(s) intact, writing {len(todo)}...")
+		written = _write_planned_parts(source, use_cache, output_dir, base, ext, segment_seconds, reporter, options,
+		                               cancel_event, recorder, parts_manifest, bounds, todo, "resume")
+		saved.update(written)
+		# A failed tail pass put its parts in todo, so this alone decides
+		complete = len(written) == len(todo)
+	if complete:
+		parts_manifest.finish()
+	return [saved[n] for n in sorted(saved)]
+
+
+def _stage_input(input_path: Path, options: SplitOptions, reporter: Reporter, cancel_event: Optional[threading.Event],
+                 result: SplitResult, recorder: runreport.RunRecorder) -> Path:
+	# Read the original in place where possible; stage it only for unsafe paths
+	with recorder.stage("stage") as timing:
+		source, result.source = prepare_source(input_path, options.source_mode, reporter, cancel_event)
+		timing.detail = result.source
+		if result.source == "copy":
+			timing.bytes_read = timing.bytes_written = _file_size(source)
+	return source
+
+
+def _split_renditions(input_path: Path, output_dir: Path, base: str, ext: str, reporter: Reporter,
+                      options: SplitOptions, cancel_event: Optional[threading.Event], result: SplitResult,
+                      recorder: runreport.RunRecorder, job_start: float) -> None:
+	"""Write every profile in options.renditions with one ffmpeg pass over the input.
+
+	Each profile's parts go to `<output_dir>/<profile label>/`. Stream-copied
+	profiles cut on keyframes like the regular split; cut_mode, resume and
+	the result cache don't apply.
+	"""
+	profiles = options.renditions
+	source = _stage_input(input_path, options, reporter, cancel_event, result, recorder)
+	try:
+		_check_cancel(cancel_event)
+		with recorder.stage("probe"):
+			info = probe.probe(source, use_cache=source == input_path)
+		if info is None or info.duration <= 0:
+			raise ValueError("Video has unknown duration")
+		copy_profiles = [p for p in profiles if not p.needs_encode]
+		interval = renditions.keyframe_interval(copy_profiles) if copy_profiles else 1
+		stream_plan = plan_mp4_streams(info, interval, source_is_mp4=_is_mp4(source))
+		copy_args = stream_plan.args
+		if copy_profiles and stream_plan.dropped:
+			result.dropped_streams = list(stream_plan.dropped)
+			reporter.status(f"Leaving out stream(s) MP4 can't hold: {', '.join(stream_plan.dropped)}")
+		audio_args: List[str] = []
+		audio = info.streams_of("audio")
+		if audio:
+			audio_args = ["-map", f"0:{audio[0].index}"]
+			if audio[0].codec_name in MP4_AUDIO_CODECS:
+				audio_args += ["-c:a", "copy"] + (["-bsf:a", "aac_adtstoasc"] if audio[0].codec_name == "aac" else [])
+			else:
+				audio_args += ["-c:a", "aac", "-b:a", "192k"]
+		patterns = {}
+		for profile in profiles:
+			profile_dir = output_dir / profile.label
+			profile_dir.mkdir(parents=True, exist_ok=True)
+			patterns[profile] = profile_dir / f"{base}_part_%03d{ext}"
+		cmd = ["ffmpeg", "-hide_banner", "-nostdin", "-y", "-progress", "pipe:1", "-i", str(source)]
+		cmd += renditions.rendition_args(profiles, patterns, copy_args, audio_args)
+		labels = ", ".join(p.label for p in profiles)
+		reporter.status(f"Writing {len(profiles)} renditions in one pass ({labels})...")
+		result.mode = "renditions"
+		with recorder.stage("renditions", bytes_read=_file_size(source), detail=labels) as timing:
+			ok = _run_with_progress(cmd, info.duration, reporter, stage="renditions") == 0
+			timing.ok = ok
+			if not ok:
+				_check_cancel(cancel_event)
+				raise RuntimeError(f"ffmpeg failed writing renditions ({labels})")
+			for profile in profiles:
+				result.parts += _collect_parts(output_dir / profile.label, base, ext)
+			timing.bytes_written = _parts_bytes(result.parts)
+		reporter.event(ProgressEvent("done", 100.0, time.time() - job_start, 0.0, milestone=True))
+		reporter.status(f"All parts saved ({labels}).")
+	finally:
+		if source != input_path:
+			source.unlink(missing_ok=True)
+
+
+def _manifest_bounds(parts_manifest: manifest.SplitManifest) -> Optional[List[float]]:
+	"""Part boundaries a manifest pins down: its plan, or the parts of a finished segment run."""
+	if parts_manifest.bounds is not None:
+		return list(parts_manifest.bounds)
+	entries = parts_manifest.entries()
+	if not parts_manifest.complete or [e.num for e in entries] != list(range(1, len(entries) + 1)):
+		return None
+	return [e.start for e in entries] + [entries[-1].end] if entries else None
+
+
+def _split_selection(input_path: Path, output_dir: Path, segment_seconds: int, base: str, ext: str,
+                     reporter: Reporter, options: SplitOptions, cancel_event: Optional[threading.Event],
+                     result: SplitResult, recorder: runreport.RunRecorder, job_start: float) -> None:
+	"""Write only the selected parts of the full split, under the full split's part numbers.
+
+	Boundaries come from the manifest when it already describes this split,
+	otherwise from the same planning Analyze does (keyframe index, quiet or
+	scene cuts, the exact grid for smart cut). Selected parts an earlier run
+	of this split already wrote are kept if they still check out and span the
+	same times, whatever plan recorded them. The others are read with input
+	seeking and recorded in the manifest, so a later full run only writes the
+	rest. The result cache doesn't apply.
+	"""
+	manifest_file = manifest.manifest_path(output_dir, base)
+	parts_manifest = manifest.SplitManifest.load(manifest_file) if options.resume else None
+	previous = None
+	bounds = None
+	if parts_manifest is not None and parts_manifest.matches(input_path, segment_seconds, options.cut_key):
+		previous = parts_manifest
+		bounds = _manifest_bounds(parts_manifest)
+	if bounds is None:
+		with recorder.stage("plan") as timing:
+			analysis = analyze_video(input_path, segment_seconds, cut_mode=options.cut_mode,
+			                         max_part_bytes=options.max_part_bytes)
+			bounds = analysis.boundaries
+			timing.detail = f"{len(bounds) - 1} parts"
+		if options.cut_mode == "smart" and not options.max_part_bytes:
+			mode = "smart"
+		else:
+			mode = "segment" if analysis.keyframe_accurate else "per-part"
+		parts_manifest = manifest.SplitManifest(manifest_file, input_path, segment_seconds, options.cut_key)
+		parts_manifest.begin(mode, bounds)
+	todo = selection.select_parts(bounds, options.range_start, options.range_end, options.only_parts)
+	if not todo:
+		raise ValueError(f"The selection covers none of the {len(bounds) - 1} parts "
+		                 f"(the video is {bounds[-1]:.0f}s long)")
+	result.mode = "selection"
+	saved: Dict[int, Path] = {}
+	if previous is not None:
+		# e.g. the parts of an interrupted segment run, whose manifest pins no plan; unselected
+		# ones are carried over too, so a later full run doesn't redo them
+		for entry in previous.verify(output_dir)[0]:
+			i = entry.num - 1
+			if (i < len(bounds) - 1 and abs(entry.start - bounds[i]) <= PART_MATCH_SECONDS
+			        and abs(entry.end - bounds[i + 1]) <= PART_MATCH_SECONDS):
+				if parts_manifest is not previous:
+					parts_manifest.record(entry.num, output_dir / entry.filename, bounds[i], bounds[i + 1])
+				if i in todo:
+					saved[entry.num] = output_dir / entry.filename
+	missing = [i for i in todo if i + 1 not in saved]
+	written: Dict[int, Path] = {}
+	if missing:
+		source = _stage_input(input_path, options, reporter, cancel_event, result, recorder)
+		try:
+			_check_cancel(cancel_event)
+			reporter.status(f"Writing {len(missing)} of {len(bounds) - 1} parts "
+			                f"({bounds[missing[0]]:.0f}s-{bounds[missing[-1] + 1]:.0f}s)...")
+			written = _write_planned_parts(source, source == input_path, output_dir, base, ext, segment_seconds,
+			                               reporter, options, cancel_event, recorder, parts_manifest, bounds,
+			                               missing, "selection")
+		finally:
+			if source != input_path:
+				source.unlink(missing_ok=True)
+	written.update(saved)
+	result.parts = [written[n] for n in sorted(written)]
+	if len(parts_manifest.entries()) == len(bounds) - 1 and not parts_manifest.complete:
+		parts_manifest.finish()
+	reporter.event(ProgressEvent("done", 100.0, time.time() - job_start, 0.0, milestone=True))
+	reporter.status(f"{len(written)} of {len(todo)} selected part(s) saved.")
+
+
+def _write_previews(input_path: Path, output_dir: Path, base: str, reporter: Reporter, result: SplitResult,
+                    recorder: runreport.RunRecorder, frames_dir: Path) -> None:
+	"""Poster and contact strip of every part in result.parts (see previews.py).
+
+	Uses the keyframe pictures the segment pass left in frames_dir, or scans
+	the input for them if it left none. Problems are reported, not raised:
+	the parts are fine without previews.
+	"""
+	parts_manifest = manifest.SplitManifest.load(manifest.manifest_path(output_dir, base))
+	names = {p.name for p in result.parts}
+	parts = [(e.num, e.start, e.end) for e in (parts_manifest.entries() if parts_manifest else [])
+	         if e.filename in names]
+	folder = previews.preview_dir(output_dir, base)
+	with recorder.stage("previews") as timing:
+		info = probe.probe(input_path)
+		video = info.main_video() if info is not None else None
+		keyframes = probe.keyframe_index(input_path, video_index=video.index) if video is not None else None
+		frames = previews.frames(frames_dir)
+		timing.detail = "from the split pass"
+		if keyframes and parts and len(frames) != len(keyframes):
+			reporter.status("Reading keyframes for the previews...")
+			frames = previews.scan_keyframes(input_path, frames_dir, video.index)
+			timing.detail = "separate keyframe scan"
+		done = previews.write_previews(frames, keyframes or [], parts, folder, base)
+		timing.ok = done == len(result.parts)
+	if done == len(result.parts):
+		reporter.status(f"Previews saved to {folder.name}.")
+	else:
+		reporter.status(f"Previews made for {done} of {len(result.parts)} part(s) (the video's keyframes "
+		                "couldn't all be read).")
+
+
+def _write_playlists(output_dir: Path, base: str, reporter: Reporter, result: SplitResult,
+                     recorder: runreport.RunRecorder) -> None:
+	"""HLS and DASH playlists over the finished split (see playlists.py); reported, not raised, if they can't be made."""
+	parts_manifest = manifest.SplitManifest.load(manifest.manifest_path(output_dir, base))
+	if parts_manifest is None or not parts_manifest.complete:
+		reporter.status("No playlists: not all parts of the split are saved yet.")
+		return
+	entries = [(e.filename, e.start, e.end) for e in parts_manifest.entries()]
+	with recorder.stage("playlists") as timing:
+		try:
+			result.playlists = playlists.write_playlists(output_dir, base, entries, parts_manifest.streams)
+		except ValueError as exc:
+			timing.ok = False
+			timing.detail = str(exc)
+			reporter.status(f"No playlists: {exc} (parts from the per-part or smart-cut path can't be streamed).")
+			return
+		except OSError as exc:
+			timing.ok = False
+			reporter.status(f"Couldn't write the playlists: {exc}")
+			return
+	reporter.status(f"Playlists saved: {', '.join(p.name for p in result.playlists)}.")
+
+
+def _split_video(input_path: Path, output_dir: Path, segment_seconds: int, base: str, reporter: Reporter,
+                 options: SplitOptions, cancel_event: Optional[threading.Event], result: SplitResult,
+                 recorder: runreport.RunRecorder) -> None:
+	job_start = time.time()
+	ext = ".mp4"
+	frames_dir = _temp_dir("cf_frames_") if options.previews and not options.renditions else None
+	try:
+		if options.renditions:
+			_split_renditions(input_path, output_dir, base, ext, reporter, options, cancel_event, result, recorder,
+			                  job_start)
+			return
+		if options.selective:
+			_split_selection(input_path, output_dir, segment_seconds, base, ext, reporter, options, cancel_event,
+			                 result, recorder, job_start)
+		else:
+			_split_all(input_path, output_dir, segment_seconds, base, ext, reporter, options, cancel_event, result,
+			           recorder, job_start, frames_dir)
+		if frames_dir is not None and result.parts:
+			_write_previews(input_path, output_dir, base, reporter, result, recorder, frames_dir)
+		if options.playlists and result.parts:
+			_write_playlists(output_dir, base, reporter, result, recorder)
+	finally:
+		result.elapsed = time.time() - job_start
+		if frames_dir is not None:
+			shutil.rmtree(frames_dir, ignore_errors=True)
+
+
+def _split_all(input_path: Path, output_dir: Path, segment_seconds: int, base: str, ext: str, reporter: Reporter,
+               options: SplitOptions, cancel_event: Optional[threading.Event], result: SplitResult,
+               recorder: runreport.RunRecorder, job_start: float, frames_dir: Optional[Path]) -> None:
+	"""The whole split: resume it, link it from the result cache, or write it."""
+	# A manifest from an interrupted run of this split lets us skip its intact parts
+	manifest_file = manifest.manifest_path(output_dir, base)
+	parts_manifest = manifest.SplitManifest.load(manifest_file) if options.resume else None
+	resume = None
+	if (parts_manifest is not None and parts_manifest.matches(input_path, segment_seconds, options.cut_key)
+	        and parts_manifest.entries()):
+		with recorder.stage("verify") as timing:
+			good, bad = parts_manifest.verify(output_dir)
+			timing.bytes_read = sum(e.size for e in good)
+			timing.detail = f"{len(good)} intact, {len(bad)} to redo"
+		if _resume_finished(parts_manifest, good, bad):
+			result.mode = "resume"
+			result.parts = [output_dir / e.filename for e in good]
+			reporter.status(f"All {len(good)} parts are already saved.")
+			return
+		resume = (good, bad)
+	else:
+		parts_manifest = manifest.SplitManifest(manifest_file, input_path, segment_seconds, options.cut_key)
+
+	# The same content split with the same settings before (any name, any folder). Previews and
+	# playlists are written alongside a fresh split, so those skip the cache
+	use_cache = options.use_cache and not options.previews and not options.playlists
+	cache = resultcache.default_cache() if use_cache else None
+	cache_key = None
+	if cache is not None:
+		with recorder.stage("cache") as timing:
+			cache_key = resultcache.content_key(input_path, segment_seconds, options.cut_key)
+			entry = cache.lookup(cache_key) if cache_key else None
+			hit = False
+			if entry is not None:
+				output_dir.mkdir(parents=True, exist_ok=True)
+				targets = [output_dir / part_filename(base, p.num, ext) for p in entry.parts]
+				hit = cache.materialize(entry, targets)
+			timing.detail = "hit" if hit else "miss"
+		if hit:
+			# A finished manifest for the placed parts (replacing one an interrupted run left), so
+			# they can be verified and resumed like the parts of any other split
+			parts_manifest = manifest.SplitManifest(manifest_file, input_path, segment_seconds, options.cut_key)
+			parts_manifest.begin(entry.plan_mode, entry.bounds)
+			parts_manifest.describe(entry.streams)
+			for part, target in zip(entry.parts, targets):
+				parts_manifest.record(part.num, target, part.start, part.end)
+			parts_manifest.finish()
+			result.mode = "cache"
+			result.parts = targets
+			reporter.event(ProgressEvent("done", 100.0, time.time() - job_start, 0.0, milestone=True))
+			reporter.status(f"Reused {len(targets)} cached part(s) from an earlier split of the same video.")
+			return
+
+	_split_source(input_path, output_dir, segment_seconds, base, ext, reporter, options, cancel_event, result,
+	              recorder, parts_manifest, resume, job_start, frames_dir)
+	if cache_key is not None and parts_manifest.complete and result.parts:
+		with recorder.stage("cache") as timing:
+			# The manifest lists exactly this split's parts; the folder may hold stale extras
+			timing.ok = cache.store(cache_key, output_dir, parts_manifest, result.mode)
+			timing.detail = "stored" if timing.ok else "not stored"
+
+
+def _split_source(input_path: Path, output_dir: Path, segment_seconds: int, base: str, ext: str, reporter: Reporter,
+                  options: SplitOptions, cancel_event: Optional[threading.Event], result: SplitResult,
+                  recorder: runreport.RunRecorder, parts_manifest: manifest.SplitManifest,
+                  resume: Optional[Tuple[List[manifest.PartEntry], List[manifest.PartEntry]]],
+                  job_start: float, frames_dir: Optional[Path] = None) -> None:
+	"""Stage the input and write the parts by the fastest path that works (or resume them).
+
+	frames_dir is where a full segment pass also puts the keyframe pictures
+	for previews; paths that don't make one leave it empty.
+	"""
+	tmp_input = None
+	mp4_source = None
+	mp4_source_is_temp = False
+	try:
+		source = _stage_input(input_path, options, reporter, cancel_event, result, recorder)
+		if source != input_path:
+			tmp_input = source
+		source_bytes = _file_size(source)
+		_check_cancel(cancel_event)
+
+		if resume is not None:
+			parts = _resume_split(source, source == input_path, output_dir, base, ext, segment_seconds, reporter,
+			                      options, cancel_event, recorder, parts_manifest, *resume)
+			if parts is not None:
+				result.mode = "resume"
+				result.parts = parts
+				reporter.event(ProgressEvent("done", 100.0, time.time() - job_start, 0.0, milestone=True))
+				reporter.status("All parts saved.")
+				return
+
+		with recorder.stage("probe"):
+			info = probe.probe(source, use_cache=source == input_path)
+		# Preflight: every stream-copy pass below maps the streams explicitly
+		plan = plan_mp4_streams(info, segment_seconds, source_is_mp4=_is_mp4(source)) if info is not None else None
+		if plan is not None and plan.dropped:
+			result.dropped_streams = list(plan.dropped)
+			reporter.status(f"Leaving out stream(s) MP4 can't hold: {', '.join(plan.dropped)}")
+		if plan is not None:
+			parts_manifest.describe(playlists.describe_streams(plan.output))
+		# Keyframe pictures ride along only with a stream-copied video
+		video = info.main_video() if info is not None else None
+		source_frames = frames_dir if video is not None and _video_copied(source, info, segment_seconds) else None
+		frames_video = video.index if video is not None else 0
+
+		if options.cut_mode == "smart" and not options.max_part_bytes:
+			with recorder.stage("keyframes"):
+				keyframes = probe.keyframe_index(source, use_cache=source == input_path) if info else None
+			if info is not None and info.duration > 0 and keyframes:
+				reporter.status(f"Splitting into {plan_parts(info.duration, segment_seconds)} exact parts (smart cut)...")
+				result.mode = "smart"
+				bounds = grid_boundaries(info.duration, segment_seconds)
+				parts_manifest.begin("smart", bounds)
+				with recorder.stage("smart", bytes_read=source_bytes) as timing:
+					result.parts = _split_smart(source, output_dir, base, ext, segment_seconds, info, keyframes, reporter,
+					                            max_workers=options.max_workers, recorder=recorder,
+					                            cancel_event=cancel_event, bounds=bounds,
+					                            on_part=parts_manifest.record)
+					timing.bytes_written = _parts_bytes(result.parts)
+				if len(result.parts) == len(bounds) - 1:
+					parts_manifest.finish()
+				return
+			# No video keyframes to work with: the regular path below is exact enough
+
+		planned = "size" if options.max_part_bytes else options.cut_mode
+		if planned in ("size", "silence", "scene"):
+			use_cache = source == input_path
+			with recorder.stage(planned) as timing:
+				cuts = None
+				if info is not None and planned == "size":
+					cuts = size_cut_plan(source, info, options.max_part_bytes, use_cache=use_cache)
+				elif info is not None:
+					planner = quiet_cut_plan if planned == "silence" else scene_cut_plan
+					cuts = planner(source, info, segment_seconds, use_cache=use_cache)
+				timing.ok = cuts is not None
+			if planned == "size":
+				if cuts is None:
+					raise ValueError(SIZE_CUT_UNAVAILABLE)
+				where = f"parts under {options.max_part_bytes / sizecuts.MEGABYTE:g} MB"
+				if cuts.oversized:
+					reporter.status(f"Part(s) {', '.join(map(str, cuts.oversized))} will be over the cap: "
+					                "a single keyframe interval is bigger")
+			else:
+				where = "cuts at quiet keyframes" if planned == "silence" else "cuts at scene changes"
+			if cuts is not None:
+				bounds = cuts.boundaries
+				reporter.status(f"Splitting into {len(bounds) - 1} parts ({where})...")
+				parts_manifest.begin("segment", bounds)
+				with recorder.stage("segment", bytes_read=source_bytes, detail=where) as timing:
+					ok = segment_with_progress(source, output_dir, base, ext, segment_seconds, info.duration, reporter,
+					                           plan=plan, on_segment=_segment_recorder(parts_manifest, output_dir),
+					                           segment_times=bounds[1:-1], frames_dir=source_frames,
+					                           video_index=frames_video, fragmented=options.playlists)
+					timing.ok = ok
+				if ok:
+					parts_manifest.finish()
+					result.mode = planned
+					result.parts = parts_manifest.paths(output_dir)
+					timing.bytes_written = _parts_bytes(result.parts)
+					reporter.event(ProgressEvent("done", 100.0, time.time() - job_start, 0.0, milestone=True))
+					reporter.status("All parts saved.")
+					return
+				_check_cancel(cancel_event)
+				# Keep the planned cuts: write whatever the pass didn't finish part by part
+				parts = _resume_split(source, source == input_path, output_dir, base, ext, segment_seconds, reporter,
+				                      options, cancel_event, recorder, parts_manifest,
+				                      *parts_manifest.verify(output_dir))
+				if parts:
+					result.mode = "per-part"
+					result.parts = parts
+					return
+				if planned == "size":
+					# Grid parts could be over the cap; better no parts than wrong ones
+					raise RuntimeError("Size-capped split failed")
+			else:
+				needs = "an audio track and " if planned == "silence" else ""
+				reporter.status(f"Can't place {where} (needs NumPy, {needs}stream-copied video); "
+				                "cutting on the regular grid...")
+
+		# Non-MP4 containers: cut MP4 parts straight from the original in one pass,
+		# re-encoding only the streams MP4 can't carry. Video that has to be re-encoded
+		# goes through the parallel chunked encode below instead when that pays off
+		if source.suffix.lower() != ".mp4":
+			chunked = info is not None and chunked_encode_pays(info, plan, options.max_workers)
+			if (not chunked and info is not None and info.duration > 0
+			        and (info.streams_of("video") or info.streams_of("audio"))):
+				parts = plan_parts(info.duration, segment_seconds)
+				label = "fast mode" if plan.is_copy else "re-encoding incompatible streams"
+				reporter.status(f"Splitting into {parts} parts ({label})...")
+				parts_manifest.begin("segment")
+				with recorder.stage("segment", bytes_read=source_bytes, detail=label) as timing:
+					ok = segment_with_progress(source, output_dir, base, ext, segment_seconds, info.duration, reporter,
+					                           plan=plan, on_segment=_segment_recorder(parts_manifest, output_dir),
+					                           frames_dir=source_frames, video_index=frames_video, fragmented=options.playlists)
+					timing.ok = ok
+				if ok:
+					parts_manifest.finish()
+					result.parts = parts_manifest.paths(output_dir)
+					timing.bytes_written = _parts_bytes(result.parts)
+					reporter.event(ProgressEvent("done", 100.0, time.time() - job_start, 0.0, milestone=True))
+					reporter.status("All parts saved.")
+					return
+			_check_cancel(cancel_event)
+			result.mode = "remux+segment"
+
+		# Ensure MP4 source (fast remux first, then re-encode if needed) and get duration
+		reporter.status("Converting to MP4 (if needed)...")
+		mp4_source = ensure_mp4_with_progress(source, reporter, max_workers=options.max_workers, recorder=recorder,
+		                                      plan=plan, keyframe_seconds=segment_seconds)
+		# Check if mp4_source is a temp file (different from the source we read)
+		if mp4_source != source:
+			mp4_source_is_temp = True
+		# Probe duration quickly via ffprobe to avoid opening via MoviePy
+		with recorder.stage("probe"):
+			total_seconds = ffprobe_duration_seconds(mp4_source, use_cache=not mp4_source_is_temp)
+			if total_seconds is None:
+				with open_video_clip(mp4_source) as clip:
+					total_seconds = float(clip.duration or 0)
+		if not total_seconds or total_seconds <= 0:
+			raise ValueError("Video has unknown duration")
+		_check_cancel(cancel_event)
+		parts = plan_parts(total_seconds, segment_seconds)
+		reporter.status(f"Splitting into {parts} parts (fast mode)...")
+
+		# Fast single-pass segmentation with live progress
+		mp4_bytes = _file_size(mp4_source)
+		parts_manifest.begin("segment")
+		with recorder.stage("segment", bytes_read=mp4_bytes) as timing:
+			# A converted MP4 holds only streams MP4 can carry; the original still needs the preflight map.
+			# Its stream indexes differ from the source's, so its previews come from a separate scan
+			ok = segment_with_progress(mp4_source, output_dir, base, ext, segment_seconds, total_seconds, reporter,
+			                           plan=plan if mp4_source == source else None,
+			                           on_segment=_segment_recorder(parts_manifest, output_dir),
+			                           frames_dir=source_frames if mp4_source == source else None,
+			                           video_index=frames_video, fragmented=options.playlists)
+			timing.ok = ok
+		if ok:
+			parts_manifest.finish()
+			result.parts = parts_manifest.paths(output_dir)
+			timing.bytes_written = _parts_bytes(result.parts)
+			reporter.event(ProgressEvent("done", 100.0, time.time() - job_start, 0.0, milestone=True))
+			reporter.status("All parts saved.")
+		else:
+			_check_cancel(cancel_event)
+			# Fallback to older per-part approach if needed
+			result.mode = "per-part"
+			reporter.status(f"Fast split failed; writing {parts} parts individually...")
+			bounds = grid_boundaries(total_seconds, segment_seconds)
+			parts_manifest.begin("per-part", bounds)
+			part_plan = plan if mp4_source == source else None
+			copies = part_plan is None or part_plan.is_copy
+			with recorder.stage("per-part", bytes_read=mp4_bytes, detail="" if copies else "re-encode") as timing:
+				result.parts = _split_per_part(mp4_source, output_dir, base, ext, segment_seconds, total_seconds,
+				                               reporter, max_workers=options.max_workers, recorder=recorder,
+				                               cancel_event=cancel_event, bounds=bounds,
+				                               on_part=parts_manifest.record, plan=part_plan)
+				timing.bytes_written = _parts_bytes(result.parts)
+			if len(result.parts) == len(bounds) - 1:
+				parts_manifest.finish()
+	finally:
+		# Clean up temp files
+		try:
+			if mp4_source_is_temp and mp4_source is not None and mp4_source.exists():
+				mp4_source.unlink(missing_ok=True)
+		except Exception:
+			pass
+		try:
+			if tmp_input is not None and tmp_input.exists():
+				tmp_input.unlink(missing_ok=True)
+		except Exception:
+			pass
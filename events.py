@@ -0,0 +1,139 @@
+"""Structured progress events and the helpers that throttle them.
+
+The engine emits a ProgressEvent for every ffmpeg progress block, copy
+chunk and finished part. Consumers never see that raw rate: the GUI drains a
+Coalescer on its own refresh timer, and push-style sinks (console, JSON log)
+go through a RateLimiter that only lets milestones through unthrottled.
+"""
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Optional, TextIO
+
+
+@dataclass
+class FfmpegProgress:
+	"""One `-progress pipe:1` block."""
+	out_time: float = 0.0
+	total_size: int = 0
+	speed: float = 0.0
+	done: bool = False
+
+
+@dataclass
+class ProgressEvent:
+	# "copy", "remux", "encode", "segment", "parts", "done"
+	stage: str
+	pct: float
+	elapsed: float = 0.0
+	remaining: float = 0.0
+	# Part that just finished (1-based) for part completions
+	part: Optional[int] = None
+	parts_done: int = 0
+	parts_total: int = 0
+	# Bytes copied or written so far in this stage
+	bytes: int = 0
+	# Output position in seconds and ffmpeg speed (x realtime)
+	out_time: float = 0.0
+	speed: float = 0.0
+	# Part completions and stage ends; throttling never drops these
+	milestone: bool = False
+
+	def to_dict(self) -> dict:
+		return asdict(self)
+
+
+def parse_progress_line(line: str, block: FfmpegProgress) -> bool:
+	"""Fold one `key=value` line into block. True when the block is complete."""
+	key, _, value = line.partition("=")
+	if key in ("out_time_us", "out_time_ms"):
+		# Both are microseconds (out_time_ms is misnamed in ffmpeg)
+		try:
+			block.out_time = float(value) / 1000000.0
+		except ValueError:
+			pass
+	elif key == "total_size":
+		try:
+			block.total_size = int(value)
+		except ValueError:
+			pass
+	elif key == "speed":
+		try:
+			block.speed = float(value.rstrip("x"))
+		except ValueError:
+			block.speed = 0.0
+	elif key == "progress":
+		block.done = value == "end"
+		return True
+	return False
+
+
+class RateLimiter:
+	"""Lets an event through at most every `interval` seconds, milestones always."""
+
+	def __init__(self, interval: float) -> None:
+		self.interval = interval
+		self._last = 0.0
+		self._lock = threading.Lock()
+
+	def ready(self, event: ProgressEvent) -> bool:
+		now = time.monotonic()
+		with self._lock:
+			if event.milestone or event.pct >= 100.0 or now - self._last >= self.interval:
+				self._last = now
+				return True
+		return False
+
+
+class Coalescer:
+	"""Holds only the newest event and status text for a polling consumer.
+
+	Producers (worker threads) call push/set_status as often as they like;
+	the consumer calls take() at its own refresh rate and gets at most one
+	event per tick, so the UI never queues work per ffmpeg line.
+	"""
+
+	def __init__(self) -> None:
+		self._lock = threading.Lock()
+		self._event: Optional[ProgressEvent] = None
+		self._status: Optional[str] = None
+
+	def push(self, event: ProgressEvent) -> None:
+		with self._lock:
+			self._event = event
+
+	def set_status(self, text: str) -> None:
+		with self._lock:
+			self._status = text
+
+	def take(self):
+		"""Return (event, status) seen since the last call; either may be None."""
+		with self._lock:
+			event, status = self._event, self._status
+			self._event = self._status = None
+		return event, status
+
+
+class JsonlEventLog:
+	"""Appends rate-limited events as JSON lines, one limiter per job."""
+
+	def __init__(self, path: Path, interval: float = 1.0) -> None:
+		self.interval = interval
+		self._fh: TextIO = open(path, "a", encoding="utf-8")
+		self._lock = threading.Lock()
+		self._limiters: Dict[str, RateLimiter] = {}
+
+	def write(self, job: str, event: ProgressEvent) -> None:
+		with self._lock:
+			limiter = self._limiters.setdefault(job, RateLimiter(self.interval))
+			if not limiter.ready(event):
+				return
+			record = {"time": round(time.time(), 3), "job": job, **event.to_dict()}
+			self._fh.write(json.dumps(record) + "\n")
+			self._fh.flush()
+
+	def close(self) -> None:
+		with self._lock:
+			self._fh.close()
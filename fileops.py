@@ -0,0 +1,167 @@
+"""File placement helpers: hardlinks, reflinks, kernel-side copies and digests.
+
+Used to stage inputs without duplicating them on disk. Copies go through
+`copy_file_range`/`sendfile` where the OS has them, so data never passes
+through Python buffers, and they report progress and honour cancellation.
+"""
+import hashlib
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+# Bytes moved per kernel call; small enough to keep progress and cancel responsive
+COPY_CHUNK = 64 * 1024 * 1024
+
+# ioctl number for FICLONE (Btrfs, XFS, bcachefs, OCFS2 on Linux)
+_FICLONE = 0x40049409
+
+# sample_digest reads this many bytes at each of its sample points
+SAMPLE_BYTES = 256 * 1024
+# Files up to this size are hashed in full by sample_digest
+SAMPLE_FULL_MAX = 4 * SAMPLE_BYTES
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class CopyCancelled(Exception):
+	"""Raised when a copy is stopped through its cancel event."""
+
+
+def try_hardlink(src: Path, dst: Path) -> bool:
+	try:
+		os.link(str(src), str(dst))
+		return True
+	except (OSError, AttributeError, NotImplementedError):
+		return False
+
+
+def try_reflink(src: Path, dst: Path) -> bool:
+	"""Clone src into dst sharing extents (copy-on-write). Linux only."""
+	if not sys.platform.startswith("linux"):
+		return False
+	try:
+		import fcntl
+	except ImportError:
+		return False
+	try:
+		with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+			fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+		return True
+	except OSError:
+		try:
+			dst.unlink(missing_ok=True)
+		except OSError:
+			pass
+		return False
+
+
+def link_or_clone(src: Path, dst: Path) -> Optional[str]:
+	"""Place src at dst without copying data. Returns "hardlink", "reflink" or None."""
+	if try_hardlink(src, dst):
+		return "hardlink"
+	if try_reflink(src, dst):
+		return "reflink"
+	return None
+
+
+def _kernel_copy(fsrc, fdst, size: int, on_chunk: Callable[[int], None]) -> None:
+	in_fd = fsrc.fileno()
+	out_fd = fdst.fileno()
+	copy_range = getattr(os, "copy_file_range", None)
+	# sendfile() to a regular file only works on Linux
+	sendfile = getattr(os, "sendfile", None) if sys.platform.startswith("linux") else None
+	offset = 0
+	while offset < size:
+		count = min(COPY_CHUNK, size - offset)
+		sent = 0
+		if copy_range is not None:
+			try:
+				sent = copy_range(in_fd, out_fd, count)
+			except OSError:
+				# Cross-filesystem on older kernels (EXDEV) or unsupported fs
+				copy_range = None
+		if copy_range is None and sendfile is not None:
+			try:
+				sent = sendfile(out_fd, in_fd, offset, count)
+			except OSError:
+				sendfile = None
+		if copy_range is None and sendfile is None:
+			# Portable fallback (Windows/macOS): plain buffered copy
+			fsrc.seek(offset)
+			fdst.seek(offset)
+			buf = fsrc.read(count)
+			sent = len(buf)
+			fdst.write(buf)
+		if sent <= 0:
+			if copy_range is None and sendfile is None:
+				# Source shrank underneath us
+				break
+			# Kernel path made no progress (unsupported fs); finish with the portable loop
+			copy_range = sendfile = None
+			continue
+		offset += sent
+		on_chunk(offset)
+
+
+def copy_file(src: Path, dst: Path, progress: Optional[ProgressCallback] = None,
+              cancel_event: Optional[threading.Event] = None) -> None:
+	"""Copy src to dst using the fastest mechanism available.
+
+	progress(copied_bytes, total_bytes) is called after every chunk. Setting
+	cancel_event stops the copy, removes the partial dst and raises CopyCancelled.
+	"""
+	size = os.path.getsize(src)
+
+	def on_chunk(copied: int) -> None:
+		if progress is not None:
+			progress(copied, size)
+		if cancel_event is not None and cancel_event.is_set():
+			raise CopyCancelled(str(src))
+
+	try:
+		with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+			_kernel_copy(fsrc, fdst, size, on_chunk)
+		st = os.stat(src)
+		os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+	except BaseException:
+		try:
+			Path(dst).unlink(missing_ok=True)
+		except OSError:
+			pass
+		raise
+
+
+def rate_progress(start_time: float, copied: int, total: int):
+	"""Return (elapsed, remaining, pct) for a byte-based transfer."""
+	elapsed = time.time() - start_time
+	pct = (copied / total) * 100.0 if total else 100.0
+	remaining = max(0.0, (elapsed / max(pct, 1e-6)) * (100.0 - pct))
+	return elapsed, remaining, pct
+
+
+def sample_digest(path: Path, samples: int = 3) -> Optional[str]:
+	"""Fast content fingerprint: BLAKE2b over the size and a few evenly spaced 256 KiB samples.
+
+	Small files are hashed in full. Reads under 1 MiB regardless of file size,
+	so it's cheap enough to run on every part; it catches truncation and
+	rewritten files, not single flipped bytes in between the samples.
+	None if the file can't be read.
+	"""
+	h = hashlib.blake2b(digest_size=16)
+	try:
+		size = os.path.getsize(path)
+		h.update(str(size).encode("ascii"))
+		with open(path, "rb") as fh:
+			if size <= SAMPLE_FULL_MAX:
+				h.update(fh.read())
+			else:
+				span = size - SAMPLE_BYTES
+				for i in range(samples):
+					fh.seek(span * i // max(1, samples - 1))
+					h.update(fh.read(SAMPLE_BYTES))
+	except OSError:
+		return None
+	return h.hexdigest()
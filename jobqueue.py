@@ -0,0 +1,303 @@
+"""Multi-file job queue with separate I/O and CPU concurrency limits.
+
+A stream-copy split is bound by disk throughput and barely uses a core,
+while a re-encode (non-MP4 streams, smart cut, per-part fallback) saturates
+every CPU. Each job is therefore classified before it starts and runs in the
+pool for its class: a long transcode occupies a CPU slot and never blocks
+the fast remux jobs queued behind it. Within a class, higher priority first,
+then submission order.
+
+Job status is kept on the Job itself (latest event and status line win), so
+the GUI reads it on its refresh timer without a callback per ffmpeg line.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import engine
+import probe
+from events import ProgressEvent
+
+# "io": stream copy only, limited by disk; "cpu": something gets re-encoded
+JOB_CLASSES = ("io", "cpu")
+
+# Job life cycle; the last three are final
+JOB_STATES = ("queued", "running", "cancelling", "done", "failed", "cancelled")
+FINAL_STATES = ("done", "failed", "cancelled")
+
+DEFAULT_IO_JOBS = 2
+DEFAULT_CPU_JOBS = 1
+
+
+@dataclass
+class Job:
+	id: int
+	input_path: Path
+	output_dir: Path
+	segment_seconds: int
+	filename_base: str = ""
+	options: engine.SplitOptions = field(default_factory=engine.SplitOptions)
+	# Higher runs first among queued jobs of the same class
+	priority: int = 0
+	# One of JOB_CLASSES; None until classified
+	job_class: Optional[str] = None
+	state: str = "queued"
+	status: str = "Queued"
+	event: Optional[ProgressEvent] = None
+	result: Optional[engine.SplitResult] = None
+	error: Optional[str] = None
+	submitted: float = field(default_factory=time.time)
+	started: Optional[float] = None
+	finished: Optional[float] = None
+	cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+	@property
+	def pct(self) -> float:
+		if self.state == "done":
+			return 100.0
+		return self.event.pct if self.event is not None else 0.0
+
+	@property
+	def is_final(self) -> bool:
+		return self.state in FINAL_STATES
+
+
+def classify(input_path: Path, options: engine.SplitOptions) -> str:
+	"""Guess whether a split is I/O- or CPU-bound from one (cached) probe.
+
+	MP4 sources and containers whose streams MP4 can carry as-is are split by
+	stream copy. Smart cut, streams that need re-encoding and unreadable
+	inputs (likely to hit the re-encode fallbacks) count as CPU work.
+	"""
+	smart = options.cut_mode == "smart" and not options.max_part_bytes
+	if smart or any(p.needs_encode for p in options.renditions):
+		return "cpu"
+	info = probe.probe(input_path)
+	if info is None or info.duration <= 0:
+		return "cpu"
+	return "io" if engine.plan_mp4_streams(info, 1, source_is_mp4=input_path.suffix.lower() == ".mp4").is_copy else "cpu"
+
+
+class _JobReporter(engine.Reporter):
+	"""Stores the newest status/event on the job, then forwards to an optional reporter."""
+
+	def __init__(self, job: Job, inner: Optional[engine.Reporter]) -> None:
+		self.job = job
+		self.inner = inner
+
+	def status(self, text: str) -> None:
+		self.job.status = text
+		if self.inner is not None:
+			self.inner.status(text)
+
+	def event(self, event: ProgressEvent) -> None:
+		self.job.event = event
+		if self.inner is not None:
+			self.inner.event(event)
+
+	def error(self, title: str, message: str) -> None:
+		self.job.error = f"{title}: {message}"
+		if self.inner is not None:
+			self.inner.error(title, message)
+
+
+class JobQueue:
+	"""Runs split jobs with per-class concurrency limits, priorities and cancellation.
+
+	reporter_factory, if given, builds an extra Reporter per job (the CLI
+	prints through it); on_finish is called from the worker thread when a
+	job that ran reaches a final state, before wait() returns.
+	"""
+
+	def __init__(self, io_jobs: int = DEFAULT_IO_JOBS, cpu_jobs: int = DEFAULT_CPU_JOBS,
+	             reporter_factory: Optional[Callable[[Job], engine.Reporter]] = None,
+	             on_finish: Optional[Callable[[Job], None]] = None) -> None:
+		self.limits = {"io": max(1, io_jobs), "cpu": max(1, cpu_jobs)}
+		self.reporter_factory = reporter_factory
+		self.on_finish = on_finish
+		self._jobs: Dict[int, Job] = {}
+		self._unclassified: List[Job] = []
+		self._queues: Dict[str, list] = {c: [] for c in JOB_CLASSES}
+		self._running: Dict[str, int] = {c: 0 for c in JOB_CLASSES}
+		self._ids = itertools.count(1)
+		self._seq = itertools.count()
+		self._cond = threading.Condition()
+		self._closed = False
+		self._dispatcher = threading.Thread(target=self._dispatch, name="jobqueue", daemon=True)
+		self._dispatcher.start()
+
+	def submit(self, input_path: Path, output_dir: Path, segment_seconds: int, filename_base: str = "",
+	           options: Optional[engine.SplitOptions] = None, priority: int = 0,
+	           job_class: Optional[str] = None) -> Job:
+		"""Queue a split. job_class skips classification when the caller already knows it."""
+		if job_class is not None and job_class not in JOB_CLASSES:
+			raise ValueError(f"Unknown job class: {job_class}")
+		with self._cond:
+			if self._closed:
+				raise RuntimeError("Job queue is shut down")
+			job = Job(next(self._ids), Path(input_path), Path(output_dir), segment_seconds, filename_base,
+			          options or engine.SplitOptions(), priority, job_class)
+			self._jobs[job.id] = job
+			if job_class is None:
+				self._unclassified.append(job)
+			else:
+				self._enqueue(job)
+			self._cond.notify_all()
+		return job
+
+	def _enqueue(self, job: Job) -> None:
+		heapq.heappush(self._queues[job.job_class], (-job.priority, next(self._seq), job))
+
+	def jobs(self) -> List[Job]:
+		"""All jobs in submission order (live objects; fields are updated in place)."""
+		with self._cond:
+			return [self._jobs[i] for i in sorted(self._jobs)]
+
+	def get(self, job_id: int) -> Optional[Job]:
+		with self._cond:
+			return self._jobs.get(job_id)
+
+	def set_priority(self, job_id: int, priority: int) -> bool:
+		"""Change a queued job's priority. False if it has already started."""
+		with self._cond:
+			job = self._jobs.get(job_id)
+			if job is None or job.state != "queued":
+				return False
+			job.priority = priority
+			if job.job_class is not None:
+				queue = self._queues[job.job_class]
+				queue[:] = [entry for entry in queue if entry[2] is not job]
+				heapq.heapify(queue)
+				self._enqueue(job)
+			return True
+
+	def cancel(self, job_id: int) -> bool:
+		"""Drop a queued job or ask a running one to stop. False if already final."""
+		with self._cond:
+			job = self._jobs.get(job_id)
+			if job is None or job.is_final:
+				return False
+			job.cancel_event.set()
+			if job.state == "queued":
+				self._finish(job, "cancelled", "Cancelled")
+			else:
+				job.state = "cancelling"
+				job.status = "Cancelling..."
+			self._cond.notify_all()
+			return True
+
+	def clear_finished(self) -> None:
+		with self._cond:
+			for job_id in [j.id for j in self._jobs.values() if j.is_final]:
+				del self._jobs[job_id]
+
+	def pending(self) -> int:
+		with self._cond:
+			return sum(1 for j in self._jobs.values() if not j.is_final)
+
+	def wait(self, timeout: Optional[float] = None) -> bool:
+		"""Block until every submitted job is final. False on timeout."""
+		deadline = None if timeout is None else time.monotonic() + timeout
+		with self._cond:
+			while any(not j.is_final for j in self._jobs.values()):
+				remaining = None if deadline is None else deadline - time.monotonic()
+				if remaining is not None and remaining <= 0:
+					return False
+				self._cond.wait(remaining)
+		return True
+
+	def shutdown(self, cancel: bool = False) -> None:
+		"""Stop accepting jobs; with cancel, also cancel everything not yet final."""
+		with self._cond:
+			self._closed = True
+			ids = [j.id for j in self._jobs.values() if not j.is_final] if cancel else []
+		for job_id in ids:
+			self.cancel(job_id)
+
+	def _finish(self, job: Job, state: str, status: str) -> None:
+		# Caller holds self._cond
+		job.state = state
+		job.status = status
+		job.finished = time.time()
+		self._cond.notify_all()
+
+	def _next_runnable(self) -> Optional[Job]:
+		# Caller holds self._cond
+		for job_class in JOB_CLASSES:
+			queue = self._queues[job_class]
+			while queue and queue[0][2].state != "queued":
+				heapq.heappop(queue)  # cancelled while waiting
+			if queue and self._running[job_class] < self.limits[job_class]:
+				return heapq.heappop(queue)[2]
+		return None
+
+	def _dispatch(self) -> None:
+		while True:
+			with self._cond:
+				while not self._unclassified and self._next_runnable_peek() is None:
+					self._cond.wait()
+				pending, self._unclassified = self._unclassified, []
+			# Probing can take a moment on a cold cache; do it outside the lock
+			for job in pending:
+				if job.state != "queued":
+					continue
+				try:
+					job.job_class = classify(job.input_path, job.options)
+				except Exception:
+					job.job_class = "cpu"
+			with self._cond:
+				for job in pending:
+					if job.state == "queued":
+						self._enqueue(job)
+				while True:
+					job = self._next_runnable()
+					if job is None:
+						break
+					self._running[job.job_class] += 1
+					job.state = "running"
+					job.status = "Starting..."
+					job.started = time.time()
+					threading.Thread(target=self._run, args=(job,), name=f"job-{job.id}", daemon=True).start()
+
+	def _next_runnable_peek(self) -> Optional[Job]:
+		# Caller holds self._cond
+		for job_class in JOB_CLASSES:
+			queue = self._queues[job_class]
+			if queue and self._running[job_class] < self.limits[job_class]:
+				return queue[0][2]
+		return None
+
+	def _options_for(self, job: Job) -> engine.SplitOptions:
+		# Concurrent CPU jobs share the cores instead of each sizing its part pool to all of them
+		if job.job_class == "cpu" and job.options.max_workers is None and self.limits["cpu"] > 1:
+			return replace(job.options, max_workers=max(1, (os.cpu_count() or 1) // self.limits["cpu"]))
+		return job.options
+
+	def _run(self, job: Job) -> None:
+		inner = self.reporter_factory(job) if self.reporter_factory is not None else None
+		reporter = _JobReporter(job, inner)
+		state, status = "done", ""
+		try:
+			job.result = engine.split_video(job.input_path, job.output_dir, job.segment_seconds,
+			                                filename_base=job.filename_base, reporter=reporter,
+			                                options=self._options_for(job), cancel_event=job.cancel_event)
+			if job.cancel_event.is_set():
+				state, status = "cancelled", "Cancelled"
+			else:
+				status = f"{len(job.result.parts)} part(s) in {job.result.elapsed:.1f}s"
+		except engine.SplitCancelled:
+			state, status = "cancelled", "Cancelled"
+		except Exception as exc:
+			job.error = str(exc)
+			state, status = "failed", f"Failed: {exc}"
+		with self._cond:
+			self._running[job.job_class] -= 1
+			self._finish(job, state, status)
+			# Still under the (reentrant) lock so wait() returns only after the callback ran
+			if self.on_finish is not None:
+				self.on_finish(job)
@@ -0,0 +1,192 @@
+"""Output manifest: which parts a split planned and which it finished.
+
+split_video writes `<base>_manifest.json` next to the parts and adds each
+part as soon as it is closed: its number, time range, size and a sampled
+checksum (fileops.sample_digest). If a run dies half way, the next run for
+the same input version and settings verifies the recorded parts and only
+writes the missing or damaged ones.
+
+Segment-muxer runs cut on keyframes, so their part boundaries are only
+known once each part closes; per-part and smart-cut runs store their planned
+boundaries up front.
+
+The manifest is also the parts' metadata for other tools: each part's
+start, end and size come from the segment muxer's own list, and "streams"
+lists the codecs the parts carry, so nothing downstream has to probe them.
+"""
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import fileops
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path(output_dir: Path, base: str) -> Path:
+	return Path(output_dir) / f"{base}_manifest.json"
+
+
+def input_identity(path: Path) -> Optional[list]:
+	"""[size, mtime_ns] of the input; a rewritten input doesn't match an old manifest."""
+	try:
+		st = Path(path).stat()
+	except OSError:
+		return None
+	return [st.st_size, st.st_mtime_ns]
+
+
+@dataclass
+class PartEntry:
+	num: int
+	filename: str
+	start: float
+	end: float
+	size: int
+	checksum: str
+
+
+class SplitManifest:
+	"""Manifest of one split, saved atomically after every change. Thread-safe."""
+
+	def __init__(self, path: Path, input_path: Path, segment_seconds: int, cut_mode: str) -> None:
+		self.path = Path(path)
+		self.input = str(input_path)
+		self.identity = input_identity(input_path)
+		self.segment_seconds = segment_seconds
+		self.cut_mode = cut_mode
+		# "segment", "per-part" or "smart"; which path wrote the parts
+		self.mode = "segment"
+		# Planned boundaries for per-part and smart runs; None for the segment muxer
+		self.bounds: Optional[List[float]] = None
+		# True once the run got through every planned part
+		self.complete = False
+		# What the parts hold, one dict per output stream (playlists.describe_streams);
+		# empty until the split has probed the input
+		self.streams: List[dict] = []
+		self._parts: Dict[int, PartEntry] = {}
+		self._lock = threading.Lock()
+		self._save_lock = threading.Lock()
+
+	@classmethod
+	def load(cls, path: Path) -> Optional["SplitManifest"]:
+		"""Read a manifest; None if it is missing, unreadable or from another version."""
+		try:
+			with open(path, "r", encoding="utf-8") as fh:
+				data = json.load(fh)
+			if data.get("version") != MANIFEST_VERSION:
+				return None
+			manifest = cls.__new__(cls)
+			manifest.path = Path(path)
+			manifest.input = data["input"]
+			manifest.identity = data.get("identity")
+			manifest.segment_seconds = data["segment_seconds"]
+			manifest.cut_mode = data["cut_mode"]
+			manifest.mode = data.get("mode", "segment")
+			manifest.bounds = data.get("bounds")
+			manifest.complete = bool(data.get("complete"))
+			manifest.streams = list(data.get("streams") or [])
+			manifest._parts = {p["num"]: PartEntry(**p) for p in data.get("parts") or []}
+			manifest._lock = threading.Lock()
+			manifest._save_lock = threading.Lock()
+			return manifest
+		except (OSError, ValueError, KeyError, TypeError):
+			return None
+
+	def matches(self, input_path: Path, segment_seconds: int, cut_mode: str) -> bool:
+		"""True if this manifest describes a split of this input version with these settings."""
+		identity = input_identity(input_path)
+		return (identity is not None and self.identity == identity and self.segment_seconds == segment_seconds
+		        and self.cut_mode == cut_mode)
+
+	def entries(self) -> List[PartEntry]:
+		with self._lock:
+			return [self._parts[n] for n in sorted(self._parts)]
+
+	def paths(self, output_dir: Path) -> List[Path]:
+		"""The recorded parts as files in output_dir, in part order."""
+		return [Path(output_dir) / e.filename for e in self.entries()]
+
+	def begin(self, mode: str, bounds: Optional[List[float]] = None) -> None:
+		"""Start over with a new plan, forgetting any recorded parts."""
+		with self._lock:
+			self.mode = mode
+			self.bounds = list(bounds) if bounds is not None else None
+			self.complete = False
+			self._parts = {}
+		self.save()
+
+	def set_bounds(self, bounds: List[float]) -> None:
+		"""Pin the plan's boundaries, keeping the parts already recorded under it."""
+		with self._lock:
+			self.bounds = list(bounds)
+		self.save()
+
+	def describe(self, streams: List[dict]) -> None:
+		"""Store what the parts hold, so readers of the manifest don't have to probe them."""
+		with self._lock:
+			self.streams = list(streams)
+		self.save()
+
+	def record(self, num: int, part_path: Path, start: float, end: float) -> None:
+		"""Add (or replace) a finished part, checksumming the file as it is now."""
+		part_path = Path(part_path)
+		try:
+			size = os.path.getsize(part_path)
+		except OSError:
+			return
+		entry = PartEntry(num, part_path.name, round(start, 6), round(end, 6), size,
+		                  fileops.sample_digest(part_path) or "")
+		with self._lock:
+			self._parts[num] = entry
+		self.save()
+
+	def finish(self) -> None:
+		with self._lock:
+			self.complete = True
+		self.save()
+
+	def verify(self, output_dir: Path) -> Tuple[List[PartEntry], List[PartEntry]]:
+		"""Split the recorded parts into (intact, missing or changed since recorded)."""
+		good, bad = [], []
+		for entry in self.entries():
+			path = Path(output_dir) / entry.filename
+			try:
+				ok = os.path.getsize(path) == entry.size and fileops.sample_digest(path) == entry.checksum
+			except OSError:
+				ok = False
+			(good if ok else bad).append(entry)
+		return good, bad
+
+	def to_dict(self) -> dict:
+		with self._lock:
+			return {
+				"version": MANIFEST_VERSION,
+				"input": self.input,
+				"identity": self.identity,
+				"segment_seconds": self.segment_seconds,
+				"cut_mode": self.cut_mode,
+				"mode": self.mode,
+				"bounds": self.bounds,
+				"complete": self.complete,
+				"streams": self.streams,
+				"parts": [asdict(self._parts[n]) for n in sorted(self._parts)],
+			}
+
+	def save(self) -> None:
+		# Best effort: a manifest that can't be written only costs the next run its head start
+		# Snapshot and write under one lock so an older snapshot never replaces a newer one
+		with self._save_lock:
+			tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+			try:
+				with open(tmp, "w", encoding="utf-8") as fh:
+					json.dump(self.to_dict(), fh, indent=1)
+				os.replace(tmp, self.path)
+			except OSError:
+				try:
+					tmp.unlink(missing_ok=True)
+				except OSError:
+					pass
@@ -0,0 +1,205 @@
+"""HLS and DASH playlists over the parts, and the stream list for the manifest.
+
+The segment muxer's own list gives every part's exact start and end (see
+manifest.py), so nothing here probes the parts. With playlists on, the
+parts are written as fragmented MP4 (moov up front, then moof/mdat
+fragments from each keyframe), which is still a normal MP4 for players and
+editors, and also a valid HLS/DASH segment. Each part is one segment: its
+header bytes are the initialization section and the fragments after them
+the media, both referenced by byte range, so the parts can be served as a
+stream as they are. Parts restart their timestamps at zero, so the HLS
+playlist marks every boundary as a discontinuity and the MPD gives each
+part a Period of its own.
+
+Parts written by the per-part or smart-cut paths are regular MP4; a split
+with any of those gets no playlists.
+"""
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+from urllib.parse import quote
+from xml.sax.saxutils import quoteattr
+
+import probe
+
+# ISO/IEC 14496-10 profile_idc and constraint flags by ffprobe profile name
+_AVC_PROFILES = {
+	"Baseline": (0x42, 0x00), "Constrained Baseline": (0x42, 0xE0), "Main": (0x4D, 0x40), "Extended": (0x58, 0x00),
+	"High": (0x64, 0x00), "High 10": (0x6E, 0x00), "High 4:2:2": (0x7A, 0x00), "High 4:4:4 Predictive": (0xF4, 0x00),
+}
+# general_profile_idc and compatibility flags (as RFC 6381 writes them) by ffprobe profile name
+_HEVC_PROFILES = {"Main": (1, "6"), "Main 10": (2, "4"), "Main Still Picture": (3, "8")}
+_AAC_PROFILES = {"Main": 1, "LC": 2, "HE-AAC": 5, "HE-AACv2": 29}
+_CODEC_STRINGS = {"mp3": "mp4a.40.34", "ac3": "ac-3", "eac3": "ec-3", "opus": "Opus", "flac": "fLaC", "alac": "alac",
+                  "mov_text": "tx3g"}
+
+
+def codec_string(stream: probe.StreamInfo) -> str:
+	"""RFC 6381 codecs value of a stream as the parts carry it; "" if it can't be told from the probe."""
+	name = stream.codec_name
+	if name == "h264" and stream.profile in _AVC_PROFILES and stream.level > 0:
+		profile_idc, constraints = _AVC_PROFILES[stream.profile]
+		return f"avc1.{profile_idc:02X}{constraints:02X}{stream.level:02X}"
+	if name == "hevc" and stream.profile in _HEVC_PROFILES and stream.level > 0:
+		profile_idc, compat = _HEVC_PROFILES[stream.profile]
+		# Stream copy keeps an hvc1 sample entry; the MP4 muxer writes hev1 otherwise
+		entry = "hvc1" if stream.codec_tag == "hvc1" else "hev1"
+		return f"{entry}.{profile_idc}.{compat}.L{stream.level}.B0"
+	if name == "aac" and stream.profile in _AAC_PROFILES:
+		return f"mp4a.40.{_AAC_PROFILES[stream.profile]}"
+	return _CODEC_STRINGS.get(name, "")
+
+
+def describe_streams(streams: List[probe.StreamInfo]) -> List[dict]:
+	"""The manifest's stream list: what each output stream of the parts holds."""
+	return [{"index": i, "type": s.codec_type, "codec": s.codec_name, "codecs": codec_string(s),
+	         "width": s.width, "height": s.height} for i, s in enumerate(streams)]
+
+
+def fragment_ranges(path: Path) -> Optional[Tuple[int, int]]:
+	"""(init bytes, end of the last fragment) of a fragmented MP4; None for a regular one.
+
+	Reads only the top-level box headers.
+	"""
+	offset = 0
+	init = None
+	end = None
+	seen_moov = False
+	try:
+		with open(path, "rb") as fh:
+			total = os.fstat(fh.fileno()).st_size
+			while offset + 8 <= total:
+				fh.seek(offset)
+				header = fh.read(16)
+				size, kind = struct.unpack(">I4s", header[:8])
+				if size == 1 and len(header) == 16:
+					size = struct.unpack(">Q", header[8:])[0]
+				elif size == 0:
+					size = total - offset
+				if size < 8:
+					return None
+				if kind == b"moov":
+					seen_moov = True
+				elif kind == b"moof":
+					if not seen_moov:
+						return None
+					if init is None:
+						init = offset
+				elif kind == b"mdat" and init is not None:
+					end = offset + size
+				offset += size
+	except (OSError, struct.error):
+		return None
+	if init is None or end is None:
+		return None
+	return init, end
+
+
+@dataclass
+class PlaylistPart:
+	filename: str
+	start: float
+	end: float
+	# The part's header bytes (ftyp, moov), then where its last fragment ends
+	init_bytes: int
+	media_end: int
+
+	@property
+	def duration(self) -> float:
+		return self.end - self.start
+
+	@property
+	def media_bytes(self) -> int:
+		return self.media_end - self.init_bytes
+
+
+def hls_playlist(parts: List[PlaylistPart]) -> str:
+	"""VOD media playlist: one byte-ranged fMP4 segment per part."""
+	target = max(int(p.duration + 0.5) for p in parts)
+	lines = ["#EXTM3U", "#EXT-X-VERSION:7", f"#EXT-X-TARGETDURATION:{max(1, target)}", "#EXT-X-PLAYLIST-TYPE:VOD",
+	         "#EXT-X-INDEPENDENT-SEGMENTS"]
+	for i, part in enumerate(parts):
+		uri = quote(part.filename)
+		if i:
+			lines.append("#EXT-X-DISCONTINUITY")
+		lines.append(f'#EXT-X-MAP:URI="{uri}",BYTERANGE="{part.init_bytes}@0"')
+		lines.append(f"#EXT-X-BYTERANGE:{part.media_bytes}@{part.init_bytes}")
+		lines.append(f"#EXTINF:{part.duration:.6f},")
+		lines.append(uri)
+	lines.append("#EXT-X-ENDLIST")
+	return "\n".join(lines) + "\n"
+
+
+def _iso_duration(seconds: float) -> str:
+	return f"PT{seconds:.3f}S"
+
+
+def dash_manifest(parts: List[PlaylistPart], streams: List[dict]) -> str:
+	"""Static MPD with one Period per part, each a single byte-ranged segment."""
+	video = [s for s in streams if s["type"] == "video"]
+	av = [s for s in streams if s["type"] in ("video", "audio")]
+	codecs = ",".join(s["codecs"] for s in av) if all(s["codecs"] for s in av) else ""
+	total = parts[-1].end - parts[0].start
+	attrs = f' codecs={quoteattr(codecs)}' if codecs else ""
+	if video and video[0]["width"] and video[0]["height"]:
+		attrs += f' width="{video[0]["width"]}" height="{video[0]["height"]}"'
+	mime = "audio/mp4" if av and not video else "video/mp4"
+	lines = [
+		'<?xml version="1.0" encoding="UTF-8"?>',
+		'<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" '
+		'profiles="urn:mpeg:dash:profile:isoff-main:2011" '
+		f'mediaPresentationDuration="{_iso_duration(total)}" minBufferTime="PT2S">',
+	]
+	for n, part in enumerate(parts, 1):
+		name = quoteattr(quote(part.filename))
+		bandwidth = max(1, int(part.media_bytes * 8 / part.duration)) if part.duration > 0 else 1
+		lines += [
+			f'  <Period id="{n}" start="{_iso_duration(part.start - parts[0].start)}" '
+			f'duration="{_iso_duration(part.duration)}">',
+			f'    <AdaptationSet mimeType="{mime}">',
+			f'      <Representation id="{n}" bandwidth="{bandwidth}"{attrs}>',
+			f'        <SegmentList timescale="1000" duration="{int(round(part.duration * 1000))}">',
+			f'          <Initialization sourceURL={name} range="0-{part.init_bytes - 1}"/>',
+			f'          <SegmentURL media={name} mediaRange="{part.init_bytes}-{part.media_end - 1}"/>',
+			'        </SegmentList>',
+			'      </Representation>',
+			'    </AdaptationSet>',
+			'  </Period>',
+		]
+	lines.append("</MPD>")
+	return "\n".join(lines) + "\n"
+
+
+def hls_path(output_dir: Path, base: str) -> Path:
+	return Path(output_dir) / f"{base}.m3u8"
+
+
+def dash_path(output_dir: Path, base: str) -> Path:
+	return Path(output_dir) / f"{base}.mpd"
+
+
+def write_playlists(output_dir: Path, base: str, entries: List[Tuple[str, float, float]],
+                    streams: List[dict]) -> List[Path]:
+	"""Write `<base>.m3u8` and `<base>.mpd` for the parts (filename, start, end) in order.
+
+	Raises ValueError naming the first part that isn't fragmented MP4.
+	"""
+	parts = []
+	for filename, start, end in entries:
+		ranges = fragment_ranges(Path(output_dir) / filename)
+		if ranges is None:
+			raise ValueError(f"{filename} is not a fragmented MP4")
+		parts.append(PlaylistPart(filename, start, end, *ranges))
+	if not parts:
+		raise ValueError("no parts")
+	written = []
+	for path, text in ((hls_path(output_dir, base), hls_playlist(parts)),
+	                   (dash_path(output_dir, base), dash_manifest(parts, streams))):
+		tmp = path.with_suffix(path.suffix + ".tmp")
+		with open(tmp, "w", encoding="utf-8", newline="\n") as fh:
+			fh.write(text)
+		os.replace(tmp, path)
+		written.append(path)
+	return written
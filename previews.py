@@ -0,0 +1,156 @@
+"""Poster frames and contact strips for every part, from keyframes only.
+
+With previews on, the segment pass that writes the parts gets a second
+output: ffmpeg decodes only the keyframes of the first video stream
+(-skip_frame nokey; the stream-copied parts never go through a decoder),
+scales them down and writes them as numbered JPEGs to a temp folder.
+Decoding one frame every few seconds adds a few percent to a stream-copy
+split. The Nth picture is the Nth keyframe of the keyframe index, which is
+how each one gets its time.
+
+Every part then gets two pictures in `<base>_previews/` next to the parts:
+
+	<base>_part_NNN.jpg        poster: the keyframe POSTER_POSITION into the part
+	<base>_part_NNN_strip.jpg  STRIP_FRAMES keyframes across the part, side by side
+
+Posters are copies of the keyframe pictures, and all strips come from one
+ffmpeg tile pass over those small JPEGs; the parts themselves are never
+opened. Splits that don't read the whole input in one segment pass
+(resume, per-part, smart cut, selections) get the pictures from a separate
+keyframe-only scan of the input instead.
+"""
+import bisect
+import shutil
+from pathlib import Path
+from typing import List, Tuple
+
+import procrunner
+
+# Width of posters (and of the keyframe pictures they are copied from); height keeps the aspect ratio
+POSTER_WIDTH = 320
+# Where in a part its poster comes from (0 = first keyframe, 1 = end)
+POSTER_POSITION = 0.3
+# Pictures per contact strip and the width of each one in it
+STRIP_FRAMES = 6
+STRIP_TILE_WIDTH = 160
+# ffmpeg's JPEG quality scale: 2 (best) to 31
+JPEG_QUALITY = 4
+
+# Input options for a pass that also writes keyframe pictures; only decoders see them
+DECODE_ARGS = ["-skip_frame", "nokey"]
+
+_FRAME_PATTERN = "kf_%06d.jpg"
+
+
+def preview_dir(output_dir: Path, base: str) -> Path:
+	return Path(output_dir) / f"{base}_previews"
+
+
+def poster_filename(base: str, part_num: int) -> str:
+	return f"{base}_part_{part_num:03d}.jpg"
+
+
+def strip_filename(base: str, part_num: int) -> str:
+	return f"{base}_part_{part_num:03d}_strip.jpg"
+
+
+def frame_args(frames_dir: Path, video_index: int) -> List[str]:
+	"""ffmpeg output arguments writing a picture of every decoded keyframe of stream video_index into frames_dir."""
+	return [
+		"-map", f"0:{video_index}", "-an", "-sn", "-dn",
+		"-vf", f"scale={POSTER_WIDTH}:-2", "-fps_mode", "passthrough",
+		"-q:v", str(JPEG_QUALITY), "-f", "image2", str(Path(frames_dir) / _FRAME_PATTERN),
+	]
+
+
+def frames(frames_dir: Path) -> List[Path]:
+	"""Keyframe pictures in frames_dir, in keyframe order."""
+	return sorted(Path(frames_dir).glob("kf_*.jpg"))
+
+
+def scan_keyframes(path: Path, frames_dir: Path, video_index: int) -> List[Path]:
+	"""Write the keyframe pictures of path's stream video_index with a pass of its own; returns them (empty on failure)."""
+	for old in frames(frames_dir):
+		old.unlink(missing_ok=True)
+	cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+	       *DECODE_ARGS, "-i", str(path), *frame_args(frames_dir, video_index)]
+	try:
+		if procrunner.run(cmd).returncode != 0:
+			return []
+	except (procrunner.ProcessTimeout, OSError):
+		return []
+	return frames(frames_dir)
+
+
+def _nearest(keyframes: List[float], lo: int, hi: int, t: float) -> int:
+	"""Index in keyframes[lo:hi] of the keyframe closest to t."""
+	i = bisect.bisect_left(keyframes, t, lo, hi)
+	if i == hi or (i > lo and t - keyframes[i - 1] <= keyframes[i] - t):
+		return i - 1
+	return i
+
+
+def pick_frames(keyframes: List[float], start: float, end: float) -> Tuple[int, List[int]]:
+	"""Keyframe indexes for a part's poster and strip.
+
+	Only keyframes inside the part are used; a part with none (it can't
+	happen with keyframe cuts, but smart-cut parts may start between them)
+	borrows the keyframe before it. Short parts repeat pictures in the strip.
+	"""
+	lo = bisect.bisect_left(keyframes, start - 1e-3)
+	hi = bisect.bisect_left(keyframes, end - 1e-3)
+	if hi <= lo:
+		lo, hi = max(0, lo - 1), max(1, lo)
+	length = end - start
+	poster = _nearest(keyframes, lo, hi, start + POSTER_POSITION * length)
+	strip = [_nearest(keyframes, lo, hi, start + (k + 0.5) * length / STRIP_FRAMES) for k in range(STRIP_FRAMES)]
+	return poster, strip
+
+
+def write_previews(frame_paths: List[Path], keyframes: List[float], parts: List[Tuple[int, float, float]],
+                   folder: Path, base: str) -> int:
+	"""Write the poster and strip of each (number, start, end) part into folder; returns how many got both.
+
+	frame_paths are the keyframe pictures, one per entry of keyframes.
+	"""
+	if not parts or not keyframes or len(frame_paths) != len(keyframes):
+		return 0
+	folder = Path(folder)
+	folder.mkdir(parents=True, exist_ok=True)
+	postered = set()
+	lines = []
+	for num, start, end in parts:
+		poster, strip = pick_frames(keyframes, start, end)
+		try:
+			shutil.copyfile(frame_paths[poster], folder / poster_filename(base, num))
+			postered.add(num)
+		except OSError:
+			pass
+		for i in strip:
+			lines.append(f"file '{frame_paths[i].name}'\nduration 1\n")
+	# One tile pass makes every strip; its Nth picture belongs to the Nth part
+	work_dir = frame_paths[0].parent
+	list_file = work_dir / "strips.txt"
+	list_file.write_text("".join(lines), encoding="utf-8")
+	cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+	       "-f", "concat", "-safe", "0", "-i", str(list_file),
+	       "-vf", f"scale={STRIP_TILE_WIDTH}:-2,tile={STRIP_FRAMES}x1", "-fps_mode", "passthrough",
+	       "-q:v", str(JPEG_QUALITY), "-f", "image2", str(work_dir / "strip_%06d.jpg")]
+	try:
+		ok = procrunner.run(cmd).returncode == 0
+	except (procrunner.ProcessTimeout, OSError):
+		ok = False
+	written = 0
+	for n, (num, _, _) in enumerate(parts, 1):
+		strip_path = work_dir / f"strip_{n:06d}.jpg"
+		if not ok or not strip_path.exists():
+			continue
+		try:
+			# The temp folder may be on another drive than the parts
+			shutil.move(str(strip_path), str(folder / strip_filename(base, num)))
+		except OSError:
+			continue
+		if num in postered:
+			written += 1
+	return written
+
@@ -0,0 +1,408 @@
+"""ffprobe wrappers returning structured stream/format information.
+
+Results are kept in a small on-disk cache keyed by file identity (path, size,
+mtime, inode) so repeated Analyze/Split runs on the same file skip ffprobe.
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, List, Optional
+
+import procrunner
+
+# Total bytes the probe cache may occupy before least recently used entries go
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Eviction trims down to this fraction of the cap so it doesn't run on every store
+CACHE_TRIM_RATIO = 0.9
+# A format/stream probe reads headers only; longer means a stuck network path or device
+PROBE_TIMEOUT = 60.0
+
+
+def _int(value: Any) -> int:
+	try:
+		return int(value or 0)
+	except (TypeError, ValueError):
+		return 0
+
+
+@dataclass
+class StreamInfo:
+	index: int
+	codec_type: str
+	codec_name: str
+	attached_pic: bool = False
+	# FourCC of codec-less streams, e.g. "tmcd" for a timecode track
+	codec_tag: str = ""
+	# Codec profile and level as ffprobe names them ("High", 40); for playlist codec strings
+	profile: str = ""
+	level: int = 0
+	width: int = 0
+	height: int = 0
+	# Pixel format and reference frame count; smart-cut heads encode to match them
+	pix_fmt: str = ""
+	refs: int = 0
+
+	@classmethod
+	def from_json(cls, data: dict) -> "StreamInfo":
+		disposition = data.get("disposition") or {}
+		return cls(
+			index=int(data.get("index", 0)),
+			codec_type=data.get("codec_type") or "",
+			codec_name=data.get("codec_name") or "",
+			attached_pic=bool(disposition.get("attached_pic")),
+			codec_tag=data.get("codec_tag_string") or "",
+			profile=data.get("profile") or "",
+			level=_int(data.get("level")),
+			width=_int(data.get("width")),
+			height=_int(data.get("height")),
+			pix_fmt=data.get("pix_fmt") or "",
+			refs=_int(data.get("refs")),
+		)
+
+
+@dataclass
+class ProbeInfo:
+	duration: float
+	format_name: str = ""
+	streams: List[StreamInfo] = field(default_factory=list)
+
+	def streams_of(self, codec_type: str) -> List[StreamInfo]:
+		return [s for s in self.streams if s.codec_type == codec_type]
+
+	def main_video(self) -> Optional[StreamInfo]:
+		"""The first video stream that isn't cover art; None for audio-only files."""
+		return next((s for s in self.streams_of("video") if not s.attached_pic), None)
+
+	def to_dict(self) -> dict:
+		return asdict(self)
+
+	@classmethod
+	def from_dict(cls, data: dict) -> "ProbeInfo":
+		streams = [StreamInfo(**s) for s in data.get("streams") or []]
+		return cls(duration=float(data.get("duration") or 0), format_name=data.get("format_name") or "", streams=streams)
+
+
+def default_cache_dir() -> Path:
+	"""Per-user cache folder; CLIPFORGE_CACHE_DIR overrides it."""
+	override = os.environ.get("CLIPFORGE_CACHE_DIR")
+	if override:
+		return Path(override).expanduser()
+	if sys.platform == "win32":
+		root = Path(os.environ.get("LOCALAPPDATA") or (Path.home() / "AppData" / "Local"))
+		return root / "ClipForge" / "cache"
+	root = Path(os.environ.get("XDG_CACHE_HOME") or (Path.home() / ".cache"))
+	return root / "clipforge"
+
+
+class ProbeCache:
+	"""File-identity keyed metadata cache, one small JSON file per input.
+
+	An entry holds named sections ("probe", and whatever else callers store
+	about the same file). A hit refreshes the entry's mtime, which is what the
+	size-bounded LRU eviction sorts on. Writes are atomic, so concurrent jobs
+	can share one cache directory.
+	"""
+
+	def __init__(self, root: Path, max_bytes: int = CACHE_MAX_BYTES) -> None:
+		self.root = Path(root)
+		self.max_bytes = max_bytes
+		self._lock = threading.Lock()
+
+	@staticmethod
+	def file_key(path: Path) -> Optional[list]:
+		try:
+			resolved = Path(path).resolve()
+			st = resolved.stat()
+		except OSError:
+			return None
+		return [str(resolved), st.st_size, st.st_mtime_ns, st.st_ino]
+
+	def _entry_path(self, key: list) -> Path:
+		digest = hashlib.sha1(json.dumps(key).encode("utf-8")).hexdigest()
+		return self.root / f"{digest}.json"
+
+	def get(self, path: Path, section: str) -> Optional[Any]:
+		key = self.file_key(path)
+		if key is None:
+			return None
+		entry_path = self._entry_path(key)
+		try:
+			with open(entry_path, "r", encoding="utf-8") as fh:
+				entry = json.load(fh)
+		except (OSError, ValueError):
+			return None
+		if entry.get("key") != key or section not in entry:
+			return None
+		try:
+			os.utime(entry_path)
+		except OSError:
+			pass
+		return entry[section]
+
+	def put(self, path: Path, section: str, value: Any) -> None:
+		key = self.file_key(path)
+		if key is None:
+			return
+		entry_path = self._entry_path(key)
+		with self._lock:
+			try:
+				self.root.mkdir(parents=True, exist_ok=True)
+				try:
+					with open(entry_path, "r", encoding="utf-8") as fh:
+						entry = json.load(fh)
+					if entry.get("key") != key:
+						entry = {"key": key}
+				except (OSError, ValueError):
+					entry = {"key": key}
+				entry[section] = value
+				fd, tmp_name = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=str(self.root))
+				with os.fdopen(fd, "w", encoding="utf-8") as fh:
+					json.dump(entry, fh, separators=(",", ":"))
+				os.replace(tmp_name, entry_path)
+			except OSError:
+				return
+			self._evict()
+
+	def _evict(self) -> None:
+		try:
+			entries = []
+			for p in self.root.glob("*.json"):
+				st = p.stat()
+				entries.append((st.st_mtime, st.st_size, p))
+		except OSError:
+			return
+		total = sum(size for _, size, _ in entries)
+		if total <= self.max_bytes:
+			return
+		target = self.max_bytes * CACHE_TRIM_RATIO
+		for _, size, p in sorted(entries, key=lambda e: e[0]):
+			if total <= target:
+				break
+			try:
+				p.unlink()
+			except OSError:
+				pass
+			total -= size
+
+	def clear(self) -> None:
+		for p in self.root.glob("*.json"):
+			try:
+				p.unlink()
+			except OSError:
+				pass
+
+
+_default_cache: Optional[ProbeCache] = None
+
+
+def default_cache() -> Optional[ProbeCache]:
+	"""Shared cache instance; None when disabled with CLIPFORGE_NO_CACHE=1."""
+	global _default_cache
+	if os.environ.get("CLIPFORGE_NO_CACHE") == "1":
+		return None
+	if _default_cache is None:
+		_default_cache = ProbeCache(default_cache_dir())
+	return _default_cache
+
+
+def _run_ffprobe(path: Path) -> Optional[ProbeInfo]:
+	cmd = [
+		"ffprobe", "-v", "error", "-print_format", "json",
+		"-show_entries", "format=duration,format_name:stream=index,codec_type,codec_name,codec_tag_string,"
+		                 "profile,level,width,height,pix_fmt,refs:stream_disposition=attached_pic",
+		str(path),
+	]
+	try:
+		proc = procrunner.run(cmd, timeout=PROBE_TIMEOUT, capture=True)
+		if proc.returncode != 0:
+			return None
+		data = json.loads(proc.stdout)
+	except Exception:
+		return None
+	fmt = data.get("format") or {}
+	try:
+		duration = float(fmt.get("duration") or 0)
+	except ValueError:
+		duration = 0.0
+	streams = [StreamInfo.from_json(s) for s in data.get("streams") or []]
+	return ProbeInfo(duration=duration, format_name=fmt.get("format_name") or "", streams=streams)
+
+
+def probe(path: Path, use_cache: bool = True) -> Optional[ProbeInfo]:
+	"""Return format and stream info for path. None on failure.
+
+	Answered from the cache when the file is unchanged since it was last
+	probed; otherwise runs one ffprobe JSON call and stores the result. Pass
+	use_cache=False for short-lived temp files.
+	"""
+	cache = default_cache() if use_cache else None
+	if cache is not None:
+		cached = cache.get(path, "probe")
+		# Entries from before pix_fmt/refs were probed are treated as misses
+		if cached is not None and all("pix_fmt" in st for st in cached.get("streams") or []):
+			try:
+				return ProbeInfo.from_dict(cached)
+			except (TypeError, ValueError):
+				pass
+	info = _run_ffprobe(path)
+	if info is not None and cache is not None and info.duration > 0:
+		cache.put(path, "probe", info.to_dict())
+	return info
+
+
+def _scan_keyframes(path: Path, video_index: int) -> Optional[List[float]]:
+	# Packet headers only: -show_entries packet=... never opens a decoder
+	cmd = [
+		"ffprobe", "-v", "error", "-select_streams", str(video_index),
+		"-show_entries", "packet=pts_time,dts_time,flags", "-of", "csv=p=0",
+		str(path),
+	]
+	first = None
+	keyframes: List[float] = []
+
+	def on_line(line: str) -> None:
+		nonlocal first
+		fields = line.strip().split(",")
+		if len(fields) < 3:
+			return
+		raw = fields[0] if fields[0] not in ("", "N/A") else fields[1]
+		try:
+			t = float(raw)
+		except ValueError:
+			return
+		if first is None or t < first:
+			first = t
+		if "K" in fields[2]:
+			keyframes.append(t)
+
+	try:
+		proc = procrunner.run(cmd, on_line=on_line)
+	except Exception:
+		return None
+	if proc.returncode != 0 or first is None:
+		return None
+	# ffmpeg shifts outputs to start at zero, so the index is relative to the first packet
+	return sorted(round(t - first, 3) for t in keyframes)
+
+
+@dataclass
+class PacketIndex:
+	"""Bytes of every stream per GOP of the first video stream, from one packet scan."""
+	# Keyframe times, as keyframe_index returns them
+	keyframes: List[float]
+	# Payload bytes and packet count from each keyframe to the next (the first also
+	# holds whatever comes before the first keyframe)
+	gop_bytes: List[int]
+	gop_packets: List[int]
+
+	def to_dict(self) -> dict:
+		return asdict(self)
+
+
+def _scan_packets(path: Path, video_index: int) -> Optional[PacketIndex]:
+	# Packet headers of all streams. csv fields come in ffprobe's own field order, not the order
+	# asked for; for these that is stream_index, pts_time, dts_time, size, flags
+	cmd = [
+		"ffprobe", "-v", "error",
+		"-show_entries", "packet=stream_index,pts_time,dts_time,size,flags", "-of", "csv=p=0",
+		str(path),
+	]
+	first = None
+	gops: List[List[float]] = []
+	head = [0, 0]
+
+	def on_line(line: str) -> None:
+		nonlocal first
+		fields = line.strip().split(",")
+		if len(fields) < 5:
+			return
+		try:
+			stream = int(fields[0])
+			size = int(fields[3])
+		except ValueError:
+			return
+		if stream == video_index:
+			raw = fields[1] if fields[1] not in ("", "N/A") else fields[2]
+			try:
+				t = float(raw)
+			except ValueError:
+				t = None
+			if t is not None:
+				if first is None or t < first:
+					first = t
+				if "K" in fields[4]:
+					gops.append([t, 0, 0])
+		# Muxers interleave streams closely, so file order puts each packet in its GOP
+		current = gops[-1] if gops else None
+		if current is None:
+			head[0] += size
+			head[1] += 1
+		else:
+			current[1] += size
+			current[2] += 1
+
+	try:
+		proc = procrunner.run(cmd, on_line=on_line)
+	except Exception:
+		return None
+	if proc.returncode != 0 or first is None or not gops:
+		return None
+	gops[0][1] += head[0]
+	gops[0][2] += head[1]
+	gops.sort(key=lambda g: g[0])
+	return PacketIndex([round(g[0] - first, 3) for g in gops], [int(g[1]) for g in gops], [int(g[2]) for g in gops])
+
+
+def packet_index(path: Path, video_index: int, use_cache: bool = True) -> Optional[PacketIndex]:
+	"""Bytes per GOP for size-based planning; video_index is the first video stream's index.
+
+	Like the keyframe index it reads packet headers only and is cached; the
+	scan fills the keyframe index too. None if there is no video or the file
+	can't be read.
+	"""
+	cache = default_cache() if use_cache else None
+	if cache is not None:
+		cached = cache.get(path, "packets")
+		if cached is not None:
+			try:
+				return PacketIndex(**cached)
+			except TypeError:
+				pass
+	index = _scan_packets(path, video_index)
+	if index is not None and cache is not None:
+		cache.put(path, "packets", index.to_dict())
+		if cache.get(path, f"keyframes:{video_index}") is None:
+			cache.put(path, f"keyframes:{video_index}", index.keyframes)
+	return index
+
+
+def keyframe_index(path: Path, use_cache: bool = True, video_index: Optional[int] = None) -> Optional[List[float]]:
+	"""Return the main video stream's keyframe times in seconds from stream start.
+
+	video_index is that stream's absolute index; by default it is taken from
+	the probe (ProbeInfo.main_video), so cover art is never indexed. Built by
+	scanning packet flags (no decoding) and stored next to the probe result in
+	the cache, so repeat planning on the same file is instant. None if the
+	file has no video stream or can't be read.
+	"""
+	if video_index is None:
+		info = probe(path, use_cache=use_cache)
+		video = info.main_video() if info is not None else None
+		if video is None:
+			return None
+		video_index = video.index
+	section = f"keyframes:{video_index}"
+	cache = default_cache() if use_cache else None
+	if cache is not None:
+		cached = cache.get(path, section)
+		if cached is not None:
+			return [float(t) for t in cached]
+	index = _scan_keyframes(path, video_index)
+	if index is not None and cache is not None:
+		cache.put(path, section, index)
+	return index
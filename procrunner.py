@@ -0,0 +1,228 @@
+"""One asyncio event loop that runs every ffmpeg/ffprobe child process.
+
+Callers stay synchronous: run() hands the command to the shared loop thread
+and blocks until it finishes. The loop reads each child's stdout, enforces
+timeouts and watches for cancellation, so dozens of concurrent children cost
+no reader thread each.
+
+Cancellation is scoped: split_video wraps a job in cancel_scope(event), and
+every run() inside it (including ones on pool threads started through
+submit()) is killed, with its whole process tree, within CANCEL_POLL_SECONDS
+of the event being set. Cancelled derives from BaseException, like
+asyncio.CancelledError, so the engine's `except Exception` fallbacks don't
+mistake a cancel for an ffmpeg failure and start the next method.
+"""
+import asyncio
+import atexit
+import contextvars
+import os
+import signal
+import subprocess
+import sys
+import threading
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Set
+
+# How often a running child checks its cancel event
+CANCEL_POLL_SECONDS = 0.1
+# Largest stdout read handed to an on_chunk callback
+STREAM_CHUNK = 64 * 1024
+
+
+class Cancelled(BaseException):
+	"""Raised by run() when the cancel event is set; the child has been killed."""
+
+
+class ProcessTimeout(Exception):
+	"""Raised by run() when a child outlives its timeout; the child has been killed."""
+
+
+@dataclass
+class ProcResult:
+	returncode: int
+	# Only filled with capture=True
+	stdout: str = ""
+
+
+_cancel_event: contextvars.ContextVar = contextvars.ContextVar("clipforge_cancel_event", default=None)
+
+
+@contextmanager
+def cancel_scope(event: Optional[threading.Event]) -> Iterator[None]:
+	"""Make run() calls in this context (and in submit()-ed tasks) honour event."""
+	token = _cancel_event.set(event)
+	try:
+		yield
+	finally:
+		_cancel_event.reset(token)
+
+
+def check_cancelled() -> None:
+	"""Raise Cancelled if the current scope's event is set (for in-process work)."""
+	event = _cancel_event.get()
+	if event is not None and event.is_set():
+		raise Cancelled()
+
+
+def submit(pool: Executor, fn: Callable, *args, **kwargs) -> Future:
+	"""pool.submit that carries the caller's cancel scope into the worker thread."""
+	return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+_live: Set[int] = set()
+_live_lock = threading.Lock()
+
+
+def _spawn_kwargs() -> dict:
+	# Own process group/session, so the whole tree can be killed at once
+	if sys.platform == "win32":
+		return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.CREATE_NO_WINDOW}
+	return {"start_new_session": True}
+
+
+def _kill_tree(pid: int) -> None:
+	if sys.platform == "win32":
+		subprocess.run(["taskkill", "/F", "/T", "/PID", str(pid)], stdout=subprocess.DEVNULL,
+		               stderr=subprocess.DEVNULL, creationflags=subprocess.CREATE_NO_WINDOW)
+		return
+	try:
+		os.killpg(pid, signal.SIGKILL)
+	except (ProcessLookupError, PermissionError):
+		pass
+
+
+def kill_all() -> None:
+	"""Kill every child still running (window closed, interpreter exiting)."""
+	with _live_lock:
+		pids = list(_live)
+	for pid in pids:
+		_kill_tree(pid)
+
+
+def live_count() -> int:
+	with _live_lock:
+		return len(_live)
+
+
+atexit.register(kill_all)
+
+
+class _LoopThread:
+	def __init__(self) -> None:
+		self.loop = asyncio.new_event_loop()
+		if sys.platform != "win32" and sys.version_info < (3, 12) and hasattr(os, "pidfd_open"):
+			# The default watcher waits on each child from its own thread; pidfds don't
+			# (3.12+ picks pidfds by itself)
+			try:
+				os.close(os.pidfd_open(os.getpid()))
+				watcher = asyncio.PidfdChildWatcher()
+				watcher.attach_loop(self.loop)
+				asyncio.set_child_watcher(watcher)
+			except (OSError, AttributeError):
+				pass
+		self.thread = threading.Thread(target=self.loop.run_forever, name="procrunner", daemon=True)
+		self.thread.start()
+
+
+_loop_thread: Optional[_LoopThread] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+	global _loop_thread
+	with _loop_lock:
+		if _loop_thread is None:
+			_loop_thread = _LoopThread()
+		return _loop_thread.loop
+
+
+async def _read_lines(stream: asyncio.StreamReader, on_line: Callable[[str], None], errors: List[BaseException]) -> None:
+	while True:
+		raw = await stream.readline()
+		if not raw:
+			return
+		if errors:
+			continue  # keep draining so the child never blocks on a full pipe
+		try:
+			on_line(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+		except Exception as exc:
+			errors.append(exc)
+
+
+async def _read_chunks(stream: asyncio.StreamReader, on_chunk: Callable[[bytes], None],
+                       errors: List[BaseException]) -> None:
+	while True:
+		data = await stream.read(STREAM_CHUNK)
+		if not data:
+			return
+		if errors:
+			continue
+		try:
+			on_chunk(data)
+		except Exception as exc:
+			errors.append(exc)
+
+
+async def _run(cmd: List[str], timeout: Optional[float], on_line: Optional[Callable[[str], None]], capture: bool,
+               cancel_event: Optional[threading.Event],
+               on_chunk: Optional[Callable[[bytes], None]] = None) -> ProcResult:
+	want_stdout = on_line is not None or capture or on_chunk is not None
+	proc = await asyncio.create_subprocess_exec(
+		*cmd, stdin=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+		stdout=asyncio.subprocess.PIPE if want_stdout else asyncio.subprocess.DEVNULL, **_spawn_kwargs())
+	with _live_lock:
+		_live.add(proc.pid)
+	loop = asyncio.get_running_loop()
+	deadline = None if timeout is None else loop.time() + timeout
+	errors: List[BaseException] = []
+	reader = None
+	if on_line is not None:
+		reader = asyncio.ensure_future(_read_lines(proc.stdout, on_line, errors))
+	elif on_chunk is not None:
+		reader = asyncio.ensure_future(_read_chunks(proc.stdout, on_chunk, errors))
+	elif capture:
+		reader = asyncio.ensure_future(proc.stdout.read())
+	waiter = asyncio.ensure_future(proc.wait())
+	try:
+		while True:
+			done, _ = await asyncio.wait({waiter}, timeout=CANCEL_POLL_SECONDS)
+			if done:
+				break
+			if cancel_event is not None and cancel_event.is_set():
+				raise Cancelled()
+			if deadline is not None and loop.time() >= deadline:
+				raise ProcessTimeout(f"{os.path.basename(cmd[0])} timed out after {timeout:g}s")
+		output = await reader if reader is not None else None
+	finally:
+		if proc.returncode is None:
+			_kill_tree(proc.pid)
+			await proc.wait()
+		if reader is not None and not reader.done():
+			reader.cancel()
+		with _live_lock:
+			_live.discard(proc.pid)
+	if errors:
+		raise errors[0]
+	stdout = output.decode("utf-8", errors="replace") if capture and output is not None else ""
+	return ProcResult(proc.returncode, stdout)
+
+
+def run(cmd: List[str], timeout: Optional[float] = None, on_line: Optional[Callable[[str], None]] = None,
+        capture: bool = False, cancel_event: Optional[threading.Event] = None,
+        on_chunk: Optional[Callable[[bytes], None]] = None) -> ProcResult:
+	"""Run cmd to completion on the shared loop and return its exit code (and stdout).
+
+	on_line gets each stdout line as it arrives (called on the loop thread,
+	so keep it cheap); on_chunk gets raw stdout bytes in reads of up to
+	STREAM_CHUNK instead (binary output such as PCM); capture=True collects
+	stdout. stderr is discarded. cancel_event defaults to the current
+	cancel_scope. Raises Cancelled, ProcessTimeout, or OSError if cmd can't
+	be started.
+	"""
+	event = cancel_event if cancel_event is not None else _cancel_event.get()
+	if event is not None and event.is_set():
+		raise Cancelled()
+	future = asyncio.run_coroutine_threadsafe(_run(cmd, timeout, on_line, capture, event, on_chunk), _get_loop())
+	return future.result()
@@ -0,0 +1,146 @@
+"""Output profiles for one-pass multi-rendition splits.
+
+A profile is a part length plus a shape: "copy" (the source's own streams,
+stream-copied where MP4 allows it), "9x16" (centre crop to vertical
+1080x1920), "9x16pad" (whole frame scaled into 1080x1920 with bars) or
+"<N>p" (scaled to N lines high). Written as specs like "30", "60:9x16" or
+"45:720p".
+
+All profiles of a job are cut by a single ffmpeg process: the input is read
+and demuxed once, video is decoded once and fanned out with the `split`
+filter to one encoder per shape, and profiles sharing a shape (or the
+stream copy) share that encode through the `tee` muxer, one segment muxer
+per part length. Encoded video gets keyframes forced on the grid of all its
+part lengths, so those parts are exact.
+"""
+import math
+import re
+from dataclasses import dataclass
+from functools import reduce
+from pathlib import Path
+from typing import Dict, List
+
+# Frame size of the vertical renditions
+VERTICAL_WIDTH = 1080
+VERTICAL_HEIGHT = 1920
+
+_SHAPE_RE = re.compile(r"^(copy|9x16|9x16pad|[1-9][0-9]{2,3}p)$")
+
+
+@dataclass(frozen=True)
+class OutputProfile:
+	segment_seconds: int
+	shape: str = "copy"
+
+	@property
+	def needs_encode(self) -> bool:
+		return self.shape != "copy"
+
+	@property
+	def label(self) -> str:
+		"""Subfolder name for this profile's parts, e.g. "30s" or "60s_9x16"."""
+		return f"{self.segment_seconds}s" if self.shape == "copy" else f"{self.segment_seconds}s_{self.shape}"
+
+	@property
+	def spec(self) -> str:
+		return str(self.segment_seconds) if self.shape == "copy" else f"{self.segment_seconds}:{self.shape}"
+
+	def video_filter(self) -> str:
+		"""Filter chain producing this shape from decoded video (encoded shapes only)."""
+		w, h = VERTICAL_WIDTH, VERTICAL_HEIGHT
+		if self.shape == "9x16":
+			return f"crop='min(iw,ih*9/16)':'min(ih,iw*16/9)',scale={w}:{h},setsar=1"
+		if self.shape == "9x16pad":
+			return (f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+			        f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar=1")
+		if self.shape.endswith("p"):
+			return f"scale=-2:{int(self.shape[:-1])},setsar=1"
+		raise ValueError(f"Profile {self.spec} is stream-copied and has no filter")
+
+
+def parse_profile(spec: str) -> OutputProfile:
+	"""Parse "SECONDS[:SHAPE]"; raises ValueError with a message fit for the user."""
+	seconds, _, shape = spec.strip().partition(":")
+	shape = shape.strip().lower() or "copy"
+	try:
+		segment_seconds = int(seconds)
+	except ValueError:
+		raise ValueError(f"Invalid output profile {spec!r}: part length must be whole seconds") from None
+	if segment_seconds <= 0:
+		raise ValueError(f"Invalid output profile {spec!r}: part length must be positive")
+	if not _SHAPE_RE.match(shape):
+		raise ValueError(f"Invalid output profile {spec!r}: shape must be copy, 9x16, 9x16pad or e.g. 720p")
+	return OutputProfile(segment_seconds, shape)
+
+
+def parse_profiles(text: str) -> List[OutputProfile]:
+	"""Parse a comma or whitespace separated list of specs, dropping duplicates."""
+	profiles: List[OutputProfile] = []
+	for spec in re.split(r"[,\s]+", text.strip()):
+		if spec:
+			profile = parse_profile(spec)
+			if profile not in profiles:
+				profiles.append(profile)
+	return profiles
+
+
+def keyframe_interval(profiles: List[OutputProfile]) -> int:
+	"""Largest interval whose multiples include every profile's cut points."""
+	return reduce(math.gcd, (p.segment_seconds for p in profiles))
+
+
+def _tee_escape(path: str) -> str:
+	# tee splits its slaves with av_get_token: backslashes, quotes and | need escaping
+	return re.sub(r"([\\'|])", r"\\\1", path)
+
+
+def _segment_output(profiles: List[OutputProfile], patterns: Dict[OutputProfile, Path]) -> List[str]:
+	if len(profiles) == 1:
+		profile = profiles[0]
+		return ["-f", "segment", "-segment_time", str(profile.segment_seconds), "-segment_start_number", "1",
+		        "-reset_timestamps", "1", "-segment_format", "mp4",
+		        "-segment_format_options", "movflags=+faststart", str(patterns[profile])]
+	slaves = []
+	for profile in profiles:
+		options = (f"f=segment:segment_time={profile.segment_seconds}:segment_start_number=1:"
+		           f"reset_timestamps=1:segment_format=mp4:segment_format_options=movflags=+faststart")
+		slaves.append(f"[{options}]{_tee_escape(str(patterns[profile]))}")
+	return ["-f", "tee", "|".join(slaves)]
+
+
+def rendition_args(profiles: List[OutputProfile], patterns: Dict[OutputProfile, Path], copy_args: List[str],
+                   audio_args: List[str]) -> List[str]:
+	"""ffmpeg arguments after the input that write every profile in one process.
+
+	patterns maps each profile to its `..._part_%03d.mp4` output pattern.
+	copy_args maps and codes the streams of the stream-copy profiles
+	(`-map`/`-c` options, as from engine.plan_mp4_streams); audio_args maps
+	and codes the audio of the encoded shapes.
+	"""
+	groups: Dict[str, List[OutputProfile]] = {}
+	for profile in profiles:
+		groups.setdefault(profile.shape, []).append(profile)
+	encoded = [shape for shape in groups if shape != "copy"]
+	args: List[str] = []
+	if encoded:
+		# Decode once, one branch per shape
+		chains = [f"[s{i}]{groups[shape][0].video_filter()}[v{i}]" for i, shape in enumerate(encoded)]
+		if len(encoded) == 1:
+			graph = f"[0:v:0]{groups[encoded[0]][0].video_filter()}[v0]"
+		else:
+			labels = "".join(f"[s{i}]" for i in range(len(encoded)))
+			graph = f"[0:v:0]split={len(encoded)}{labels};" + ";".join(chains)
+		args += ["-filter_complex", graph]
+	if "copy" in groups:
+		args += copy_args + _segment_output(groups["copy"], patterns)
+	for i, shape in enumerate(encoded):
+		interval = keyframe_interval(groups[shape])
+		args += [
+			"-map", f"[v{i}]", *audio_args,
+			"-c:v", "libx264", "-preset", "veryfast", "-crf", "20", "-pix_fmt", "yuv420p",
+			"-force_key_frames", f"expr:gte(t,n_forced*{interval})",
+			# tee doesn't ask encoders for global headers the way the segment muxer does; MP4 needs them
+			"-flags", "+global_header",
+		]
+		args += _segment_output(groups[shape], patterns)
+	return args
@@ -0,0 +1,234 @@
+"""Content-addressed cache of finished splits.
+
+The same recording often comes back under another name or from another
+drive. Entries are keyed by a sampled content hash of the input
+(fileops.sample_digest over evenly spaced blocks, not a full read) plus the
+settings that shape the parts, so a renamed copy still hits. A hit places
+the cached parts into the new output folder as reflinks, which takes
+milliseconds regardless of their size; entries keep each part's times and
+the split's plan, so the placed parts get a finished manifest like any
+other split.
+
+Storing puts the fresh parts into the cache the same way. Parts are never
+hardlinked: later runs rewrite parts in place (ffmpeg -y truncates), which
+would change the cache entry and every other folder sharing the inode. Nor
+are they copied: on filesystems without reflinks (ext4, NTFS) a copy would
+double the write I/O of every split and make every hit a full copy, so
+nothing is stored there and the cache simply stays empty. Entries are
+evicted least recently used first once their total size exceeds the cap.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+import fileops
+import manifest
+import probe
+
+RESULT_CACHE_VERSION = 2
+
+# Total part bytes the result cache may hold before least recently used entries go
+RESULT_CACHE_MAX_BYTES = 50 * 1024 * 1024 * 1024
+# Blocks sampled from the input for its content key (fileops.SAMPLE_BYTES each)
+KEY_SAMPLES = 16
+
+_ENTRY_FILE = "entry.json"
+
+
+def content_key(input_path: Path, segment_seconds: int, cut_mode: str) -> Optional[str]:
+	"""Cache key for splitting input_path with these settings; None if it can't be read."""
+	digest = fileops.sample_digest(input_path, samples=KEY_SAMPLES)
+	if digest is None:
+		return None
+	key = [RESULT_CACHE_VERSION, digest, int(segment_seconds), cut_mode]
+	return hashlib.blake2b(json.dumps(key).encode("utf-8"), digest_size=16).hexdigest()
+
+
+@dataclass
+class CachedPart:
+	num: int
+	filename: str
+	size: int
+	mtime_ns: int
+	# The part's time range, as its manifest recorded it
+	start: float = 0.0
+	end: float = 0.0
+
+
+@dataclass
+class CacheEntry:
+	key: str
+	path: Path
+	# Path the parts were first split with ("segment", "smart", ...)
+	mode: str = ""
+	parts: List[CachedPart] = field(default_factory=list)
+	# The manifest plan of the split: its mode, planned boundaries and stream list
+	plan_mode: str = ""
+	bounds: Optional[List[float]] = None
+	streams: List[dict] = field(default_factory=list)
+
+	@property
+	def total_bytes(self) -> int:
+		return sum(p.size for p in self.parts)
+
+
+class ResultCache:
+	"""One folder per entry holding its parts and an entry.json; safe to share between jobs.
+
+	A hit refreshes entry.json's mtime, which is what eviction sorts on.
+	"""
+
+	def __init__(self, root: Path, max_bytes: int = RESULT_CACHE_MAX_BYTES) -> None:
+		self.root = Path(root)
+		self.max_bytes = max_bytes
+		self._lock = threading.Lock()
+
+	def lookup(self, key: str) -> Optional[CacheEntry]:
+		"""The entry for key if all its parts are still there unchanged, else None."""
+		entry_dir = self.root / key
+		try:
+			with open(entry_dir / _ENTRY_FILE, "r", encoding="utf-8") as fh:
+				data = json.load(fh)
+			entry = CacheEntry(key, entry_dir, data.get("mode", ""), [CachedPart(**p) for p in data["parts"]],
+			                   data.get("plan_mode", ""), data.get("bounds"), data.get("streams") or [])
+		except (OSError, ValueError, KeyError, TypeError):
+			return None
+		if data.get("key") != key or not entry.parts:
+			return None
+		for part in entry.parts:
+			# A part changed in place no longer matches; one with other links (entries from
+			# before parts were cloned) shares its data with an output folder that may change it
+			try:
+				st = (entry_dir / part.filename).stat()
+			except OSError:
+				return None
+			if st.st_size != part.size or st.st_mtime_ns != part.mtime_ns or st.st_nlink > 1:
+				self._remove(entry_dir)
+				return None
+		try:
+			os.utime(entry_dir / _ENTRY_FILE)
+		except OSError:
+			pass
+		return entry
+
+	def materialize(self, entry: CacheEntry, targets: List[Path]) -> bool:
+		"""Reflink entry's parts to targets (one per part, in order).
+
+		False if a part couldn't be cloned (another filesystem, evicted
+		meanwhile); targets already placed are removed again in that case, and
+		the caller splits as usual.
+		"""
+		placed: List[Path] = []
+		for part, target in zip(entry.parts, targets):
+			try:
+				target.unlink(missing_ok=True)
+			except OSError:
+				pass
+			if not fileops.try_reflink(entry.path / part.filename, target):
+				for p in placed:
+					p.unlink(missing_ok=True)
+				return False
+			placed.append(target)
+		return True
+
+	def store(self, key: str, output_dir: Path, parts_manifest: manifest.SplitManifest, mode: str) -> bool:
+		"""Reflink the finished parts parts_manifest lists into a new entry.
+
+		False if not cached, e.g. because the filesystem can't clone.
+		"""
+		entries = parts_manifest.entries()
+		if not entries:
+			return False
+		try:
+			self.root.mkdir(parents=True, exist_ok=True)
+			tmp_dir = Path(tempfile.mkdtemp(prefix=".tmp_", dir=str(self.root)))
+		except OSError:
+			return False
+		try:
+			cached = []
+			for e in entries:
+				part = Path(output_dir) / e.filename
+				name = f"part_{e.num:03d}{part.suffix}"
+				# The first part that won't clone stops it; a copy is not worth its I/O here
+				if not fileops.try_reflink(part, tmp_dir / name):
+					return False
+				st = (tmp_dir / name).stat()
+				cached.append({"num": e.num, "filename": name, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+				               "start": e.start, "end": e.end})
+			data = {"key": key, "mode": mode, "created": round(time.time(), 3), "plan_mode": parts_manifest.mode,
+			        "bounds": parts_manifest.bounds, "streams": parts_manifest.streams, "parts": cached}
+			with open(tmp_dir / _ENTRY_FILE, "w", encoding="utf-8") as fh:
+				json.dump(data, fh, indent=1)
+			try:
+				os.rename(tmp_dir, self.root / key)
+			except OSError:
+				# Another job stored the same key first
+				return False
+			tmp_dir = None
+		except OSError:
+			return False
+		finally:
+			if tmp_dir is not None:
+				shutil.rmtree(tmp_dir, ignore_errors=True)
+		self._evict()
+		return True
+
+	@staticmethod
+	def _remove(entry_dir: Path) -> None:
+		# Drop entry.json first so a concurrent lookup never sees a half-deleted entry as valid
+		try:
+			(entry_dir / _ENTRY_FILE).unlink(missing_ok=True)
+		except OSError:
+			pass
+		shutil.rmtree(entry_dir, ignore_errors=True)
+
+	def _evict(self) -> None:
+		with self._lock:
+			entries = []
+			try:
+				for entry_dir in self.root.iterdir():
+					meta = entry_dir / _ENTRY_FILE
+					try:
+						st = meta.stat()
+						size = sum(p.stat().st_size for p in entry_dir.iterdir())
+					except OSError:
+						continue
+					entries.append((st.st_mtime, size, entry_dir))
+			except OSError:
+				return
+			total = sum(size for _, size, _ in entries)
+			if total <= self.max_bytes:
+				return
+			target = self.max_bytes * probe.CACHE_TRIM_RATIO
+			for _, size, entry_dir in sorted(entries, key=lambda e: e[0]):
+				if total <= target:
+					break
+				self._remove(entry_dir)
+				total -= size
+
+	def clear(self) -> None:
+		try:
+			for entry_dir in self.root.iterdir():
+				self._remove(entry_dir)
+		except OSError:
+			pass
+
+
+_default_cache: Optional[ResultCache] = None
+
+
+def default_cache() -> Optional[ResultCache]:
+	"""Shared instance under the probe cache folder; None when disabled with CLIPFORGE_NO_CACHE=1."""
+	global _default_cache
+	if os.environ.get("CLIPFORGE_NO_CACHE") == "1":
+		return None
+	if _default_cache is None:
+		_default_cache = ResultCache(probe.default_cache_dir() / "results")
+	return _default_cache
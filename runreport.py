@@ -0,0 +1,108 @@
+"""Per-run instrumentation: stage timings and the JSON run report.
+
+split_video wraps each stage (staging, probe, segment pass, remux/encode,
+per-part fallback) in RunRecorder.stage(). Progress events seen while a stage
+is open feed its bytes-written and ffmpeg speed figures. At the end of a run
+the collected stages are written as `<base>_run.json` next to the parts.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+REPORT_VERSION = 1
+
+
+@dataclass
+class StageTiming:
+	name: str
+	wall: float = 0.0
+	bytes_read: int = 0
+	bytes_written: int = 0
+	# Last speed ffmpeg reported for this stage (x realtime); 0 if none
+	speed: float = 0.0
+	ok: bool = True
+	detail: str = ""
+
+
+@dataclass
+class RunReport:
+	input: str
+	output_dir: str
+	segment_seconds: int
+	options: dict
+	input_bytes: int = 0
+	started: float = field(default_factory=time.time)
+	wall: float = 0.0
+	ok: bool = False
+	error: Optional[str] = None
+	# Path taken: "segment", "remux+segment", "per-part", "smart", "silence", "scene",
+	# "size", "resume", "cache", "renditions" or "selection"
+	mode: str = ""
+	source: str = ""
+	# Input streams left out because MP4 can't hold them, e.g. "#3 data (tmcd)"
+	dropped_streams: List[str] = field(default_factory=list)
+	parts: int = 0
+	parts_bytes: int = 0
+	# How fallback parts were produced, e.g. {"copy": 10, "ffmpeg-encode": 2, "moviepy": 1}
+	methods: Dict[str, int] = field(default_factory=dict)
+	stages: List[StageTiming] = field(default_factory=list)
+	profile: Optional[str] = None
+
+	def to_dict(self) -> dict:
+		data = asdict(self)
+		data["version"] = REPORT_VERSION
+		data["started"] = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started))
+		return data
+
+	def write(self, path: Path) -> None:
+		tmp = path.with_suffix(path.suffix + ".tmp")
+		with open(tmp, "w", encoding="utf-8") as fh:
+			json.dump(self.to_dict(), fh, indent=2)
+		os.replace(tmp, path)
+
+
+class RunRecorder:
+	"""Collects StageTiming entries for one run. Thread-safe."""
+
+	def __init__(self) -> None:
+		self.stages: List[StageTiming] = []
+		self.methods: Dict[str, int] = {}
+		self._current: Optional[StageTiming] = None
+		self._lock = threading.Lock()
+
+	@contextmanager
+	def stage(self, name: str, bytes_read: int = 0, detail: str = "") -> Iterator[StageTiming]:
+		timing = StageTiming(name, bytes_read=bytes_read, detail=detail)
+		start = time.perf_counter()
+		with self._lock:
+			previous, self._current = self._current, timing
+		try:
+			yield timing
+		except BaseException:
+			timing.ok = False
+			raise
+		finally:
+			timing.wall = round(time.perf_counter() - start, 4)
+			with self._lock:
+				self._current = previous
+				self.stages.append(timing)
+
+	def observe(self, bytes_written: int = 0, speed: float = 0.0) -> None:
+		"""Fold a progress sample into the open stage."""
+		with self._lock:
+			timing = self._current
+			if timing is None:
+				return
+			if bytes_written > timing.bytes_written:
+				timing.bytes_written = bytes_written
+			if speed:
+				timing.speed = speed
+
+	def count(self, method: str) -> None:
+		with self._lock:
+			self.methods[method] = self.methods.get(method, 0) + 1
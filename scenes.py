@@ -0,0 +1,153 @@
+"""Cut placement at scene changes, from a keyframe-only thumbnail scan.
+
+In "scene" cut mode each grid cut moves to the keyframe within
+TOLERANCE_SECONDS of it that starts a new shot, if there is one. Encoders
+put keyframes at shot changes (x264's scenecut), so a keyframe that opens a
+new shot looks very different from the keyframe before it; comparing
+keyframes alone finds the cuts a stream-copy split can use.
+
+ffmpeg decodes only the keyframes (-skip_frame nokey), scales them to a
+64x36 grey thumbnail and pipes them out raw. Each chunk of thumbnails is
+turned into luma histograms with one NumPy bincount and compared with the
+previous keyframe's, so only the last histogram and one score per keyframe
+are kept. Skipping every non-key frame makes the scan run at tens to
+hundreds of times realtime. The scores are cached next to the keyframe
+index, so plans for other part lengths cost nothing.
+
+NumPy is imported on first use and is optional: without it plan_scene_cuts
+returns None and callers keep the regular keyframe cuts.
+"""
+import importlib.util
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+import probe
+import procrunner
+import silence
+
+# How far a cut may move from its nominal position, in seconds (either way)
+TOLERANCE_SECONDS = 5.0
+# Histogram distance (0..1) from the previous keyframe that counts as a new shot
+SCENE_THRESHOLD = 0.3
+# Thumbnail size; the aspect ratio doesn't matter for histograms
+THUMB_WIDTH = 64
+THUMB_HEIGHT = 36
+# Luma histogram bins (256 levels >> BIN_SHIFT)
+BIN_SHIFT = 3
+BINS = 256 >> BIN_SHIFT
+
+_THUMB_BYTES = THUMB_WIDTH * THUMB_HEIGHT
+
+
+def available() -> bool:
+	return importlib.util.find_spec("numpy") is not None
+
+
+@dataclass
+class SceneCutPlan:
+	# Part start times followed by the end of the video
+	boundaries: List[float]
+	# Scene-change score (0..1) of each inner cut's keyframe
+	scores: List[float]
+	# How far each inner cut moved from the grid, in seconds
+	shifts: List[float]
+
+	def to_dict(self) -> dict:
+		return {"boundaries": self.boundaries, "scores": self.scores, "shifts": self.shifts}
+
+
+class _HistogramScorer:
+	"""Scores each streamed thumbnail by its histogram distance from the one before it."""
+
+	def __init__(self, np) -> None:
+		self.np = np
+		self.scores: List[float] = []
+		self._last = None
+		self._pending = b""
+
+	def feed(self, data: bytes) -> None:
+		np = self.np
+		data = self._pending + data
+		usable = len(data) - len(data) % _THUMB_BYTES
+		self._pending = data[usable:]
+		if not usable:
+			return
+		frames = np.frombuffer(data[:usable], dtype=np.uint8).reshape(-1, _THUMB_BYTES)
+		count = len(frames)
+		# One bincount for the whole batch: offset each frame's bins into its own row
+		bins = (frames >> BIN_SHIFT).astype(np.intp) + (np.arange(count) * BINS)[:, None]
+		hists = np.bincount(bins.ravel(), minlength=count * BINS).reshape(count, BINS)
+		if self._last is None:
+			# The first keyframe starts the video, not a scene change
+			previous = hists[:1]
+		else:
+			previous = self._last[None, :]
+		chain = np.concatenate((previous, hists))
+		distances = np.abs(np.diff(chain, axis=0)).sum(axis=1) / (2.0 * _THUMB_BYTES)
+		self.scores.extend(round(float(d), 4) for d in distances)
+		self._last = hists[-1]
+
+
+def scene_scores(path: Path, keyframes: List[float], use_cache: bool = True) -> Optional[List[float]]:
+	"""Scene-change score of every keyframe in the index, in index order.
+
+	None if NumPy is missing, the video can't be decoded, or the decoder
+	returned a different number of keyframes than the index lists.
+	"""
+	cache = probe.default_cache() if use_cache else None
+	if cache is not None:
+		cached = cache.get(path, "scene_scores")
+		if cached is not None and len(cached) == len(keyframes):
+			return [float(s) for s in cached]
+	if not available():
+		return None
+	import numpy as np
+
+	scorer = _HistogramScorer(np)
+	cmd = [
+		"ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin",
+		"-skip_frame", "nokey", "-i", str(path), "-map", "0:v:0", "-an", "-sn", "-dn",
+		"-vf", f"scale={THUMB_WIDTH}:{THUMB_HEIGHT}:flags=area,format=gray",
+		"-fps_mode", "passthrough", "-f", "rawvideo", "pipe:1",
+	]
+	try:
+		if procrunner.run(cmd, on_chunk=scorer.feed).returncode != 0:
+			return None
+	except (procrunner.ProcessTimeout, OSError):
+		return None
+	# Thumbnails carry no timestamps; they line up with the index only if none went missing
+	if len(scorer.scores) != len(keyframes):
+		return None
+	if cache is not None:
+		cache.put(path, "scene_scores", scorer.scores)
+	return scorer.scores
+
+
+def plan_scene_cuts(path: Path, keyframes: List[float], total_seconds: float, segment_seconds: int,
+                    tolerance: float = TOLERANCE_SECONDS, threshold: float = SCENE_THRESHOLD,
+                    use_cache: bool = True) -> Optional[SceneCutPlan]:
+	"""Move each grid cut to the strongest scene change within tolerance of it.
+
+	Cuts with no keyframe scoring above threshold nearby stay where the
+	segment muxer would have put them (the first keyframe at or after the
+	grid point). None if the keyframes couldn't be scored.
+	"""
+	keyframes = sorted(keyframes)
+	scores = scene_scores(path, keyframes, use_cache=use_cache)
+	if scores is None:
+		return None
+	score_at = dict(zip(keyframes, scores))
+	bounds, cut_scores, shifts = [0.0], [], []
+	for nominal, near in silence.candidate_keyframes(keyframes, total_seconds, segment_seconds, tolerance):
+		# Strongest change first; among equals the one closest to the grid
+		best = max(near, key=lambda t: (score_at.get(t, 0.0), -abs(t - nominal)))
+		if score_at.get(best, 0.0) < threshold:
+			best = next((t for t in near if t >= nominal - 1e-3), near[-1])
+		if best <= bounds[-1]:
+			continue
+		bounds.append(best)
+		cut_scores.append(score_at.get(best, 0.0))
+		shifts.append(round(best - nominal, 3))
+	bounds.append(total_seconds)
+	return SceneCutPlan(bounds, cut_scores, shifts)
@@ -0,0 +1,57 @@
+"""Splitting only part of a video: a time range and/or chosen part numbers.
+
+A selection never changes the parts themselves. They are the parts the full
+split would produce, numbered the same way, and only the chosen ones are
+written. A time range selects every part that overlaps it. The engine seeks
+straight to each selected part, so regenerating parts 12 and 13 of a
+three-hour recording reads a few seconds of it.
+"""
+import re
+from typing import List, Optional
+
+_TIME_RE = re.compile(r"^(?:(\d+):)?(?:(\d+):)?(\d+(?:\.\d*)?)$")
+
+
+def parse_time(text: str) -> float:
+	"""Parse "SECONDS", "MM:SS" or "HH:MM:SS" (fractions allowed); raises ValueError."""
+	match = _TIME_RE.match(text.strip())
+	if not match:
+		raise ValueError(f"Invalid time {text!r}: use seconds, MM:SS or HH:MM:SS")
+	first, second, seconds = match.groups()
+	# With one colon the leading field is minutes, with two it is hours
+	hours, minutes = (first, second) if second is not None else (None, first)
+	return int(hours or 0) * 3600 + int(minutes or 0) * 60 + float(seconds)
+
+
+def parse_part_numbers(text: str) -> List[int]:
+	"""Parse part numbers like "12,13" or "5-8 20"; raises ValueError with a message fit for the user."""
+	numbers = set()
+	for item in re.split(r"[,\s]+", text.strip()):
+		if not item:
+			continue
+		first, sep, last = item.partition("-")
+		try:
+			lo = int(first)
+			hi = int(last) if sep else lo
+		except ValueError:
+			raise ValueError(f"Invalid part selection {item!r}: use numbers and ranges like 12,13 or 5-8") from None
+		if lo < 1 or hi < lo:
+			raise ValueError(f"Invalid part selection {item!r}: parts are numbered from 1, ranges go upwards")
+		numbers.update(range(lo, hi + 1))
+	return sorted(numbers)
+
+
+def select_parts(bounds: List[float], start: Optional[float] = None, end: Optional[float] = None,
+                 numbers: Optional[List[int]] = None) -> List[int]:
+	"""Indexes into bounds of the parts a selection covers.
+
+	bounds are the full split's part starts followed by the end of the video.
+	A part is selected if it overlaps [start, end) and, when numbers are
+	given, its 1-based number is one of them. Numbers past the last part are
+	ignored.
+	"""
+	lo = start if start is not None else 0.0
+	hi = end if end is not None else bounds[-1]
+	wanted = set(numbers) if numbers else None
+	return [i for i in range(len(bounds) - 1)
+	        if bounds[i] < hi and bounds[i + 1] > lo and (wanted is None or i + 1 in wanted)]
@@ -0,0 +1,173 @@
+"""Cut placement at quiet moments, from a streamed audio-energy scan.
+
+Fixed grid cuts land mid-sentence. In "silence" cut mode each cut moves to
+the keyframe within TOLERANCE_SECONDS of its nominal position where the
+audio is quietest, so the stream-copy split stays exact (it cuts on those
+keyframes) while parts start and end in pauses.
+
+ffmpeg decodes the first audio stream to 8 kHz mono 16-bit PCM on a pipe.
+Chunks are folded into RMS windows with NumPy and only the windows near a
+candidate keyframe are kept (as running sums per candidate), so memory does
+not grow with the input. Decoding a downsampled mono track runs hundreds of
+times faster than realtime. Plans are cached next to the probe result, so
+Analyze and the split that follows scan the audio once.
+
+NumPy is imported on first use and is optional: without it plan_quiet_cuts
+returns None and callers keep the regular keyframe cuts.
+"""
+import bisect
+import importlib.util
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import probe
+import procrunner
+
+# How far a cut may move from its nominal position, in seconds (either way)
+TOLERANCE_SECONDS = 3.0
+# Analysis sample rate; speech pauses don't need more
+SAMPLE_RATE = 8000
+# RMS window length in seconds
+WINDOW_SECONDS = 0.05
+# A candidate keyframe is scored by the mean RMS within this distance of it
+SCORE_RADIUS = 0.25
+# RMS of a full-scale 16-bit sine is 32767/sqrt(2); levels are reported against 32768
+_FULL_SCALE = 32768.0
+
+
+def available() -> bool:
+	return importlib.util.find_spec("numpy") is not None
+
+
+@dataclass
+class QuietCutPlan:
+	# Part start times followed by the end of the video
+	boundaries: List[float]
+	# Audio level around each inner cut, in dBFS
+	levels: List[float]
+	# How far each inner cut moved from the grid, in seconds
+	shifts: List[float]
+
+	def to_dict(self) -> dict:
+		return {"boundaries": self.boundaries, "levels": self.levels, "shifts": self.shifts}
+
+
+def candidate_keyframes(keyframes: List[float], total_seconds: float, segment_seconds: float,
+                      tolerance: float) -> List[Tuple[float, List[float]]]:
+	"""(grid point, keyframes eligible for it) for each inner cut; the muxer's own choice when none is in range."""
+	# Windows of neighbouring cuts must not overlap, or cuts could swap order
+	tolerance = min(tolerance, segment_seconds / 2 - 1e-3)
+	keyframes = sorted(t for t in keyframes if 0 < t < total_seconds)
+	cuts = []
+	n = 1
+	while n * segment_seconds < total_seconds - 1e-3:
+		nominal = n * segment_seconds
+		near = keyframes[bisect.bisect_left(keyframes, nominal - tolerance):
+		                 bisect.bisect_right(keyframes, nominal + tolerance)]
+		if not near:
+			later = bisect.bisect_left(keyframes, nominal - 1e-3)
+			near = keyframes[later:later + 1]
+		if near:
+			cuts.append((nominal, near))
+		n += 1
+	return cuts
+
+
+class _EnergyScorer:
+	"""Accumulates the mean RMS around each candidate time from streamed PCM chunks."""
+
+	def __init__(self, np, candidate_times: List[float]) -> None:
+		self.np = np
+		self.times = np.asarray(sorted(set(candidate_times)), dtype=np.float64)
+		self.sums = np.zeros(len(self.times))
+		self.counts = np.zeros(len(self.times))
+		self.window = max(1, int(SAMPLE_RATE * WINDOW_SECONDS))
+		self._pending = b""
+		self._windows_done = 0
+
+	def feed(self, data: bytes) -> None:
+		np = self.np
+		data = self._pending + data
+		usable = len(data) - len(data) % (2 * self.window)
+		self._pending = data[usable:]
+		if not usable:
+			return
+		samples = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32)
+		frames = samples.reshape(-1, self.window)
+		rms = np.sqrt(np.mean(frames * frames, axis=1))
+		first = self._windows_done
+		self._windows_done += len(rms)
+		centers = (first + np.arange(len(rms)) + 0.5) * WINDOW_SECONDS
+		# Only candidates whose scoring range overlaps this chunk
+		lo_c = np.searchsorted(self.times, centers[0] - SCORE_RADIUS)
+		hi_c = np.searchsorted(self.times, centers[-1] + SCORE_RADIUS, side="right")
+		if lo_c >= hi_c:
+			return
+		near = self.times[lo_c:hi_c]
+		lo = np.searchsorted(centers, near - SCORE_RADIUS)
+		hi = np.searchsorted(centers, near + SCORE_RADIUS, side="right")
+		cumulative = np.concatenate(([0.0], np.cumsum(rms, dtype=np.float64)))
+		self.sums[lo_c:hi_c] += cumulative[hi] - cumulative[lo]
+		self.counts[lo_c:hi_c] += hi - lo
+
+	def level(self, t: float) -> float:
+		"""Mean RMS around candidate t; infinite if no audio covered it."""
+		i = int(self.np.searchsorted(self.times, t))
+		if i >= len(self.times) or self.times[i] != t or not self.counts[i]:
+			return math.inf
+		return float(self.sums[i] / self.counts[i])
+
+
+def _to_db(rms: float) -> float:
+	if not math.isfinite(rms):
+		return 0.0
+	# Floor at one LSB (about -90 dBFS) so digital silence gets a finite level
+	return round(20 * math.log10(max(rms, 1.0) / _FULL_SCALE), 1)
+
+
+def plan_quiet_cuts(path: Path, keyframes: List[float], total_seconds: float, segment_seconds: int,
+                    audio_index: int, tolerance: float = TOLERANCE_SECONDS,
+                    use_cache: bool = True) -> Optional[QuietCutPlan]:
+	"""Move each grid cut to the quietest keyframe within tolerance of it.
+
+	audio_index is the absolute index of the audio stream to listen to.
+	None if NumPy is missing or the audio can't be decoded.
+	"""
+	section = f"quiet_cuts:{audio_index}:{int(segment_seconds)}:{tolerance:g}"
+	cache = probe.default_cache() if use_cache else None
+	if cache is not None:
+		cached = cache.get(path, section)
+		if cached is not None:
+			return QuietCutPlan(**cached)
+	if not available():
+		return None
+	import numpy as np
+
+	cuts = candidate_keyframes(keyframes, total_seconds, segment_seconds, tolerance)
+	scorer = _EnergyScorer(np, [t for _, near in cuts for t in near])
+	cmd = [
+		"ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin",
+		"-i", str(path), "-map", f"0:{audio_index}", "-vn", "-sn", "-dn",
+		"-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1",
+	]
+	try:
+		if procrunner.run(cmd, on_chunk=scorer.feed).returncode != 0:
+			return None
+	except (procrunner.ProcessTimeout, OSError):
+		return None
+	bounds, levels, shifts = [0.0], [], []
+	for nominal, near in cuts:
+		# Quietest first; among equals the one closest to the grid
+		best = min(near, key=lambda t: (scorer.level(t), abs(t - nominal)))
+		if best <= bounds[-1]:
+			continue
+		bounds.append(best)
+		levels.append(_to_db(scorer.level(best)))
+		shifts.append(round(best - nominal, 3))
+	bounds.append(total_seconds)
+	plan = QuietCutPlan(bounds, levels, shifts)
+	if cache is not None:
+		cache.put(path, section, plan.to_dict())
+	return plan
@@ -0,0 +1,56 @@
+"""Cut placement by part size, from the packet index.
+
+With a size cap the parts are as long as fits: whole GOPs are added to a
+part until the next one would push it over the cap, and the cut goes on
+that GOP's keyframe. Sizes come from probe.packet_index (packet headers of
+every stream, no decoding), so the plan is known before anything is written
+and the split is still one stream-copy segment pass.
+
+A part's file is its packets plus MP4 overhead: a few bytes of sample table
+per packet and the headers. Both are estimated on the high side, so a
+planned part lands under the cap rather than just over it.
+"""
+from dataclasses import dataclass
+from typing import List
+
+import probe
+
+# Caps are given in decimal megabytes; the smaller unit keeps parts under either reading of a cap
+MEGABYTE = 1000 * 1000
+# MP4 sample-table bytes per packet (size, timestamp, chunk offset and sync entries)
+MP4_PACKET_OVERHEAD = 16
+# ftyp/moov headers and the rest of a part's fixed overhead
+MP4_PART_OVERHEAD = 64 * 1024
+
+
+@dataclass
+class SizeCutPlan:
+	# Part start times followed by the end of the video
+	boundaries: List[float]
+	# Estimated file size of each part in bytes
+	part_bytes: List[int]
+	# Numbers of parts that are over the cap anyway (a single GOP bigger than it)
+	oversized: List[int]
+
+
+def plan_size_cuts(index: probe.PacketIndex, total_seconds: float, max_bytes: int) -> SizeCutPlan:
+	"""Pack whole GOPs into parts of at most max_bytes (estimated)."""
+	bounds = [0.0]
+	sizes: List[int] = []
+	oversized: List[int] = []
+	part = MP4_PART_OVERHEAD
+	gops = 0
+	for t, payload, packets in zip(index.keyframes, index.gop_bytes, index.gop_packets):
+		gop = payload + packets * MP4_PACKET_OVERHEAD
+		if gops and part + gop > max_bytes and t > bounds[-1]:
+			bounds.append(t)
+			sizes.append(part)
+			part = MP4_PART_OVERHEAD
+			gops = 0
+		part += gop
+		gops += 1
+		if part > max_bytes and gops == 1:
+			oversized.append(len(bounds))
+	bounds.append(total_seconds)
+	sizes.append(part)
+	return SizeCutPlan(bounds, sizes, oversized)
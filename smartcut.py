@@ -0,0 +1,216 @@
+"""Smart cut: frame-exact parts at close to stream-copy speed.
+
+For a part [start, end) only the video frames between `start` and the next
+keyframe are re-encoded. Everything from that keyframe up to `end` is stream
+copied, and the two pieces are joined with the concat demuxer. Audio is cut
+separately (audio packets are all independently decodable) and muxed back in.
+
+Pieces are staged as MPEG-TS so parameter sets travel in-band and the head
+encode and the copied body can be concatenated without re-encoding.
+"""
+import bisect
+from pathlib import Path
+from typing import List, Optional
+
+import probe
+import procrunner
+
+# Video codecs we can re-encode a matching head for; anything else re-encodes the part
+HEAD_ENCODERS = {
+	"h264": ("libx264", "h264_mp4toannexb"),
+	"hevc": ("libx265", "hevc_mp4toannexb"),
+}
+
+# Audio codecs the MP4 part can carry as stream copy
+COPY_AUDIO_CODECS = {"aac", "mp3", "ac3", "eac3", "opus", "flac", "alac"}
+
+# Input seek lands this far before the cut; output seek then drops packets exactly
+AUDIO_PREROLL = 5.0
+
+# Half of the keyframe index precision (times are rounded to milliseconds)
+_KF_EPSILON = 0.001
+
+
+def _run(cmd: List[str], timeout: Optional[float] = None) -> bool:
+	try:
+		return procrunner.run(cmd, timeout=timeout).returncode == 0
+	except (procrunner.ProcessTimeout, OSError):
+		return False
+
+
+def next_keyframe(keyframes: List[float], t: float) -> Optional[float]:
+	"""First keyframe at or after t (within index precision), or None."""
+	i = bisect.bisect_left(keyframes, t - _KF_EPSILON)
+	return keyframes[i] if i < len(keyframes) else None
+
+
+def _ffmpeg() -> List[str]:
+	return ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y"]
+
+
+# ffprobe profile names -> encoder -profile:v names; a head must share the body's profile
+# because the MP4 part carries a single avcC/hvcC
+_X264_PROFILES = {
+	"Constrained Baseline": "baseline", "Baseline": "baseline", "Main": "main", "High": "high",
+	"High 10": "high10", "High 4:2:2": "high422", "High 4:4:4 Predictive": "high444",
+}
+_X265_PROFILES = {"Main": "main", "Main 10": "main10", "Main Still Picture": "mainstillpicture"}
+
+# Fields the finished part's video stream must share with the source stream
+_MATCH_FIELDS = ("codec_name", "profile", "level", "pix_fmt", "width", "height")
+
+
+def head_encoder_args(stream: probe.StreamInfo) -> List[str]:
+	"""Encoder arguments for a head whose parameters match the probed source stream."""
+	encoder = HEAD_ENCODERS[stream.codec_name][0]
+	args = ["-c:v", encoder, "-preset", "veryfast", "-crf", "18"]
+	params = []
+	if encoder == "libx264":
+		profile = _X264_PROFILES.get(stream.profile)
+		if stream.level > 0:
+			args += ["-level:v", f"{stream.level / 10:.1f}"]
+	else:
+		profile = _X265_PROFILES.get(stream.profile)
+		# ffprobe reports general_level_idc, 30 times the level number
+		if stream.level > 0:
+			params.append(f"level-idc={stream.level / 30:.1f}")
+	if profile:
+		args += ["-profile:v", profile]
+	if stream.pix_fmt:
+		args += ["-pix_fmt", stream.pix_fmt]
+	if stream.refs > 0:
+		params.append(f"ref={stream.refs}")
+	if params:
+		args += [f"-{encoder[3:]}-params", ":".join(params)]
+	return args
+
+
+def _encode_head(source: Path, start: float, length: float, stream: probe.StreamInfo, out: Path) -> bool:
+	# -ss before -i with a re-encode is frame-accurate: ffmpeg decodes from the
+	# previous keyframe and discards frames before start
+	return _run(_ffmpeg() + [
+		"-ss", f"{start:.6f}", "-i", str(source), "-t", f"{length:.6f}",
+		"-map", f"0:{stream.index}", "-an", "-sn", "-dn",
+		*head_encoder_args(stream),
+		"-f", "mpegts", str(out),
+	])
+
+
+def _copy_body(source: Path, keyframe: float, length: float, stream: probe.StreamInfo, bsf: str,
+               out: Path) -> bool:
+	# Seeking a hair past the keyframe makes ffmpeg land exactly on it
+	return _run(_ffmpeg() + [
+		"-ss", f"{keyframe + _KF_EPSILON:.6f}", "-i", str(source), "-t", f"{length:.6f}",
+		"-map", f"0:{stream.index}", "-an", "-sn", "-dn",
+		"-c:v", "copy", "-bsf:v", bsf,
+		"-f", "mpegts", str(out),
+	])
+
+
+def _cut_audio(source: Path, start: float, length: float, codec: str, out: Path) -> bool:
+	preroll = min(AUDIO_PREROLL, start)
+	if codec in COPY_AUDIO_CODECS:
+		codec_args = ["-c:a", "copy"]
+	else:
+		codec_args = ["-c:a", "aac", "-b:a", "192k"]
+	return _run(_ffmpeg() + [
+		"-ss", f"{start - preroll:.6f}", "-i", str(source), "-ss", f"{preroll:.6f}", "-t", f"{length:.6f}",
+		"-map", "0:a:0", "-vn", "-sn", "-dn", *codec_args,
+		"-f", "matroska", str(out),
+	])
+
+
+def _concat(pieces: List[Path], audio: Optional[Path], list_file: Path, output_path: Path) -> bool:
+	with open(list_file, "w", encoding="utf-8") as fh:
+		for piece in pieces:
+			# concat demuxer quoting: wrap in single quotes, escape embedded ones
+			escaped = str(piece).replace("'", "'\\''")
+			fh.write(f"file '{escaped}'\n")
+	cmd = _ffmpeg() + ["-f", "concat", "-safe", "0", "-i", str(list_file)]
+	if audio is not None:
+		cmd += ["-i", str(audio), "-map", "0:v:0", "-map", "1:a:0"]
+	cmd += ["-c", "copy", "-movflags", "+faststart", str(output_path)]
+	return _run(cmd)
+
+
+def _params_match(stream: probe.StreamInfo, output_path: Path) -> bool:
+	"""True if output_path's video stream has the source stream's codec parameters.
+
+	Fields the source probe left unknown are not compared.
+	"""
+	info = probe.probe(output_path, use_cache=False)
+	if info is None:
+		return False
+	videos = info.streams_of("video")
+	if not videos:
+		return False
+	return all(getattr(videos[0], f) == getattr(stream, f) for f in _MATCH_FIELDS if getattr(stream, f))
+
+
+def encode_part_cmd(source: Path, start: float, end: float, output_path: Path, threads: int = 0,
+                    progress: bool = False) -> List[str]:
+	"""ffmpeg command for a frame-accurate full re-encode of one part.
+
+	threads=0 lets the encoder use every CPU; progress=True adds `-progress pipe:1`.
+	"""
+	cmd = _ffmpeg() + [
+		"-ss", f"{start:.6f}", "-i", str(source), "-t", f"{end - start:.6f}",
+		"-map", "0:v:0?", "-map", "0:a:0?",
+		"-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-threads", str(threads),
+		"-c:a", "aac", "-b:a", "192k",
+		"-movflags", "+faststart",
+	]
+	if progress:
+		cmd += ["-progress", "pipe:1"]
+	return cmd + [str(output_path)]
+
+
+def encode_part(source: Path, start: float, end: float, output_path: Path, threads: int = 0) -> bool:
+	"""Frame-accurate full re-encode of one part (used when a smart cut isn't possible)."""
+	return _run(encode_part_cmd(source, start, end, output_path, threads=threads))
+
+
+def smart_cut_part(source: Path, start: float, end: float, keyframes: List[float], info: probe.ProbeInfo,
+                   output_path: Path, work_dir: Path) -> bool:
+	"""Write [start, end) of source to output_path with frame-exact boundaries.
+
+	work_dir holds the intermediate pieces; the caller owns its cleanup.
+	Returns False if any step fails, or if the part's codec parameters don't
+	match the source's after a head was encoded, so the caller can fall back
+	to encode_part.
+	"""
+	videos = [s for s in info.streams_of("video") if not s.attached_pic]
+	if not videos or videos[0].codec_name not in HEAD_ENCODERS:
+		return False
+	stream = videos[0]
+	bsf = HEAD_ENCODERS[stream.codec_name][1]
+	stem = output_path.stem
+	pieces: List[Path] = []
+	kf = next_keyframe(keyframes, start)
+	body_start = kf if kf is not None and kf < end else end
+	has_head = body_start - start > _KF_EPSILON
+	if has_head:
+		head = work_dir / f"{stem}_head.ts"
+		if not _encode_head(source, start, body_start - start, stream, head):
+			return False
+		pieces.append(head)
+	if end - body_start > _KF_EPSILON:
+		body = work_dir / f"{stem}_body.ts"
+		if not _copy_body(source, body_start, end - body_start, stream, bsf, body):
+			return False
+		pieces.append(body)
+	if not pieces:
+		return False
+	audio = None
+	audios = info.streams_of("audio")
+	if audios:
+		audio = work_dir / f"{stem}_audio.mka"
+		if not _cut_audio(source, start, end - start, audios[0].codec_name, audio):
+			return False
+	if not _concat(pieces, audio, work_dir / f"{stem}_list.txt", output_path):
+		return False
+	# A head whose parameter sets differ from the body's would leave the copied body undecodable
+	if has_head and len(pieces) > 1 and not _params_match(stream, output_path):
+		output_path.unlink(missing_ok=True)
+		return False
+	return True
@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import engine
+import probe
+
+
+def _info(*streams: probe.StreamInfo) -> probe.ProbeInfo:
+	return probe.ProbeInfo(duration=100.0, streams=list(streams))
+
+
+def _packets(path: Path, video_index: int, use_cache: bool = True) -> probe.PacketIndex:
+	keyframes = [float(t) for t in range(0, 100, 2)]
+	return probe.PacketIndex(keyframes, [1_000_000] * len(keyframes), [50] * len(keyframes))
+
+
+def test_size_cut_plan_from_copied_streams(monkeypatch):
+	monkeypatch.setattr(probe, "packet_index", _packets)
+	info = _info(probe.StreamInfo(0, "video", "h264"), probe.StreamInfo(1, "audio", "aac"))
+	plan = engine.size_cut_plan(Path("in.mkv"), info, 10_000_000, use_cache=False)
+	assert plan is not None
+	assert all(size <= 10_000_000 for size in plan.part_bytes)
+
+
+def test_size_cut_plan_refuses_reencoded_audio(monkeypatch):
+	# Vorbis becomes AAC at its own bitrate, so the source's packet sizes say nothing about the parts
+	monkeypatch.setattr(probe, "packet_index", _packets)
+	info = _info(probe.StreamInfo(0, "video", "vp9"), probe.StreamInfo(1, "audio", "vorbis"))
+	assert "vp9" in engine.MP4_VIDEO_CODECS
+	assert engine.size_cut_plan(Path("in.webm"), info, 10_000_000, use_cache=False) is None
+
+
+def _route(monkeypatch, tmp_path: Path, info: probe.ProbeInfo) -> list:
+	"""Split a fake AVI with ffmpeg stubbed out; returns the conversion and segment calls in order."""
+	source = tmp_path / "in.avi"
+	source.write_bytes(b"\0" * 4096)
+	converted = tmp_path / "converted.mp4"
+	calls = []
+
+	def ensure_mp4(input_path, reporter, max_workers=None, recorder=None, plan=None, keyframe_seconds=0):
+		calls.append(("convert", keyframe_seconds))
+		converted.write_bytes(b"\0" * 4096)
+		return converted
+
+	def segment(input_path, output_dir, base, ext, segment_seconds, total_seconds, reporter, plan=None, **kwargs):
+		calls.append(("segment", Path(input_path).name, plan is not None and not plan.is_copy))
+		return True
+
+	monkeypatch.setattr(probe, "probe", lambda path, use_cache=True: info)
+	monkeypatch.setattr(engine, "ensure_mp4_with_progress", ensure_mp4)
+	monkeypatch.setattr(engine, "segment_with_progress", segment)
+	engine.split_video(source, tmp_path / "out", 60, options=engine.SplitOptions(use_cache=False, resume=False))
+	return calls
+
+
+def test_long_reencode_goes_through_chunked_encode(monkeypatch, tmp_path):
+	monkeypatch.setattr(engine.os, "cpu_count", lambda: 8)
+	info = _info(probe.StreamInfo(0, "video", "msmpeg4v3"), probe.StreamInfo(1, "audio", "mp3"))
+	info.duration = 1800.0
+	assert engine.chunked_encode_pays(info, engine.plan_mp4_streams(info, 60))
+	# Converted (in chunks, keyframes on the part grid) first, then cut by stream copy
+	assert _route(monkeypatch, tmp_path, info) == [("convert", 60), ("segment", "converted.mp4", False)]
+
+
+def test_short_reencode_stays_in_the_segment_pass(monkeypatch, tmp_path):
+	monkeypatch.setattr(engine.os, "cpu_count", lambda: 8)
+	info = _info(probe.StreamInfo(0, "video", "msmpeg4v3"), probe.StreamInfo(1, "audio", "mp3"))
+	info.duration = 60.0
+	assert _route(monkeypatch, tmp_path, info) == [("segment", "in.avi", True)]
+
+
+def test_copied_video_stays_in_the_segment_pass(monkeypatch, tmp_path):
+	monkeypatch.setattr(engine.os, "cpu_count", lambda: 8)
+	info = _info(probe.StreamInfo(0, "video", "h264"), probe.StreamInfo(1, "audio", "pcm_s16le"))
+	info.duration = 1800.0
+	assert not engine.chunked_encode_pays(info, engine.plan_mp4_streams(info, 60))
+	assert _route(monkeypatch, tmp_path, info) == [("segment", "in.avi", True)]
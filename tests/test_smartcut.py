@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import probe
+import smartcut
+
+
+def _h264(**fields) -> probe.StreamInfo:
+	return probe.StreamInfo(0, "video", "h264", profile="High", level=40, width=1920, height=1080,
+	                        pix_fmt="yuv420p", refs=4, **fields)
+
+
+def test_head_encoder_args_follow_the_source_stream():
+	args = smartcut.head_encoder_args(_h264())
+	assert args[args.index("-profile:v") + 1] == "high"
+	assert args[args.index("-level:v") + 1] == "4.0"
+	assert args[args.index("-pix_fmt") + 1] == "yuv420p"
+	assert args[args.index("-x264-params") + 1] == "ref=4"
+	hevc = probe.StreamInfo(0, "video", "hevc", profile="Main 10", level=120, pix_fmt="yuv420p10le")
+	args = smartcut.head_encoder_args(hevc)
+	assert args[args.index("-profile:v") + 1] == "main10"
+	assert args[args.index("-x265-params") + 1] == "level-idc=4.0"
+
+
+def _smart_cut(monkeypatch, tmp_path: Path, part_stream: probe.StreamInfo) -> bool:
+	"""Smart cut a head plus body with ffmpeg stubbed out; the finished part probes as part_stream."""
+	def run(cmd, timeout=None):
+		Path(cmd[-1]).write_bytes(b"\0")
+		return True
+
+	monkeypatch.setattr(smartcut, "_run", run)
+	monkeypatch.setattr(probe, "probe", lambda path, use_cache=True: probe.ProbeInfo(10.0, streams=[part_stream]))
+	info = probe.ProbeInfo(100.0, streams=[_h264()])
+	return smartcut.smart_cut_part(Path("in.mp4"), 1.0, 9.0, [0.0, 4.0, 8.0], info, tmp_path / "part.mp4", tmp_path)
+
+
+def test_smart_cut_keeps_a_part_with_matching_parameters(monkeypatch, tmp_path):
+	assert _smart_cut(monkeypatch, tmp_path, _h264())
+	assert (tmp_path / "part.mp4").exists()
+
+
+def test_smart_cut_rejects_a_part_whose_head_changed_the_parameters(monkeypatch, tmp_path):
+	# The part's avcC comes from the head; a different profile would corrupt the copied body
+	part = probe.StreamInfo(0, "video", "h264", profile="Main", level=40, width=1920, height=1080, pix_fmt="yuv420p")
+	assert not _smart_cut(monkeypatch, tmp_path, part)
+	assert not (tmp_path / "part.mp4").exists()
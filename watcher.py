@@ -0,0 +1,263 @@
+"""Watch-folder ingestion: split every video that lands in a directory.
+
+New files are noticed through inotify on Linux (polling elsewhere, or when
+inotify is unavailable, e.g. on many network shares) and only handed to the
+JobQueue once their size and mtime have stayed the same for `settle_seconds`,
+so half-copied recordings are never split. A JSON state file records which
+file versions (path, size, mtime) have been processed, so a restart does not
+redo finished work; a file that changes afterwards is treated as new.
+"""
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import engine
+import jobqueue
+
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".mkv", ".avi", ".webm", ".m4v", ".ts", ".mts", ".m2ts", ".flv", ".wmv"}
+
+# A file must keep the same size and mtime this long before it is split
+SETTLE_SECONDS = 10.0
+# How often pending files are re-checked (and the folder rescanned when polling)
+POLL_INTERVAL = 2.0
+# Full rescan period with inotify, in case events were dropped or the queue overflowed
+RESCAN_SECONDS = 60.0
+
+STATE_FILENAME = ".clipforge_watch.json"
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def file_version(path: Path) -> Optional[list]:
+	"""[size, mtime_ns] identifying one version of a file; None if it is gone."""
+	try:
+		st = path.stat()
+	except OSError:
+		return None
+	return [st.st_size, st.st_mtime_ns]
+
+
+def is_candidate(path: Path) -> bool:
+	# Hidden files are usually in-progress copies (rsync, browsers, capture tools)
+	return path.suffix.lower() in VIDEO_EXTENSIONS and not path.name.startswith(".")
+
+
+class WatchState:
+	"""Persistent record of processed file versions, written atomically."""
+
+	def __init__(self, path: Path) -> None:
+		self.path = Path(path)
+		self._lock = threading.Lock()
+		self._entries: Dict[str, dict] = {}
+		try:
+			with open(self.path, "r", encoding="utf-8") as fh:
+				self._entries = json.load(fh).get("files") or {}
+		except (OSError, ValueError):
+			self._entries = {}
+
+	def is_processed(self, path: Path, version: list) -> bool:
+		with self._lock:
+			entry = self._entries.get(str(path))
+		return entry is not None and entry.get("version") == version and entry.get("state") in ("done", "failed")
+
+	def record(self, path: Path, version: list, state: str, **fields) -> None:
+		with self._lock:
+			self._entries[str(path)] = {"version": version, "state": state, "time": round(time.time(), 3), **fields}
+			data = {"files": dict(self._entries)}
+			try:
+				self.path.parent.mkdir(parents=True, exist_ok=True)
+				fd, tmp_name = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=str(self.path.parent))
+				with os.fdopen(fd, "w", encoding="utf-8") as fh:
+					json.dump(data, fh, indent=1)
+				os.replace(tmp_name, self.path)
+			except OSError:
+				pass
+
+
+class _Inotify:
+	"""Minimal ctypes binding: which names were created, closed or moved into one directory."""
+
+	def __init__(self, directory: Path) -> None:
+		libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+		self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+		if self.fd < 0:
+			raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+		mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+		if libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), mask) < 0:
+			err = ctypes.get_errno()
+			os.close(self.fd)
+			raise OSError(err, f"inotify_add_watch failed for {directory}")
+		self.overflowed = False
+
+	def read(self, timeout: float) -> List[str]:
+		ready, _, _ = select.select([self.fd], [], [], timeout)
+		if not ready:
+			return []
+		try:
+			data = os.read(self.fd, 64 * 1024)
+		except BlockingIOError:
+			return []
+		names = []
+		offset = 0
+		while offset + _EVENT_HEADER.size <= len(data):
+			_, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+			offset += _EVENT_HEADER.size
+			name = data[offset:offset + length].rstrip(b"\0")
+			offset += length
+			if mask & _IN_Q_OVERFLOW:
+				self.overflowed = True
+			elif name:
+				names.append(os.fsdecode(name))
+		return names
+
+	def close(self) -> None:
+		os.close(self.fd)
+
+
+@dataclass
+class _Pending:
+	version: list
+	stable_since: float
+
+
+class FolderWatcher:
+	"""Feeds settled video files from watch_dir into a JobQueue.
+
+	Parts go to `<output_root>/Outputs/<base>`, the layout the GUI and the
+	CLI use. log receives one line per noteworthy event (queued, finished,
+	failed). Only the top level of watch_dir is watched.
+	"""
+
+	def __init__(self, watch_dir: Path, output_root: Optional[Path], segment_seconds: int,
+	             options: Optional[engine.SplitOptions] = None, io_jobs: int = jobqueue.DEFAULT_IO_JOBS,
+	             cpu_jobs: int = jobqueue.DEFAULT_CPU_JOBS, settle_seconds: float = SETTLE_SECONDS,
+	             poll_interval: float = POLL_INTERVAL, state_path: Optional[Path] = None, use_inotify: bool = True,
+	             reporter_factory: Optional[Callable[[jobqueue.Job], engine.Reporter]] = None,
+	             log: Callable[[str], None] = print) -> None:
+		self.watch_dir = Path(watch_dir)
+		self.output_root = output_root
+		self.segment_seconds = segment_seconds
+		self.options = options or engine.SplitOptions()
+		self.settle_seconds = settle_seconds
+		self.poll_interval = poll_interval
+		self.log = log
+		root = output_root or Path.cwd()
+		self.state = WatchState(state_path or (root / STATE_FILENAME))
+		self.queue = jobqueue.JobQueue(io_jobs=io_jobs, cpu_jobs=cpu_jobs, reporter_factory=reporter_factory,
+		                               on_finish=self._on_finish)
+		self._pending: Dict[Path, _Pending] = {}
+		# File versions currently queued or running
+		self._active: Dict[Path, list] = {}
+		self._inotify: Optional[_Inotify] = None
+		if use_inotify and sys.platform.startswith("linux"):
+			try:
+				self._inotify = _Inotify(self.watch_dir)
+			except (OSError, AttributeError):
+				self._inotify = None
+
+	@property
+	def mode(self) -> str:
+		return "inotify" if self._inotify is not None else "polling"
+
+	def _scan(self) -> None:
+		try:
+			entries = list(os.scandir(self.watch_dir))
+		except OSError:
+			return
+		for entry in entries:
+			if entry.is_file():
+				self._notice(Path(entry.path))
+
+	def _notice(self, path: Path) -> None:
+		if path in self._pending or path in self._active or not is_candidate(path):
+			return
+		version = file_version(path)
+		if version is None or self.state.is_processed(path, version):
+			return
+		self._pending[path] = _Pending(version, time.monotonic())
+
+	def _check_pending(self) -> None:
+		now = time.monotonic()
+		for path, pending in list(self._pending.items()):
+			version = file_version(path)
+			if version is None:
+				del self._pending[path]
+			elif version != pending.version or version[0] == 0:
+				# Still growing (or not written yet): restart the settle timer
+				pending.version = version
+				pending.stable_since = now
+			elif now - pending.stable_since >= self.settle_seconds:
+				del self._pending[path]
+				self._submit(path, version)
+
+	def _submit(self, path: Path, version: list) -> None:
+		out_dir = engine.resolve_output_dir(self.output_root, path)
+		try:
+			out_dir.mkdir(parents=True, exist_ok=True)
+		except OSError as exc:
+			self.log(f"{path.name}: cannot create {out_dir}: {exc}")
+			self.state.record(path, version, "failed", error=str(exc))
+			return
+		self._active[path] = version
+		self.queue.submit(path, out_dir, self.segment_seconds, options=self.options)
+		self.log(f"{path.name}: queued -> {out_dir}")
+
+	def _on_finish(self, job: jobqueue.Job) -> None:
+		version = self._active.get(job.input_path)
+		if version is None:
+			return
+		try:
+			self._record(job, version)
+		finally:
+			# Only after the state is saved, so a rescan can't queue the same version again
+			self._active.pop(job.input_path, None)
+
+	def _record(self, job: jobqueue.Job, version: list) -> None:
+		if job.state == "done":
+			result = job.result
+			self.state.record(job.input_path, version, "done", parts=len(result.parts), mode=result.mode,
+			                  output_dir=str(result.output_dir))
+			self.log(f"{job.input_path.name}: {len(result.parts)} part(s) in {result.elapsed:.1f}s ({result.mode})")
+		elif job.state == "failed":
+			self.state.record(job.input_path, version, "failed", error=job.error)
+			self.log(f"{job.input_path.name}: failed: {job.error}")
+		# Cancelled jobs are not recorded, so they run again after a restart
+
+	def run(self, stop_event: threading.Event) -> None:
+		"""Watch until stop_event is set, then cancel whatever is still queued or running."""
+		self.log(f"Watching {self.watch_dir} ({self.mode}, settle {self.settle_seconds:g}s)")
+		self._scan()
+		last_scan = time.monotonic()
+		try:
+			while not stop_event.is_set():
+				if self._inotify is not None:
+					for name in self._inotify.read(self.poll_interval):
+						self._notice(self.watch_dir / name)
+					if self._inotify.overflowed or time.monotonic() - last_scan >= RESCAN_SECONDS:
+						self._inotify.overflowed = False
+						self._scan()
+						last_scan = time.monotonic()
+				else:
+					stop_event.wait(self.poll_interval)
+					self._scan()
+				self._check_pending()
+		finally:
+			if self._inotify is not None:
+				self._inotify.close()
+			self.queue.shutdown(cancel=True)